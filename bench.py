@@ -0,0 +1,196 @@
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+import profiling
+from engine import (
+    Tournament, BergerSchedule, SWISS, MATCHING, DUTCH, calculate_buchholz, swiss_rounds_range,
+)
+from simulation import outcome_probabilities
+
+# Воспроизводимые замеры жеребьёвки и таблицы. Для каждого размера поля
+# разыгрывается полный швейцарский турнир: рейтинги и исходы партий (по Эло)
+# берутся из генератора с заданным seed, так что при одном seed все прогоны
+# дают одинаковые пары. На выходе — JSON со временем на тур, пиковой памятью
+# и показателями качества жеребьёвки; --compare сверяет его с прошлым
+# прогоном и возвращает код 1 при регрессии. С --profile к каждому полю
+# добавляется сводка profiling (фазы, счётчики паросочетания, размер состояния).
+# --system dutch меряет голландскую систему (стартовые номера — по тем же рейтингам).
+
+SIZES = (16, 128, 1000, 5000)
+RATING_MEAN = 1800
+RATING_SD = 300
+RR_SAMPLE_ROUNDS = 50
+BUCHHOLZ_REPEATS = 20
+# Допустимое замедление относительно прошлого прогона при --compare
+TIME_TOLERANCE = 1.5
+QUALITY_KEYS = ("rematches", "unpaired", "repeat_byes", "color_streaks_3", "color_diff_over_2")
+
+def _results(rng, ratings, pairs):
+    """Результаты досок по рейтингам (доля ничьих как в прогнозе)."""
+    if not pairs:
+        return []
+    white, black = np.array(pairs).T
+    win, draw, _ = outcome_probabilities(ratings[white], ratings[black])
+    u = rng.random(len(pairs))
+    return ["1-0" if x < w else "1/2-1/2" if x < w + d else "0-1" for x, w, d in zip(u, win, draw)]
+
+def run_event(n, rounds, seed, system=MATCHING):
+    """Полный швейцарский турнир из n игроков; возвращает замеры и качество."""
+    rng = np.random.default_rng(seed)
+    ratings = rng.normal(RATING_MEAN, RATING_SD, n)
+    names = [f"P{i}" for i in range(n)]
+    tournament = Tournament(names, SWISS, rounds, seed=seed, pairing_system=system,
+                            ratings={name: {"fide": round(r)} for name, r in zip(names, ratings)})
+    state = tournament.state
+    pairing_times = []
+    results_times = []
+    quality = {"rematches": 0, "unpaired": 0, "floats": 0, "max_score_diff": 0.0}
+    for _ in range(rounds):
+        started = time.perf_counter()
+        data = tournament.pair_next_round()
+        pairing_times.append(time.perf_counter() - started)
+
+        pairs = data["pairs"]
+        quality["rematches"] += sum(state.played.get(w, b) for w, b in pairs)
+        quality["unpaired"] += n - 2 * len(pairs) - (data["bye"] is not None)
+        if pairs:
+            white, black = np.array(pairs).T
+            diff = np.abs(state.scores[white] - state.scores[black])
+            quality["floats"] += int((diff > 0).sum())
+            quality["max_score_diff"] = max(quality["max_score_diff"], float(diff.max()))
+
+        results = _results(rng, ratings, pairs)
+        started = time.perf_counter()
+        tournament.submit_results(results)
+        results_times.append(time.perf_counter() - started)
+
+    streaks = 0
+    for player in range(n):
+        colors = state.colors[player, :int(state.games[player])]
+        if len(colors) >= 3:
+            streaks += int(((colors[2:] == colors[1:-1]) & (colors[1:-1] == colors[:-2])).sum())
+    quality["repeat_byes"] = int(np.maximum(state.byes.astype(np.int64) - 1, 0).sum())
+    quality["color_streaks_3"] = streaks
+    quality["color_diff_over_2"] = int((np.abs(state.color_diff) > 2).sum())
+
+    started = time.perf_counter()
+    for _ in range(BUCHHOLZ_REPEATS):
+        calculate_buchholz(state)
+    buchholz_time = (time.perf_counter() - started) / BUCHHOLZ_REPEATS
+    return {
+        "players": n,
+        "rounds": rounds,
+        "pairing_ms": [round(t * 1000, 3) for t in pairing_times],
+        "pairing_ms_mean": round(1000 * sum(pairing_times) / rounds, 3),
+        "pairing_ms_max": round(1000 * max(pairing_times), 3),
+        "results_ms_mean": round(1000 * sum(results_times) / rounds, 3),
+        "buchholz_ms": round(1000 * buchholz_time, 3),
+        "quality": quality,
+    }
+
+def peak_memory(n, rounds, seed, system=MATCHING):
+    """Пиковая память (МБ) того же турнира под tracemalloc (отдельный прогон,
+    чтобы трассировка не искажала время)."""
+    tracemalloc.start()
+    try:
+        run_event(n, rounds, seed, system)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return round(peak / 2 ** 20, 2)
+
+def run_round_robin(n):
+    """Время одного тура расписания Бергера (выборка туров обоих кругов)."""
+    schedule = BergerSchedule(n, 2 * (n - 1 + n % 2))
+    step = max(1, len(schedule) // RR_SAMPLE_ROUNDS)
+    sample = range(0, len(schedule), step)
+    started = time.perf_counter()
+    for k in sample:
+        schedule[k]
+    return {"players": n, "round_ms_mean": round(1000 * (time.perf_counter() - started) / len(sample), 4)}
+
+def run(sizes=SIZES, rounds=None, seed=1, memory=True, profile=False, system=MATCHING):
+    """Все замеры; rounds=None — рекомендуемое число туров для каждого поля."""
+    report = {
+        "seed": seed,
+        "pairing_system": system,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "swiss": [],
+        "round_robin": [],
+    }
+    for n in sizes:
+        event_rounds = rounds or swiss_rounds_range(n)[2]
+        profiling.reset()
+        profiling.enable(profile)
+        try:
+            event = run_event(n, event_rounds, seed, system)
+        finally:
+            profiling.enable(False)
+        if profile:
+            event["profile"] = profiling.summary()
+        if memory:
+            event["peak_mb"] = peak_memory(n, event_rounds, seed, system)
+        report["swiss"].append(event)
+        report["round_robin"].append(run_round_robin(n))
+    return report
+
+def compare(report, baseline, tolerance=TIME_TOLERANCE):
+    """Регрессии относительно прошлого отчёта: замедление и ухудшение качества."""
+    problems = []
+    if baseline.get("pairing_system", MATCHING) != report.get("pairing_system", MATCHING):
+        return ["отчёты сняты с разными системами жеребьёвки"]
+    old_events = {(e["players"], e["rounds"]): e for e in baseline.get("swiss", [])}
+    for event in report["swiss"]:
+        old = old_events.get((event["players"], event["rounds"]))
+        if old is None:
+            continue
+        name = f"{event['players']} игроков"
+        for key in ("pairing_ms_mean", "results_ms_mean", "buchholz_ms"):
+            if old[key] and event[key] > tolerance * old[key]:
+                problems.append(f"{name}: {key} {old[key]} -> {event[key]}")
+        for key in QUALITY_KEYS:
+            if event["quality"][key] > old["quality"][key]:
+                problems.append(f"{name}: {key} {old['quality'][key]} -> {event['quality'][key]}")
+    return problems
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Замеры жеребьёвки и турнирной таблицы.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES), help="размеры полей")
+    parser.add_argument("--rounds", type=int, help="число туров (по умолчанию рекомендуемое)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--no-memory", action="store_true", help="не замерять пиковую память")
+    parser.add_argument("--profile", action="store_true",
+                        help="добавить сводку замеров по фазам (сами замеры немного замедляют прогон)")
+    parser.add_argument("--system", choices=("matching", "dutch"), default="matching",
+                        help="система жеребьёвки: паросочетание по очкам или голландская ФИДЕ")
+    parser.add_argument("-o", "--output", help="куда писать JSON (по умолчанию stdout)")
+    parser.add_argument("--compare", help="прошлый отчёт JSON для поиска регрессий")
+    args = parser.parse_args(argv)
+
+    system = DUTCH if args.system == "dutch" else MATCHING
+    report = run(args.sizes, args.rounds, args.seed, memory=not args.no_memory, profile=args.profile,
+                 system=system)
+    text = json.dumps(report, ensure_ascii=False, indent=1)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            problems = compare(report, json.load(f))
+        for problem in problems:
+            print(problem, file=sys.stderr)
+        return 1 if problems else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
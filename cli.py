@@ -0,0 +1,91 @@
+import argparse
+import json
+import sys
+
+from engine import Tournament, MATCHING, ROUND_ROBIN_TYPES, round_robin_rounds, swiss_rounds_range
+
+# Пакетный прогон турниров без Streamlit.
+#
+# Файл турнира (JSON) или поток турниров (JSONL, по одному на строку):
+#   {"players": ["Иванов Иван", ...], "type": "Швейцарская система",
+#    "rounds": 7, "seed": 1, "ratings": {...}, "pairing_budget": 0.5,
+#    "pairing_system": "Голландская система ФИДЕ",
+#    "results": [["1-0", "1/2-1/2", ...], ...]}
+# results[k] — результаты тура k+1 в порядке досок, выданном жеребьёвкой
+# (в том числе неявки «+/-», «-/+», «-/-»).
+# pairing_budget — секунды на поиск лучшей жеребьёвки, для голландской
+# системы — ограничение её времени (необязательно). pairing_system — одна из
+# engine.PAIRING_SYSTEMS, по умолчанию паросочетание по очкам.
+# Если результатов меньше, чем туров, турнир останавливается на последнем
+# сыгранном туре. На выходе — одна строка JSON на турнир.
+
+def load_events(path):
+    """Читает турниры из файла: JSON-объект или JSONL по одному на строку."""
+    stream = sys.stdin if path == "-" else open(path, encoding="utf-8")
+    try:
+        if path.endswith(".json"):
+            yield json.load(stream)
+            return
+        for line in stream:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+def run_event(event):
+    """Жеребьёвка и подсчёт очков одного турнира по файлу результатов."""
+    players = event["players"]
+    tournament_type = event.get("type", "Швейцарская система")
+    total_rounds = event.get("rounds")
+    if total_rounds is None:
+        if tournament_type in ROUND_ROBIN_TYPES:
+            total_rounds = round_robin_rounds(len(players), tournament_type)
+        else:
+            total_rounds = swiss_rounds_range(len(players))[2]
+    tournament = Tournament(players, tournament_type, total_rounds,
+                            ratings=event.get("ratings"), seed=event.get("seed"),
+                            pairing_system=event.get("pairing_system", MATCHING))
+    rounds = []
+    for results in event.get("results", [])[:total_rounds]:
+        data = tournament.pair_next_round(budget=event.get("pairing_budget"))
+        tournament.submit_results(results)
+        rounds.append({
+            "pairs": [(tournament.name(w), tournament.name(b)) for w, b in data["pairs"]],
+            "bye": tournament.name(data["bye"]),
+            "results": [r for _, _, r in data["results"]],
+            "seed": data["seed"],
+        })
+    return {
+        "name": event.get("name"),
+        "rounds": rounds,
+        "standings": tournament.standings(),
+        "warnings": tournament.warnings,
+        "completed": tournament.completed,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Пакетная жеребьёвка и подсчёт турниров.")
+    parser.add_argument("inputs", nargs="+", help="файлы турниров (.json или .jsonl, '-' — stdin)")
+    parser.add_argument("-o", "--output", help="куда писать JSONL (по умолчанию stdout)")
+    args = parser.parse_args(argv)
+
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    failed = 0
+    try:
+        for path in args.inputs:
+            for event in load_events(path):
+                try:
+                    report = run_event(event)
+                except (KeyError, ValueError) as e:
+                    failed += 1
+                    report = {"name": event.get("name"), "error": str(e)}
+                out.write(json.dumps(report, ensure_ascii=False) + "\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
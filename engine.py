@@ -0,0 +1,1353 @@
+import random
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+import numpy as np
+
+import profiling
+from matching import max_weight_matching
+from rating import player_ratings, rating_report
+from standings import StandingsIndex
+from state import TournamentState, WHITE, BLACK, STRONG, ABSOLUTE, UP, DOWN
+
+# Движок турнира без зависимости от Streamlit: его импортирует и страница,
+# и пакетный CLI (cli.py).
+
+ROUND_ROBIN_TYPES = ("Один круг", "Два круга")
+SWISS = "Швейцарская система"
+TOURNAMENT_TYPES = ROUND_ROBIN_TYPES + (SWISS,)
+RESULTS = ("1-0", "0-1", "1/2-1/2", "+/-", "-/+", "-/-")
+WHITE_POINTS = {"1-0": 1.0, "0-1": 0.0, "1/2-1/2": 0.5}
+# Неявки: очки (белые, чёрные). Партия не считается сыгранной — не входит
+# в Бухгольц и цвета, и эти игроки могут встретиться снова.
+FORFEITS = {"+/-": (1.0, 0.0), "-/+": (0.0, 1.0), "-/-": (0.0, 0.0)}
+
+# =============== Вспомогательные функции ===============
+
+def round_robin_rounds(n_players, tournament_type):
+    """Количество туров кругового турнира (один или два круга)."""
+    base = n_players if n_players % 2 == 1 else n_players - 1
+    return base if tournament_type == "Один круг" else 2 * base
+
+def swiss_rounds_range(n_players):
+    """Допустимое число туров швейцарки: (минимум, максимум, рекомендуемое)."""
+    recommended = math.ceil(math.log2(n_players)) + 2
+    max_circle = n_players if n_players % 2 == 1 else n_players - 1
+    max_swiss = min(max_circle - 1, recommended + 2)
+    min_swiss = recommended
+    if min_swiss > max_swiss:
+        min_swiss = max_swiss
+    return min_swiss, max_swiss, recommended
+
+def get_preferred_color(player, state):
+    """Желаемый цвет игрока (без партий — белые); O(1) по цветовому состоянию."""
+    return int(state.color_pref[player]) or WHITE
+
+def decide_colors(p1, p2, state, ranks=None):
+    """Цвета пары по правилам ФИДЕ: совместимые предпочтения выполняются,
+    при одинаковых побеждает более сильное, затем большая разница цветов,
+    более длинная серия, больше очков и меньший стартовый номер (ranks;
+    без них — номер игрока)."""
+    pref1, pref2 = int(state.color_pref[p1]), int(state.color_pref[p2])
+    if pref1 != pref2 and pref1 and pref2:
+        return (p1, p2) if pref1 == WHITE else (p2, p1)
+    if not pref1 or not pref2:
+        pref = pref1 or pref2 or WHITE
+        holder = p1 if pref1 or not pref2 else p2
+        other = p2 if holder == p1 else p1
+        return (holder, other) if pref == WHITE else (other, holder)
+    key = lambda p: (int(state.color_strength[p]), abs(int(state.color_diff[p])),
+                     abs(int(state.color_streak[p])), state.scores[p],
+                     -(p if ranks is None else ranks[p]))
+    winner, loser = (p1, p2) if key(p1) >= key(p2) else (p2, p1)
+    return (winner, loser) if pref1 == WHITE else (loser, winner)
+
+class BergerSchedule:
+    """Расписание кругового турнира по таблицам Бергера ФИДЕ.
+
+    Пары тура вычисляются по номеру тура за O(n), ничего не храня:
+    schedule[k] — список досок тура k+1, пара (белые, чёрные) или
+    (игрок, None) для BYE при нечётном числе участников. Туры после
+    первого круга повторяют его со сменой цветов в каждом чётном круге,
+    так что число кругов не ограничено.
+    """
+
+    def __init__(self, n_players, total_rounds):
+        self.n_players = n_players
+        self.total_rounds = total_rounds
+        # Чётное число мест: при нечётном числе игроков последнее место — BYE
+        self.size = n_players + n_players % 2
+        self.cycle_rounds = max(self.size - 1, 1)
+
+    def __len__(self):
+        return self.total_rounds
+
+    def __getitem__(self, index):
+        if not 0 <= index < self.total_rounds:
+            raise IndexError(index)
+        return self.pairs(index + 1)
+
+    def __iter__(self):
+        return (self.pairs(rnd) for rnd in range(1, self.total_rounds + 1))
+
+    def pairs(self, rnd):
+        """Доски тура rnd (с 1) в номерах игроков с 0."""
+        n, m = self.size, self.cycle_rounds
+        if n < 2:
+            return []
+        cycle, r = divmod(rnd - 1, m)
+        r += 1
+        # Номера в таблице 1..n: в туре r встречаются a и b с a + b ≡ r + 1 (mod m),
+        # а номер n — с тем a0, у которого 2·a0 ≡ r + 1; эта пара открывает тур
+        # (m нечётно, обратный к 2 по модулю m — (m + 1) / 2)
+        a0 = (r + 1) * (m + 1) // 2 % m or m
+        boards = [(n, a0) if r % 2 == 0 else (a0, n)]
+        for k in range(1, n // 2):
+            a = (a0 + k - 1) % m + 1
+            b = (a0 - k - 1) % m + 1
+            # Белые у того, от кого до соперника нечётное число шагов по кругу
+            boards.append((a, b) if (b - a) % m % 2 == 1 else (b, a))
+        swap = cycle % 2 == 1
+        result = []
+        for white, black in boards:
+            if swap:
+                white, black = black, white
+            white = None if white > self.n_players else white - 1
+            black = None if black > self.n_players else black - 1
+            result.append((white, black))
+        return result
+
+@profiling.timed("pairing.initial")
+def initial_pairing_with_colors(players, state, current_round, total_rounds, rng=random):
+    rng.shuffle(players)
+    pairs = []
+    for i in range(0, len(players) - 1, 2):
+        white, black = decide_colors(players[i], players[i+1], state)
+        pairs.append((white, black))
+    bye = players[-1] if len(players) % 2 == 1 else None
+    return pairs, bye
+
+# Веса рёбер для жеребьёвки через паросочетание максимального веса.
+# Штрафы упорядочены по важности: разница в очках важнее цвета, цвет важнее
+# того, кто именно «спустится» в следующую группу.
+PAIRING_CHUNK = 16
+BASE_WEIGHT = 10 ** 9
+REMATCH_PENALTY = 10 ** 8
+REPEAT_BYE_PENALTY = 10 ** 7
+SCORE_PENALTY = 10 ** 4
+COLOR_PENALTY = 10 ** 3
+# Множитель штрафа за одинаковые предпочтения по силе более слабого из двух
+COLOR_WEIGHTS = (0, 1, 2, 8)
+
+def _match_block(block, scores, played, byes, prefs, strengths, allow_rematch=False):
+    """Паросочетание для отрезка отсортированных игроков.
+
+    В block может быть None — это BYE. Повторные встречи и повторный BYE
+    без allow_rematch запрещены, с ним — штрафуются. Возвращает
+    (пары, неспаренные).
+    """
+    size = len(block)
+    low = min(scores[p] for p in block if p is not None)
+    edges = []
+    for a in range(size):
+        p1 = block[a]
+        for b in range(a + 1, size):
+            p2 = block[b]
+            if p1 is None or p2 is None:
+                p = p2 if p1 is None else p1
+                d = round(2 * (scores[p] - low))
+                w = BASE_WEIGHT - SCORE_PENALTY * d * d
+                if byes[p]:
+                    if not allow_rematch:
+                        continue
+                    w -= REPEAT_BYE_PENALTY
+            else:
+                w = BASE_WEIGHT + 2 * size - a - b
+                if played.get(p1, p2):
+                    if not allow_rematch:
+                        continue
+                    w -= REMATCH_PENALTY
+                d = round(2 * abs(scores[p1] - scores[p2]))
+                w -= SCORE_PENALTY * d * d
+                if prefs[p1] == prefs[p2]:
+                    w -= COLOR_PENALTY * COLOR_WEIGHTS[min(strengths[p1], strengths[p2])]
+            edges.append((a, b, w))
+    profiling.count("pairing.passes")
+    profiling.count("pairing.edges", len(edges))
+    mate = max_weight_matching(edges, maxcardinality=True)
+    mate += [-1] * (size - len(mate))
+    pairs = [(block[a], block[b]) for a, b in enumerate(mate) if b > a]
+    leftover = [block[a] for a in range(size) if mate[a] == -1]
+    return pairs, leftover
+
+@profiling.timed("pairing.swiss")
+def swiss_pairing_with_colors(players, state, current_round, total_rounds, rng=random):
+    """Жеребьёвка швейцарского тура через паросочетание максимального веса.
+
+    Игроки идут по убыванию очков и обрабатываются отрезками по
+    PAIRING_CHUNK человек; неспаренные «спускаются» в следующий отрезок.
+    Если в конце кто-то остался без пары, хвост расширяется вдвое вплоть до
+    всего поля, а если и это не помогает — разрешаются повторные встречи
+    и повторный BYE.
+    Так полная жеребьёвка без повторов находится всегда, когда она есть.
+    """
+    n = len(players)
+    is_odd = (n % 2 == 1)
+    scores = state.scores.tolist()
+    byes = state.byes.tolist()
+    played = state.played
+    sorted_players = sorted(players, key=lambda x: (-scores[x], rng.random()))
+    order = {p: i for i, p in enumerate(sorted_players)}
+    prefs = state.color_pref.tolist()
+    strengths = state.color_strength.tolist()
+
+    pairs = []
+    floaters = []
+    for start in range(0, n, PAIRING_CHUNK):
+        block = floaters + sorted_players[start:start + PAIRING_CHUNK]
+        if is_odd and start + PAIRING_CHUNK >= n:
+            block.append(None)
+        block_pairs, floaters = _match_block(block, scores, played, byes, prefs, strengths)
+        pairs.extend(block_pairs)
+
+    tail = 2 * PAIRING_CHUNK
+    allow_rematch = False
+    while floaters:
+        # Пересобираем хвост вместе с партнёрами попавших в него игроков
+        in_tail = set(sorted_players[-tail:]) | set(floaters)
+        kept = []
+        for p1, p2 in pairs:
+            if p1 is None or p2 is None or p1 in in_tail or p2 in in_tail:
+                in_tail.update((p1, p2))
+            else:
+                kept.append((p1, p2))
+        in_tail.discard(None)
+        block = sorted(in_tail, key=order.get)
+        if is_odd:
+            block.append(None)
+        block_pairs, leftover = _match_block(block, scores, played, byes, prefs, strengths, allow_rematch)
+        if not leftover or (tail >= n and allow_rematch):
+            pairs = kept + block_pairs
+            floaters = leftover
+        elif tail >= n:
+            allow_rematch = True
+            profiling.count("pairing.rematch_fallbacks")
+        else:
+            tail *= 2
+
+    bye = None
+    result = []
+    for p1, p2 in sorted(pairs, key=lambda pair: min(order.get(p, n) for p in pair)):
+        if p1 is None or p2 is None:
+            bye = p2 if p1 is None else p1
+            continue
+        white, black = decide_colors(p1, p2, state)
+        result.append((white, black))
+    return result, bye
+
+# =============== Поиск жеребьёвки по нескольким seed ===============
+
+# Каждый seed даёт свою жеребьёвку (порядок внутри групп очков). Качество —
+# штраф в тех же единицах, что и веса паросочетания: повторы, повторный BYE,
+# разница очков в парах, число флоатеров и невыполненные цветовые
+# предпочтения. Побеждает меньший штраф, при равенстве — меньший номер
+# кандидата, так что результат воспроизводим по seed.
+FLOAT_PENALTY = 10 ** 3
+SEARCH_BUDGET = 0.5
+
+def pairing_quality(state, pairs, bye):
+    """Штраф жеребьёвки тура (меньше — лучше)."""
+    penalty = 0
+    if pairs:
+        white, black = np.array(pairs, dtype=np.int64).T
+        diff = np.rint(2 * np.abs(state.scores[white] - state.scores[black])).astype(np.int64)
+        penalty += SCORE_PENALTY * int((diff * diff).sum()) + FLOAT_PENALTY * int((diff > 0).sum())
+        penalty += REMATCH_PENALTY * sum(state.played.get(w, b) for w, b in pairs)
+        weights = np.array(COLOR_WEIGHTS)
+        missed_white = state.color_pref[white] == BLACK
+        missed_black = state.color_pref[black] == WHITE
+        penalty += COLOR_PENALTY * int(weights[state.color_strength[white][missed_white]].sum()
+                                       + weights[state.color_strength[black][missed_black]].sum())
+    if bye is not None:
+        penalty += REPEAT_BYE_PENALTY * int(state.byes[bye] > 0)
+        penalty += SCORE_PENALTY * int(round(2 * state.scores[bye]))
+    return penalty
+
+def candidate_seeds(seed):
+    """Seed кандидатов: первый — сам seed, следующие выводятся из него."""
+    rng = random.Random(seed)
+    yield seed
+    while True:
+        yield rng.getrandbits(32)
+
+_search_state = None
+_search_players = None
+
+def _init_search(state, players):
+    global _search_state, _search_players
+    _search_state = state
+    _search_players = players
+
+def _pair_candidate(args):
+    seed, current_round, total_rounds = args
+    state = _search_state
+    pairs, bye = swiss_pairing_with_colors(
+        list(_search_players), state, current_round, total_rounds, random.Random(seed)
+    )
+    return pairing_quality(state, pairs, bye), pairs, bye
+
+@profiling.timed("pairing.search")
+def search_pairing(state, current_round, total_rounds, seed, budget=SEARCH_BUDGET, workers=None,
+                   players=None):
+    """Лучшая из жеребьёвок с разными seed, найденных за budget секунд.
+
+    Первый кандидат (сам seed) считается всегда, остальные — в пуле
+    процессов, пока не кончится время или не найдётся жеребьёвка без штрафа.
+    players — кого спаривать (по умолчанию всё поле). Возвращает словарь:
+    pairs, bye, seed победителя, его quality и число проверенных кандидатов.
+    """
+    started = time.perf_counter()
+    deadline = started + budget
+    if players is None:
+        players = list(range(state.n))
+    seeds = enumerate(candidate_seeds(seed))
+    _, first = next(seeds)
+    _init_search(state, players)
+    quality, pairs, bye = _pair_candidate((first, current_round, total_rounds))
+    best = (quality, 0, first, pairs, bye)
+    checked = 1
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        # Один процессор: кандидаты по очереди, пока следующий успевает в бюджет
+        one = time.perf_counter() - started
+        while best[0] and time.perf_counter() + one < deadline:
+            k, candidate = next(seeds)
+            quality, pairs, bye = _pair_candidate((candidate, current_round, total_rounds))
+            checked += 1
+            if quality < best[0]:
+                best = (quality, k, candidate, pairs, bye)
+    # Пул имеет смысл, только если до конца бюджета успеет ещё хотя бы один кандидат
+    elif quality and 2 * (time.perf_counter() - started) < budget:
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_search,
+                                   initargs=(state, players))
+        try:
+            pending = {}
+            for _ in range(workers):
+                k, candidate = next(seeds)
+                pending[pool.submit(_pair_candidate, (candidate, current_round, total_rounds))] = (k, candidate)
+            while pending and best[0] and time.perf_counter() < deadline:
+                done, _ = wait(pending, timeout=deadline - time.perf_counter(), return_when=FIRST_COMPLETED)
+                for future in done:
+                    k, candidate = pending.pop(future)
+                    quality, pairs, bye = future.result()
+                    checked += 1
+                    if (quality, k) < best[:2]:
+                        best = (quality, k, candidate, pairs, bye)
+                    if time.perf_counter() < deadline:
+                        k, candidate = next(seeds)
+                        pending[pool.submit(_pair_candidate, (candidate, current_round, total_rounds))] = (k, candidate)
+        finally:
+            # Недосчитанные кандидаты не ждём
+            pool.shutdown(wait=False, cancel_futures=True)
+    quality, _, seed, pairs, bye = best
+    profiling.count("pairing.search_candidates", checked)
+    return {"pairs": pairs, "bye": bye, "seed": seed, "quality": quality, "candidates": checked}
+
+def draw_round(state, players, current_round, total_rounds, seed, ranks=None, budget=None, workers=None):
+    """Жеребьёвка швейцарского тура по seed; возвращает (пары, bye, seed,
+    предупреждения).
+
+    Со стартовыми номерами ranks — голландская система (dutch_pairing,
+    budget ограничивает её время). Без них первый тур — случайные пары,
+    дальше — swiss_pairing_with_colors или, с budget (секунды), поиск по
+    нескольким seed (search_pairing; seed в ответе — победителя). Состояние
+    не меняется, поэтому функцию можно выполнять в другом процессе.
+    """
+    warnings = []
+    if ranks is not None:
+        pairs, bye, fallbacks = dutch_pairing(list(players), state, ranks, current_round, total_rounds,
+                                              random.Random(seed), budget or DUTCH_BUDGET)
+        if fallbacks:
+            warnings.append(f"Тур {current_round}: голландская система не уложилась в ограничение перебора, "
+                            f"групп спарено паросочетанием: {fallbacks}.")
+    elif current_round == 1:
+        pairs, bye = initial_pairing_with_colors(list(players), state, current_round, total_rounds,
+                                                 random.Random(seed))
+    elif budget:
+        found = search_pairing(state, current_round, total_rounds, seed, budget, workers, list(players))
+        pairs, bye, seed = found["pairs"], found["bye"], found["seed"]
+    else:
+        pairs, bye = swiss_pairing_with_colors(list(players), state, current_round, total_rounds,
+                                               random.Random(seed))
+    return pairs, bye, seed, warnings
+
+# =============== Голландская система ФИДЕ ===============
+
+# Жеребьёвка по правилам C.04.3. Игроки упорядочены по очкам, затем по
+# стартовому номеру (рейтинг по убыванию, затем имя). Группы очков
+# спариваются сверху вниз вместе с опущенными из верхних групп; в группе
+# верхняя половина S1 играет с нижней S2, кандидаты идут в порядке
+# перестановок S2, за ними — обменов между S1 и S2, а выбирается первый
+# с наименьшим штрафом по критериям качества (цвета, повторные флоаты).
+# Перебор идёт по заранее посчитанной матрице совместимости группы (не
+# играли, нет конфликта абсолютных цветов) и отсекает ветви, которые даже
+# с оценкой снизу (неизбежные нарушения цветов) хуже известного кандидата.
+# Наименьший штраф заранее даёт паросочетание (группы до DUTCH_MATCH_LIMIT)
+# или жадный кандидат, совпавший с оценкой снизу, и перебор кончается на
+# первом кандидате с этим штрафом. Время ограничено: при лимите узлов
+# берётся лучший из найденных, после дедлайна остаток поля спаривается
+# swiss_pairing_with_colors (с предупреждением). Если последнюю группу не
+# спарить целиком, она объединяется с предыдущими.
+MATCHING = "Паросочетание по очкам"
+DUTCH = "Голландская система ФИДЕ"
+PAIRING_SYSTEMS = (MATCHING, DUTCH)
+# Секунд на тур; начатая группа досчитывается, так что тур может выйти чуть дольше
+DUTCH_BUDGET = 2.0
+# Узлов перебора на одну попытку в группе
+DUTCH_NODES = 5_000
+# До такого размера группы наибольшее число пар и наименьший штраф
+# считаются паросочетанием, и перебор ищет первого кандидата с этим штрафом
+DUTCH_MATCH_LIMIT = 200
+# Больше такой группы сначала пробуется жадный кандидат
+DUTCH_GREEDY_FIRST = 64
+# До такого размера группы строки штрафов кэшируются
+DUTCH_ROW_CACHE = 1000
+DUTCH_BASE_WEIGHT = 10 ** 15
+# Штрафы критериев, по убыванию важности: опущенный снова остался без пары,
+# разница очков в паре, конфликт абсолютных цветов (только у лидеров
+# последнего тура), невыполненное предпочтение, невыполненное сильное,
+# повторный флоат в ту же сторону тур и два тура назад
+MDP_FLOAT_PENALTY = 10 ** 12
+SCORE_DIFF_PENALTY = 10 ** 8
+TOPSCORER_PENALTY = 10 ** 6
+PREFERENCE_PENALTY = 10 ** 4
+STRONG_PREFERENCE_PENALTY = 10 ** 3
+REPEAT_FLOAT_PENALTY = 10 ** 2
+REPEAT_FLOAT2_PENALTY = 10
+
+def seeding_ranks(players, ratings):
+    """Стартовые номера (0 — первый): по рейтингам ratings (список массивов,
+    сравниваются по очереди, больше — выше), затем по имени."""
+    order = sorted(range(len(players)), key=lambda p: tuple(-r[p] for r in ratings) + (players[p],))
+    ranks = np.empty(len(players), dtype=np.int64)
+    ranks[order] = np.arange(len(players))
+    return ranks
+
+class _Bracket:
+    """Группа очков с опущенными сверху: совместимость и штрафы по позициям.
+
+    Позиции 0..mdps-1 — опущенные (по очкам, затем по номеру), дальше —
+    игроки группы по стартовым номерам.
+    """
+
+    def __init__(self, members, mdps, state, current_round, total_rounds):
+        idx = np.asarray(members, dtype=np.int64)
+        k = len(idx)
+        self.members = members
+        self.mdps = mdps
+        self.scores = state.scores[idx]
+        self.prefs = state.color_pref[idx].astype(np.int64)
+        self.strengths = state.color_strength[idx].astype(np.int64)
+        # Конфликт абсолютных цветов допустим только между лидерами последнего тура
+        if current_round == total_rounds:
+            self.topscorers = self.scores > total_rounds / 2
+        else:
+            self.topscorers = np.zeros(k, dtype=bool)
+        played = np.array([state.played.row(p)[idx] for p in members]).reshape(k, k)
+        absolute = self.strengths == ABSOLUTE
+        conflict = (absolute[:, None] & absolute[None, :] & (self.prefs[:, None] == self.prefs[None, :])
+                    & ~(self.topscorers[:, None] & self.topscorers[None, :]))
+        self.compat = ~played & ~conflict
+        np.fill_diagonal(self.compat, False)
+        # Классы для оценки снизу: 0 — без предпочтения, 1/2 — хочет белых
+        # (слабое/сильное), 3/4 — хочет чёрных
+        strong = (self.strengths >= STRONG).astype(np.int64)
+        self.classes = np.where(self.strengths == 0, 0,
+                                np.where(self.prefs == WHITE, 1 + strong, 3 + strong)).tolist()
+        self.everyone = np.arange(k)
+        self.rows = {} if k <= DUTCH_ROW_CACHE else None
+
+        def floated(rnd, direction):
+            if rnd < 1:
+                return np.zeros(k, dtype=bool)
+            return state.floats[idx, rnd - 1] == direction
+
+        # Штраф апфлоатеру и флоатеру вниз за такой же флоат в прошлых турах
+        self.upfloat = (REPEAT_FLOAT_PENALTY * floated(current_round - 1, UP)
+                        + REPEAT_FLOAT2_PENALTY * floated(current_round - 2, UP))
+        self.float_pen = (REPEAT_FLOAT_PENALTY * floated(current_round - 1, DOWN)
+                          + REPEAT_FLOAT2_PENALTY * floated(current_round - 2, DOWN)
+                          + MDP_FLOAT_PENALTY * (np.arange(k) < mdps)).tolist()
+
+    def __len__(self):
+        return len(self.members)
+
+    def pair_costs(self, x, ys):
+        """Штрафы пар позиции x с позициями ys (массив)."""
+        if self.rows is None:
+            return self._costs(x, ys)
+        row = self.rows.get(x)
+        if row is None:
+            row = self.rows[x] = self._costs(x, self.everyone)
+        return row[ys]
+
+    def penalty(self, path):
+        """Штраф кандидата: [(x, y)], y = -1 — x без пары."""
+        return sum(self.float_pen[x] if y < 0 else int(self.pair_costs(x, y)) for x, y in path)
+
+    def _costs(self, x, ys):
+        d = np.rint(2 * (self.scores[ys] - self.scores[x])).astype(np.int64)
+        same = (self.prefs[ys] == self.prefs[x]) & (self.strengths[ys] > 0) & (self.strengths[x] > 0)
+        weaker = np.minimum(self.strengths[ys], self.strengths[x])
+        cost = SCORE_DIFF_PENALTY * d * d
+        cost += same * (PREFERENCE_PENALTY + STRONG_PREFERENCE_PENALTY * (weaker >= STRONG)
+                        + TOPSCORER_PENALTY * (weaker == ABSOLUTE))
+        # Апфлоатер — тот, у кого меньше очков
+        cost += np.where(d < 0, self.upfloat[ys], np.where(d > 0, self.upfloat[x], 0))
+        return cost
+
+    def class_counts(self):
+        counts = [0] * 5
+        for c in self.classes:
+            counts[c] += 1
+        return counts
+
+    @staticmethod
+    def color_bound(counts, floats):
+        """Оценка снизу штрафа за цвета у свободных игроков: counts — число
+        игроков по классам, floats — сколько останется без пары. Лишние из
+        большинства, которых не уравновесить, играют друг с другом, и пара
+        без игрока со слабым предпочтением нарушает сильное."""
+        white, black = counts[1] + counts[2], counts[3] + counts[4]
+        mild = counts[1] if white >= black else counts[3]
+        forced = max(0, abs(white - black) - counts[0] - floats) // 2
+        return forced * PREFERENCE_PENALTY + max(0, forced - mild) * STRONG_PREFERENCE_PENALTY
+
+    def lower_bound(self, floats):
+        """Оценка снизу штрафа любого кандидата группы: цвета плюс разница
+        очков у опущенных (пара с игроком группы считается целиком, пара
+        двух опущенных — пополам каждому)."""
+        bound = self.color_bound(self.class_counts(), floats)
+        mdps = self.mdps
+        for x in range(mdps):
+            d = np.rint(2 * (self.scores - self.scores[x])).astype(np.int64)
+            costs = SCORE_DIFF_PENALTY * d * d
+            options = [costs[mdps:][self.compat[x, mdps:]].min(initial=MDP_FLOAT_PENALTY * 10),
+                       costs[:mdps][self.compat[x, :mdps]].min(initial=MDP_FLOAT_PENALTY * 10) // 2]
+            if floats:
+                options.append(self.float_pen[x])
+            bound += int(min(options))
+        return bound
+
+    def options(self, x, free, floats, greedy):
+        """Варианты для позиции x: (партнёры, штрафы); -1 — x остаётся без пары.
+
+        Опущенный играет с игроками группы по номерам, затем с опущенными
+        ниже себя. Игрок группы — с S2 по порядку (перестановки), затем с
+        S1 снизу вверх (обмены); S1 — верхние p свободных, где p — сколько
+        пар ещё осталось составить.
+        """
+        mdps = self.mdps
+        compat = self.compat[x]
+        if x < mdps:
+            partners = np.concatenate([np.flatnonzero(free[mdps:] & compat[mdps:]) + mdps,
+                                       np.flatnonzero(free[x + 1:mdps] & compat[x + 1:mdps]) + x + 1])
+        else:
+            rest = np.flatnonzero(free[x:]) + x
+            p = (len(rest) - floats) // 2
+            if p:
+                s2 = rest[p:]
+                s1 = rest[p - 1:0:-1]
+                partners = np.concatenate([s2[compat[s2]], s1[compat[s1]]])
+            else:
+                partners = rest[:0]
+        costs = self.pair_costs(x, partners)
+        if floats:
+            partners = np.append(partners, -1)
+            costs = np.append(costs, self.float_pen[x])
+        if greedy:
+            ranked = np.argsort(costs, kind="stable")
+            partners, costs = partners[ranked], costs[ranked]
+        return partners.tolist(), costs.tolist()
+
+def _search_bracket(bracket, floats, deadline, greedy=False, bound=None, target=0):
+    """Перебор кандидатов группы с ровно floats игроками без пары.
+
+    Варианты каждого шага идут в порядке голландской системы, с greedy — по
+    возрастанию штрафа, и тогда перебор кончается на первом кандидате.
+    Ветви хуже bound (штраф известного кандидата) и хуже уже найденного
+    отсекаются, при равном штрафе остаётся более ранний кандидат; перебор
+    кончается на кандидате со штрафом не больше target (меньше не бывает).
+    Возвращает (штраф, [(x, y)] с y = -1 у флоатера, перебор исчерпан);
+    если кандидата нет — (None, None, исчерпан).
+    """
+    k = len(bracket)
+    free = np.ones(k, dtype=bool)
+    classes = bracket.classes
+    counts = bracket.class_counts()
+    best_pen, best_path = bound, None
+    path = []
+    pen = 0
+    nodes = 0
+    exhausted = True
+    stack = [[0, *bracket.options(0, free, floats, greedy), 0, None]] if k else []
+    while stack:
+        frame = stack[-1]
+        x, partners, costs, i, choice = frame
+        if choice is not None:
+            y, cost = choice
+            free[x] = True
+            counts[classes[x]] += 1
+            if y < 0:
+                floats += 1
+            else:
+                free[y] = True
+                counts[classes[y]] += 1
+            pen -= cost
+            path.pop()
+            frame[4] = None
+        if i == len(partners):
+            stack.pop()
+            continue
+        frame[3] = i + 1
+        y, cost = partners[i], costs[i]
+        if best_pen is not None:
+            counts[classes[x]] -= 1
+            if y >= 0:
+                counts[classes[y]] -= 1
+            least = pen + cost + bracket.color_bound(counts, floats - (y < 0))
+            counts[classes[x]] += 1
+            if y >= 0:
+                counts[classes[y]] += 1
+            if least > best_pen or (best_path is not None and least == best_pen):
+                continue
+        nodes += 1
+        if nodes % 256 == 0 and (nodes >= DUTCH_NODES or time.perf_counter() > deadline):
+            exhausted = False
+            break
+        free[x] = False
+        counts[classes[x]] -= 1
+        if y < 0:
+            floats -= 1
+        else:
+            free[y] = False
+            counts[classes[y]] -= 1
+        pen += cost
+        path.append((x, y))
+        frame[4] = (y, cost)
+        following = np.flatnonzero(free[x + 1:])
+        if len(following):
+            nx = int(following[0]) + x + 1
+            stack.append([nx, *bracket.options(nx, free, floats, greedy), 0, None])
+            continue
+        best_pen, best_path = pen, list(path)
+        if greedy or pen <= target:
+            break
+    profiling.count("dutch.nodes", nodes)
+    if best_path is None:
+        return None, None, exhausted
+    return best_pen, best_path, exhausted
+
+def _bracket_matching(bracket):
+    """Паросочетание наибольшей мощности с наименьшим штрафом (пары и
+    оставшиеся без пары): пары позиций."""
+    edges = []
+    for x in range(len(bracket)):
+        ys = np.flatnonzero(bracket.compat[x, x + 1:]) + x + 1
+        costs = bracket.pair_costs(x, ys).tolist()
+        for y, cost in zip(ys.tolist(), costs):
+            edges.append((x, y, DUTCH_BASE_WEIGHT - cost + bracket.float_pen[x] + bracket.float_pen[y]))
+    mate = max_weight_matching(edges, maxcardinality=True)
+    return [(x, y) for x, y in enumerate(mate) if y > x]
+
+def _pair_bracket(members, mdps, state, current_round, total_rounds, deadline, complete):
+    """Пары группы и её флоатеры вниз.
+
+    complete — последняя группа: без пары никто остаться не может.
+    Возвращает (пары, флоатеры, спарена ли запасным способом) или None,
+    если последнюю группу целиком не спарить.
+    """
+    bracket = _Bracket(members, mdps, state, current_round, total_rounds)
+    k = len(bracket)
+
+    def result(path, fell_back=False):
+        pairs = [(members[x], members[y]) for x, y in path if y >= 0]
+        floaters = {members[x] for x, y in path if y < 0}
+        return pairs, [p for p in members if p in floaters], fell_back
+
+    # Оценка сверху числа пар: без игроков, которым не с кем играть
+    floats = k - 2 * ((k - int((~bracket.compat.any(axis=1)).sum())) // 2)
+    greedy = None
+    if k > DUTCH_GREEDY_FIRST and not (complete and floats):
+        # В большой группе сначала жадный кандидат: если его штраф равен оценке
+        # снизу, он наименьший, и паросочетание не нужно
+        greedy = greedy_pen, greedy_path, _ = _search_bracket(bracket, floats, deadline, greedy=True)
+        if greedy_path is not None and greedy_pen <= bracket.lower_bound(floats):
+            _, path, _ = _search_bracket(bracket, floats, deadline, bound=greedy_pen, target=greedy_pen)
+            return result(path or greedy_path)
+
+    if k <= DUTCH_MATCH_LIMIT:
+        # Паросочетание даёт наибольшее число пар и наименьший штраф при нём:
+        # остаётся найти первого по порядку кандидата с тем же штрафом
+        matched = _bracket_matching(bracket)
+        paired = {x for pair in matched for x in pair}
+        matched += [(x, -1) for x in range(k) if x not in paired]
+        floats = k - len(paired)
+        if complete and floats:
+            return None
+        best = bracket.penalty(matched)
+        _, path, _ = _search_bracket(bracket, floats, deadline, bound=best, target=best)
+        if path is None:
+            # Не успели дойти до первого такого кандидата — берём паросочетание с тем же штрафом
+            profiling.count("dutch.truncated")
+            path = matched
+        return result(path)
+
+    while not (complete and floats):
+        greedy_pen, greedy_path, _ = greedy or _search_bracket(bracket, floats, deadline, greedy=True)
+        greedy = None
+        _, path, exhausted = _search_bracket(bracket, floats, deadline, bound=greedy_pen,
+                                             target=bracket.lower_bound(floats))
+        if path is not None or greedy_path is not None:
+            return result(path or greedy_path)
+        if not exhausted:
+            break
+        floats += 2
+    else:
+        return None
+    profiling.count("dutch.fallbacks")
+    pairs, floater = swiss_pairing_with_colors(list(members), state, current_round, total_rounds)
+    return pairs, [] if floater is None else [floater], True
+
+def _dutch_bye(order, state):
+    """BYE — последний по порядку, кто его ещё не получал (если таких нет — последний)."""
+    for player in reversed(order):
+        if not state.byes[player]:
+            return player
+    return order[-1]
+
+def _dutch_first_round(order, rng):
+    """Первый тур: S1 (верхняя половина по номерам) против S2, цвет первой
+    доски — жребием, дальше цвета игроков S1 чередуются."""
+    half = len(order) // 2
+    first = rng.choice((WHITE, BLACK))
+    pairs = []
+    for board, (p1, p2) in enumerate(zip(order[:half], order[half:])):
+        pairs.append((p1, p2) if (first == WHITE) == (board % 2 == 0) else (p2, p1))
+    return pairs
+
+@profiling.timed("pairing.dutch")
+def dutch_pairing(players, state, ranks, current_round, total_rounds, rng=random, budget=DUTCH_BUDGET):
+    """Жеребьёвка швейцарского тура по голландской системе ФИДЕ.
+
+    ranks — стартовые номера игроков (seeding_ranks). Укладывается в budget
+    секунд: после дедлайна оставшиеся группы спариваются
+    swiss_pairing_with_colors. Возвращает (пары, bye, число групп,
+    спаренных запасным способом).
+    """
+    deadline = time.perf_counter() + budget
+    scores = state.scores.tolist()
+    order = sorted(players, key=lambda p: (-scores[p], ranks[p]))
+    bye = None
+    if len(order) % 2 == 1:
+        bye = _dutch_bye(order, state)
+        order.remove(bye)
+    if current_round == 1:
+        return _dutch_first_round(order, rng), bye, 0
+
+    groups = []
+    for player in order:
+        if groups and scores[groups[-1][-1]] == scores[player]:
+            groups[-1].append(player)
+        else:
+            groups.append([player])
+    brackets = []  # (участники, пары) по группам — для объединения с последней
+    floaters = []
+    fallbacks = 0
+    for k, group in enumerate(groups):
+        if time.perf_counter() > deadline:
+            rest = floaters + [p for g in groups[k:] for p in g]
+            pairs, _ = swiss_pairing_with_colors(rest, state, current_round, total_rounds, rng)
+            brackets.append((rest, pairs))
+            fallbacks += 1
+            profiling.count("dutch.fallbacks")
+            break
+        members = floaters + group
+        last = k == len(groups) - 1
+        result = _pair_bracket(members, len(floaters), state, current_round, total_rounds, deadline, last)
+        while result is None:
+            # Последнюю группу не спарить: объединяем её с предыдущей
+            profiling.count("dutch.collapses")
+            if not brackets:
+                pairs, _ = swiss_pairing_with_colors(members, state, current_round, total_rounds, rng)
+                result = pairs, [], True
+                break
+            previous, _ = brackets.pop()
+            merged = set(previous)
+            members = previous + [p for p in members if p not in merged]
+            low = scores[group[0]]
+            mdps = sum(scores[p] > low for p in members)
+            result = _pair_bracket(members, mdps, state, current_round, total_rounds, deadline, True)
+        pairs, floaters, fell_back = result
+        fallbacks += fell_back
+        brackets.append((members, pairs))
+
+    result = [decide_colors(p1, p2, state, ranks) for _, pairs in brackets for p1, p2 in pairs]
+    # Доски: по старшему в паре, затем по сумме очков, затем по номеру старшего
+    result.sort(key=lambda pair: (-max(scores[pair[0]], scores[pair[1]]),
+                                  -(scores[pair[0]] + scores[pair[1]]), min(ranks[pair[0]], ranks[pair[1]])))
+    return result, bye, fallbacks
+
+# =============== Частичная пережеребьёвка ===============
+
+@profiling.timed("pairing.repair")
+def repair_pairing(players, state, pairs, bye, changed, current_round, total_rounds,
+                   old_scores=None, fixed=(), rng=random):
+    """Перестраивает опубликованную жеребьёвку после изменений у игроков changed.
+
+    players — все, кого надо спарить в туре (без выбывших, с опоздавшими).
+    Затронуты группы очков игроков changed: по нынешним очкам и по
+    old_scores (до исправления результата). Эти группы жеребьются заново
+    вместе с нынешними соперниками своих игроков (флоатерами), остальные
+    доски остаются как были; fixed — номера досок, которые трогать нельзя
+    (результат уже внесён). Если внутри затронутых групп не обойтись без
+    повторной встречи или повторного BYE, к ним добавляются соседние
+    группы, вплоть до всего поля.
+    Возвращает (пары, bye, число новых досок).
+    """
+    active = set(players)
+    scores = state.scores.tolist()
+    fixed = set(fixed)
+    partner = {}
+    for white, black in pairs:
+        partner[white] = black
+        partner[black] = white
+    locked = {p for board in fixed for p in pairs[board]}
+    # Без пары остались опоздавшие и соперники выбывших
+    orphans = {p for p in active if p != bye and partner.get(p) not in active} - locked
+    changed = set(changed) & active
+    groups = {scores[p] for p in changed | orphans}
+    if old_scores is not None:
+        groups.update(float(old_scores[p]) for p in changed)
+    all_groups = sorted({scores[p] for p in active})
+
+    while True:
+        affected = {p for p in active if scores[p] in groups} | changed | orphans
+        affected.update([partner[p] for p in affected if partner.get(p) in active])
+        affected -= locked
+        if bye in active and bye not in affected and len(affected) % 2:
+            affected.add(bye)
+        new_pairs, new_bye = swiss_pairing_with_colors(
+            sorted(affected), state, current_round, total_rounds, rng
+        )
+        complete = 2 * len(new_pairs) + (new_bye is not None) == len(affected)
+        repeats = any(state.played.get(w, b) for w, b in new_pairs) or (
+            new_bye is not None and state.byes[new_bye] > 0)
+        if (complete and not repeats) or groups.issuperset(all_groups):
+            break
+        # Соседние группы сверху и снизу от каждой затронутой
+        for k, score in enumerate(all_groups):
+            if score in groups:
+                groups.update(all_groups[max(k - 1, 0):k + 2])
+
+    kept = [pair for board, pair in enumerate(pairs)
+            if board in fixed or (pair[0] in active and pair[1] in active
+                                  and pair[0] not in affected and pair[1] not in affected)]
+    if bye in active and bye not in affected:
+        new_bye = bye
+    # Доски по старшему игроку: сохранённые остаются в прежнем порядке
+    result = sorted(kept + new_pairs, key=lambda pair: -max(scores[pair[0]], scores[pair[1]]))
+    old = {frozenset(pair) for pair in pairs}
+    return result, new_bye, sum(frozenset(pair) not in old for pair in new_pairs)
+
+def _empty_round():
+    return {"pairs": [], "bye": None, "results": [], "entered": [], "completed": False,
+            "seed": None, "quality": None}
+
+@profiling.timed("results.record")
+def _record_round(state, standings_index, rnd, round_results, bye):
+    """Записывает сыгранный тур в состояние и таблицу."""
+    if round_results:
+        white, black = np.array([(w, b) for w, b, _ in round_results], dtype=np.int64).T
+        state.record_floats(rnd, white, black, bye)
+    elif bye is not None:
+        state.record_floats(rnd, [], [], bye)
+    games = [(white, black, res) for white, black, res in round_results if res in WHITE_POINTS]
+    if games:
+        white, black, played = zip(*games)
+        white_points = np.array([WHITE_POINTS[res] for res in played])
+        state.record_games(np.array(white, dtype=np.int64), np.array(black, dtype=np.int64), white_points)
+    for white, black, res in round_results:
+        if res in FORFEITS:
+            state.record_forfeit(white, black, *FORFEITS[res])
+    if bye is not None:
+        state.record_bye(bye)
+    standings_index.update(state)
+
+@profiling.timed("standings.buchholz")
+def calculate_buchholz(state):
+    """Бухгольц всех игроков: сумма очков соперников по массиву партий."""
+    mask = state.opponent_mask()
+    return np.where(mask, state.scores[state.opponents], 0.0).sum(axis=1)
+
+# =============== Турнир ===============
+
+class Tournament:
+    """Состояние турнира и переходы между турами без привязки к интерфейсу."""
+
+    def __init__(self, players, tournament_type, total_rounds, ratings=None, seed=None, player_ids=None,
+                 pairing_system=MATCHING, surnames=None):
+        if tournament_type not in TOURNAMENT_TYPES:
+            raise ValueError(f"Неизвестный тип турнира: {tournament_type}")
+        if pairing_system not in PAIRING_SYSTEMS:
+            raise ValueError(f"Неизвестная система жеребьёвки: {pairing_system}")
+        if len(players) < 2:
+            raise ValueError("Нужно хотя бы два игрока.")
+        if len(set(players)) != len(players):
+            raise ValueError("Имена игроков должны быть уникальными.")
+        self.players = list(players)
+        self.tournament_type = tournament_type
+        self.pairing_system = pairing_system
+        self.total_rounds = total_rounds
+        self.ratings = dict(ratings or {})
+        self.player_ids = dict(player_ids or {})  # имя -> {"fshr_id", "fide_id"}
+        # имя -> фамилия, когда она известна отдельно (ростер, TRF): составная
+        # фамилия («Van Wely») иначе не отделяется от имени
+        self.surnames = dict(surnames or {})
+        # Без seed он всё равно выбирается явно и попадает в журнал (событие start),
+        # иначе восстановление без снимка вынимало бы другие seed туров
+        if seed is None:
+            seed = random.SystemRandom().getrandbits(32)
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.index = {name: i for i, name in enumerate(self.players)}
+        self.state = TournamentState(len(self.players), total_rounds)
+        self.standings_index = StandingsIndex(self.players)
+        self.round_robin_schedule = []
+        if self.is_round_robin:
+            self.round_robin_schedule = BergerSchedule(len(self.players), total_rounds)
+        self.tour_data = {rnd: _empty_round() for rnd in range(1, total_rounds + 1)}
+        # Снимки для отката: тур -> (снимок состояния, снимок таблицы) до его записи.
+        # В to_dict не входят; без них откат пересобирает состояние с начала.
+        self.history = {}
+        # Рейтинговые показатели по (рейтинг, рейтинг по умолчанию); сбрасываются с каждым туром
+        self._rating_reports = {}
+        self.withdrawn = set()
+        self.current_round = 0
+        self.completed = False
+        self.warnings = []
+        self.journal = None
+
+    @property
+    def is_round_robin(self):
+        return self.tournament_type in ROUND_ROBIN_TYPES
+
+    def _check_can_pair(self):
+        if self.completed or self.current_round >= self.total_rounds:
+            raise ValueError("Все туры уже сыграны.")
+        if self.current_round and not self.tour_data[self.current_round]["completed"]:
+            raise ValueError(f"Тур {self.current_round} ещё не завершён.")
+
+    @profiling.timed("round.pair")
+    def pair_next_round(self, budget=None, workers=None):
+        """Составляет пары следующего тура и делает его текущим.
+
+        С budget (секунды) швейцарский тур выбирается поиском по нескольким
+        seed (search_pairing); без него берётся жеребьёвка по seed тура.
+        """
+        self._check_can_pair()
+        rnd = self.current_round + 1
+        data = self.tour_data[rnd]
+        if data["pairs"]:
+            self.current_round = rnd
+            return data
+        if self.is_round_robin:
+            pairs, bye = self._pair_round_robin(rnd)
+            return self._publish(rnd, pairs, bye, [])
+        pairs, bye, seed, warnings = draw_round(*self.draw_args(), budget, workers)
+        return self.publish_draw(rnd, pairs, bye, seed, warnings)
+
+    @property
+    def ready_to_pair(self):
+        """Можно составлять следующий тур: текущий завершён, туры не кончились."""
+        return (not self.completed and self.current_round < self.total_rounds
+                and (not self.current_round or self.tour_data[self.current_round]["completed"]))
+
+    def draw_args(self):
+        """Аргументы draw_round для следующего швейцарского тура.
+
+        Здесь же вынимается seed тура, так что жеребьёвку можно посчитать
+        в другом процессе и опубликовать через publish_draw.
+        """
+        self._check_can_pair()
+        # Свой seed у каждого тура: по нему жеребьёвку можно повторить и проверить
+        seed = self.rng.getrandbits(32)
+        ranks = self.seeding_ranks() if self.pairing_system == DUTCH else None
+        return self.state, self.active_players(), self.current_round + 1, self.total_rounds, seed, ranks
+
+    def seeding_ranks(self):
+        """Стартовые номера для голландской системы: по рейтингу ФИДЕ, затем ФШР, затем по имени."""
+        return seeding_ranks(self.players, [player_ratings(self, "fide", 0), player_ratings(self, "nat", 0)])
+
+    def publish_draw(self, rnd, pairs, bye, seed, warnings=()):
+        """Публикует швейцарский тур, посчитанный draw_round, с предупреждениями."""
+        self._check_can_pair()
+        if rnd != self.current_round + 1:
+            raise ValueError(f"Ожидались пары тура {self.current_round + 1}, получены для тура {rnd}.")
+        warnings = list(warnings)
+        paired = len(pairs) * 2 + (1 if bye is not None else 0)
+        if paired < len(self.active_players()):
+            warnings.append(f"Не удалось спарить всех игроков в туре {rnd}.")
+        for white, black in pairs:
+            if self.state.played.get(white, black):
+                warnings.append(
+                    f"Повторная встреча в туре {rnd}: {self.players[white]} — {self.players[black]}."
+                )
+        return self._publish(rnd, pairs, bye, warnings, seed)
+
+    def apply_pairings(self, rnd, pairs, bye, warnings=(), seed=None):
+        """Публикует уже известные пары тура (например, при восстановлении из журнала)."""
+        self._check_can_pair()
+        if rnd != self.current_round + 1:
+            raise ValueError(f"Ожидались пары тура {self.current_round + 1}, получены для тура {rnd}.")
+        if not self.is_round_robin:
+            # Seed тура вынимается, как в draw_args: после восстановления из журнала
+            # следующие туры получают те же seed, что и без перерыва
+            self.rng.getrandbits(32)
+        return self._publish(rnd, [tuple(pair) for pair in pairs], bye, list(warnings), seed)
+
+    def _publish(self, rnd, pairs, bye, warnings, seed=None):
+        data = self.tour_data[rnd]
+        data["pairs"] = pairs
+        data["bye"] = bye
+        data["entered"] = [None] * len(pairs)
+        data["seed"] = seed
+        data["quality"] = None if self.is_round_robin else pairing_quality(self.state, pairs, bye)
+        self.warnings.extend(warnings)
+        self.current_round = rnd
+        self._log({"type": "pairings", "round": rnd, "pairs": pairs, "bye": bye,
+                   "warnings": warnings, "seed": seed})
+        return data
+
+    def active_players(self):
+        """Номера игроков, участвующих в жеребьёвке (без выбывших)."""
+        return [p for p in range(len(self.players)) if p not in self.withdrawn]
+
+    def _pair_round_robin(self, rnd):
+        pairs = []
+        bye = None
+        for white, black in self.round_robin_schedule[rnd - 1]:
+            if white is None:
+                bye = black
+            elif black is None:
+                bye = white
+            else:
+                pairs.append((white, black))
+        return pairs, bye
+
+    def _open_round(self):
+        data = self.tour_data.get(self.current_round)
+        if data is None or data["completed"]:
+            raise ValueError("Нет тура, ожидающего результатов.")
+        return data
+
+    def enter_results(self, results):
+        """Вносит часть результатов текущего тура, не завершая его.
+
+        results — словарь {номер доски с 0: результат}; None стирает
+        введённый результат. Возвращает число досок без результата.
+        """
+        data = self._open_round()
+        results = {int(board): res for board, res in results.items()}
+        for board, res in results.items():
+            if not 0 <= board < len(data["pairs"]):
+                raise ValueError(f"Нет доски {board + 1}.")
+            if res is not None and res not in RESULTS:
+                raise ValueError(f"Неизвестный результат: {res}")
+        for board, res in results.items():
+            data["entered"][board] = res
+        if results:
+            self._log({"type": "entered", "round": self.current_round,
+                       "results": [[board, res] for board, res in sorted(results.items())]})
+        return data["entered"].count(None)
+
+    def submit_results(self, results=None):
+        """Записывает результаты текущего тура и завершает его.
+
+        results — по одному на доску в порядке досок; без аргумента берутся
+        результаты, внесённые через enter_results (все доски должны быть
+        заполнены).
+        """
+        rnd = self.current_round
+        data = self._open_round()
+        if results is None:
+            missing = [board + 1 for board, res in enumerate(data["entered"]) if res is None]
+            if missing:
+                raise ValueError(f"Нет результатов на досках: {', '.join(map(str, missing[:10]))}"
+                                 + (" и др." if len(missing) > 10 else "") + ".")
+            results = list(data["entered"])
+        if len(results) != len(data["pairs"]):
+            raise ValueError(f"Ожидалось {len(data['pairs'])} результатов, получено {len(results)}.")
+        for res in results:
+            if res not in RESULTS:
+                raise ValueError(f"Неизвестный результат: {res}")
+
+        data["results"] = [(white, black, res) for (white, black), res in zip(data["pairs"], results)]
+        data["entered"] = list(results)
+        data["completed"] = True
+        self._record(rnd)
+        if rnd == self.total_rounds:
+            self.completed = True
+        self._log({"type": "results", "round": rnd, "results": list(results)})
+        return data
+
+    # =============== Изменения по ходу турнира ===============
+
+    def withdraw(self, player, repair=True):
+        """Снимает игрока с турнира: в следующих турах он не жеребьётся.
+
+        Если тур опубликован и не сыгран, его доска перестраивается
+        (repair_round); сыгранные партии и очки остаются.
+        """
+        self._check_swiss()
+        if player in self.withdrawn:
+            raise ValueError(f"{self.players[player]} уже выбыл.")
+        self.withdrawn.add(player)
+        self._log({"type": "withdraw", "player": player})
+        if repair and self._round_open():
+            return self.repair_round([player])
+        return 0
+
+    def add_player(self, name, ratings=None, ids=None, repair=True):
+        """Добавляет опоздавшего игрока с нулём очков за пропущенные туры.
+
+        Если тур опубликован и не сыгран, игрок включается в него
+        перестройкой затронутых досок. Возвращает номер игрока.
+        """
+        self._check_swiss()
+        if self.completed:
+            raise ValueError("Турнир уже завершён.")
+        if not name:
+            raise ValueError("Не указано имя игрока.")
+        if name in self.index:
+            raise ValueError(f"Игрок «{name}» уже есть в турнире.")
+        player = len(self.players)
+        self.players.append(name)
+        self.index[name] = player
+        if ratings:
+            self.ratings[name] = dict(ratings)
+        if ids:
+            self.player_ids[name] = dict(ids)
+        self.state.add_player()
+        self.standings_index.add_player(name)
+        self._rating_reports = {}
+        self._log({"type": "add_player", "name": name, "ratings": ratings, "ids": ids})
+        if repair and self._round_open():
+            self.repair_round([player])
+        return player
+
+    def correct_result(self, rnd, board, result, repair=True):
+        """Исправляет результат доски board (с 0) уже завершённого тура rnd.
+
+        Очки и таблица пересчитываются по сыгранным турам; если следующий
+        тур уже опубликован, перестраиваются только группы очков, которых
+        коснулось исправление. Возвращает число новых досок.
+        """
+        data = self.tour_data.get(rnd)
+        if data is None or not data["completed"]:
+            raise ValueError(f"Тур {rnd} ещё не завершён.")
+        if not 0 <= board < len(data["results"]):
+            raise ValueError(f"Нет доски {board + 1}.")
+        if result not in RESULTS:
+            raise ValueError(f"Неизвестный результат: {result}")
+        white, black, old = data["results"][board]
+        if result == old:
+            return 0
+        data["results"][board] = (white, black, result)
+        data["entered"][board] = result
+        old_scores = self.state.scores.copy()
+        # Откат к туру перед исправленным и повторная запись туров после него
+        last = self._last_completed()
+        self._rewind(rnd - 1)
+        for later in range(rnd, last + 1):
+            self._record(later)
+        self._log({"type": "correction", "round": rnd, "board": board, "result": result})
+        if repair and not self.is_round_robin and self._round_open():
+            changed = np.flatnonzero(self.state.scores != old_scores).tolist()
+            return self.repair_round(changed, old_scores)
+        return 0
+
+    def repair_round(self, changed, old_scores=None):
+        """Перестраивает опубликованный тур вокруг игроков changed (repair_pairing).
+
+        Доски с уже внесённым результатом не трогаются, внесённые
+        результаты остальных сохранённых досок переходят на их новые номера.
+        Возвращает число новых досок.
+        """
+        self._check_swiss()
+        rnd = self.current_round
+        data = self._open_round()
+        fixed = [board for board, res in enumerate(data["entered"]) if res is not None]
+        pairs, bye, rebuilt = repair_pairing(
+            self.active_players(), self.state, data["pairs"], data["bye"], changed,
+            rnd, self.total_rounds, old_scores, fixed, random.Random(data["seed"])
+        )
+        self.apply_repair(rnd, pairs, bye)
+        return rebuilt
+
+    def apply_repair(self, rnd, pairs, bye):
+        """Заменяет пары опубликованного тура (перестройка или восстановление из журнала)."""
+        data = self._open_round()
+        if rnd != self.current_round:
+            raise ValueError(f"Тур {rnd} не текущий.")
+        pairs = [tuple(pair) for pair in pairs]
+        entered = {pair: res for pair, res in zip(data["pairs"], data["entered"])}
+        data["pairs"] = pairs
+        data["bye"] = bye
+        data["entered"] = [entered.get(pair) for pair in pairs]
+        data["quality"] = pairing_quality(self.state, pairs, bye)
+        self._log({"type": "repair", "round": rnd, "pairs": pairs, "bye": bye})
+        return data
+
+    def rollback(self, rnd):
+        """Откатывает турнир к концу тура rnd (0 — к началу).
+
+        Пары и результаты следующих туров удаляются; очки и таблица
+        возвращаются по снимкам туров. Выбывшие и опоздавшие остаются.
+        """
+        if not 0 <= rnd <= self._last_completed():
+            raise ValueError(f"Нельзя откатиться к туру {rnd}: доступны туры 0–{self._last_completed()}.")
+        self._rewind(rnd)
+        for later in range(rnd + 1, self.total_rounds + 1):
+            self.tour_data[later] = _empty_round()
+        self.current_round = rnd
+        self.completed = False
+        self._log({"type": "rollback", "round": rnd})
+
+    def _last_completed(self):
+        rnd = self.current_round
+        return rnd if rnd and self.tour_data[rnd]["completed"] else max(rnd - 1, 0)
+
+    def _record(self, rnd):
+        """Записывает завершённый тур rnd в очки и таблицу, сохраняя снимок для отката."""
+        data = self.tour_data[rnd]
+        players = [p for white, black, _ in data["results"] for p in (white, black)]
+        if data["bye"] is not None:
+            players.append(data["bye"])
+        games = [(white, black) for white, black, res in data["results"] if res in WHITE_POINTS]
+        self.history[rnd] = (self.state.round_snapshot(rnd, players, games), self.standings_index.snapshot())
+        _record_round(self.state, self.standings_index, rnd, data["results"], data["bye"])
+        self._rating_reports = {}
+        if profiling.enabled():
+            profiling.gauge("state.players", self.state.n)
+            profiling.gauge("state.bytes", sum(getattr(self.state, name).nbytes for name in self.state.ARRAYS)
+                            + len(self.state.played.bits))
+
+    def _rewind(self, rnd):
+        """Возвращает очки и таблицу к концу тура rnd; tour_data не меняется."""
+        last = self._last_completed()
+        if all(later in self.history for later in range(rnd + 1, last + 1)):
+            for later in range(last, rnd, -1):
+                state_snapshot, standings_snapshot = self.history.pop(later)
+                self.state.restore_round(state_snapshot)
+                self.standings_index.restore(standings_snapshot)
+        else:
+            self._replay(rnd)
+        self._rating_reports = {}
+
+    def _check_swiss(self):
+        if self.is_round_robin:
+            raise ValueError("В круговом турнире состав и пары задаются расписанием.")
+
+    def _round_open(self):
+        data = self.tour_data.get(self.current_round)
+        return data is not None and not data["completed"]
+
+    def _replay(self, upto):
+        """Пересобирает очки и таблицу с начала по турам 1..upto (нет снимков)."""
+        self.state = TournamentState(len(self.players), self.total_rounds)
+        self.standings_index = StandingsIndex(self.players)
+        self.history = {}
+        for rnd in range(1, upto + 1):
+            self._record(rnd)
+
+    def _log(self, event):
+        if self.journal is not None:
+            self.journal.append(event, self)
+
+    # =============== Сохранение ===============
+
+    def to_dict(self):
+        """Полное состояние турнира в JSON-совместимом виде (для снимков журнала)."""
+        version, internal, gauss = self.rng.getstate()
+        return {
+            "players": self.players,
+            "tournament_type": self.tournament_type,
+            "pairing_system": self.pairing_system,
+            "total_rounds": self.total_rounds,
+            "ratings": self.ratings,
+            "player_ids": self.player_ids,
+            "surnames": self.surnames,
+            "seed": self.seed,
+            "rng": [version, list(internal), gauss],
+            "state": self.state.to_dict(),
+            "standings": self.standings_index.to_dict(),
+            "tour_data": [self.tour_data[rnd] for rnd in range(1, self.total_rounds + 1)],
+            "withdrawn": sorted(self.withdrawn),
+            "current_round": self.current_round,
+            "completed": self.completed,
+            "warnings": self.warnings,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        tournament = cls(data["players"], data["tournament_type"], data["total_rounds"],
+                         ratings=data["ratings"], seed=data["seed"], player_ids=data.get("player_ids"),
+                         pairing_system=data.get("pairing_system", MATCHING), surnames=data.get("surnames"))
+        version, internal, gauss = data["rng"]
+        tournament.rng.setstate((version, tuple(internal), gauss))
+        tournament.state = TournamentState.from_dict(data["state"])
+        tournament.standings_index = StandingsIndex.from_dict(tournament.players, data["standings"])
+        for rnd, rnd_data in enumerate(data["tour_data"], 1):
+            tournament.tour_data[rnd] = {
+                "pairs": [tuple(pair) for pair in rnd_data["pairs"]],
+                "bye": rnd_data["bye"],
+                "results": [tuple(result) for result in rnd_data["results"]],
+                "entered": list(rnd_data.get("entered") or [None] * len(rnd_data["pairs"])),
+                "completed": rnd_data["completed"],
+                "seed": rnd_data.get("seed"),
+                "quality": rnd_data.get("quality"),
+            }
+        tournament.withdrawn = set(data.get("withdrawn", ()))
+        tournament.current_round = data["current_round"]
+        tournament.completed = data["completed"]
+        tournament.warnings = list(data["warnings"])
+        return tournament
+
+    def name(self, player):
+        """Имя игрока по номеру (None — BYE)."""
+        return None if player is None else self.players[player]
+
+    def rating_report(self, rating_key="fide", default_rating=1000):
+        """Ожидаемый результат, изменение рейтинга, перформанс и средний рейтинг
+        соперников всех игроков (rating.rating_report) по сыгранным турам.
+
+        Считается одним проходом по массивам партий при первом обращении
+        после тура; игроки без рейтинга идут с default_rating.
+        """
+        key = (rating_key, default_rating)
+        if key not in self._rating_reports:
+            ratings = player_ratings(self, rating_key, default_rating)
+            with profiling.timer("rating.report"):
+                self._rating_reports[key] = rating_report(self.state, ratings)
+        return self._rating_reports[key]
+
+    def standings(self):
+        """Строки таблицы (словари) по убыванию очков и Бухгольца.
+
+        Таблица пересчитывается только при завершении тура, поэтому вызов
+        между турами ничего не стоит.
+        """
+        return self.standings_index.rows
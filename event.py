@@ -0,0 +1,154 @@
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from engine import draw_round
+from journal import Journal, EVENTS_FILE
+
+# Соревнование из нескольких групп (A/B/C, юноши, блиц): каждая группа —
+# отдельный Tournament со своим типом, числом туров и журналом в подкаталоге
+# каталога соревнования. Список групп хранится в event.json.
+#
+# Следующий тур нескольких групп считается параллельно: швейцарские
+# жеребьёвки — в пуле процессов (паросочетание на чистом Python упирается в
+# GIL, поэтому потоки не помогли бы), круговые — по расписанию на месте.
+# Публикация и журнал — в основном процессе, в порядке групп.
+
+EVENT_FILE = "event.json"
+# Журнал, лежащий прямо в каталоге (турнир до появления групп), открывается как группа с этим именем
+LEGACY_SECTION = "Турнир"
+
+class Event:
+    """Группы одного соревнования с журналами в каталоге path."""
+
+    def __init__(self, path):
+        self.path = path
+        self.event_path = os.path.join(path, EVENT_FILE)
+        self.directories = {}  # имя группы -> подкаталог журнала
+        self.sections = {}     # имя группы -> Tournament
+        self.journals = {}
+        self.broken = {}       # имя группы -> ошибка восстановления её журнала
+        self._next = 1
+        self._event_stamp = None  # (inode, mtime) event.json, каким его видела эта сессия
+        os.makedirs(path, exist_ok=True)
+
+    def restore(self):
+        """Читает список групп и восстанавливает каждую из её журнала.
+
+        Группы, журнал которых так и не начался, из списка убираются.
+        Группа, которая не восстановилась, остаётся в broken с ошибкой, пока
+        её не уберут remove_section. Возвращает список ошибок по группам.
+        """
+        errors = []
+        self._event_stamp = self._stamp()
+        if os.path.exists(self.event_path):
+            with open(self.event_path, encoding="utf-8") as f:
+                data = json.load(f)
+            self.directories = dict(data["sections"])
+            self._next = data["next"]
+        elif os.path.exists(os.path.join(self.path, EVENTS_FILE)):
+            self.directories = {LEGACY_SECTION: "."}
+        listed = dict(self.directories)
+        for name, directory in list(self.directories.items()):
+            journal = Journal(os.path.join(self.path, directory))
+            try:
+                tournament = journal.restore()
+            except (OSError, ValueError, KeyError) as e:
+                errors.append(f"{name}: {e}")
+                self.broken[name] = str(e)
+                self.journals[name] = journal
+                continue
+            if tournament is None:
+                del self.directories[name]
+                continue
+            self.sections[name] = tournament
+            self.journals[name] = journal
+        # Список переписывается, только если изменился: иначе другие сессии сочли бы его чужой правкой
+        if self.directories != listed or self._event_stamp is None:
+            self._save()
+        return errors
+
+    def _stamp(self):
+        try:
+            stat = os.stat(self.event_path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns)
+
+    def stale(self):
+        """True, если другая сессия изменила список групп или журнал одной из них:
+        тогда соревнование нужно заново прочитать restore в новом Event."""
+        return self._stamp() != self._event_stamp or any(journal.changed() for journal in self.journals.values())
+
+    def add_section(self, name):
+        """Заводит группу name и возвращает её журнал.
+
+        Турнир группы начинает журнал сам (Journal.start или
+        build_tournament(journal=...)), после чего кладётся в sections[name].
+        """
+        name = name.strip()
+        if not name:
+            raise ValueError("Не указано название группы.")
+        if name in self.broken:
+            raise ValueError(f"Группа «{name}» не восстановилась из журнала: уберите её, чтобы создать заново.")
+        if name in self.directories:
+            raise ValueError(f"Группа «{name}» уже есть.")
+        directory = f"section-{self._next}"
+        self._next += 1
+        self.directories[name] = directory
+        self.journals[name] = Journal(os.path.join(self.path, directory))
+        self._save()
+        return self.journals[name]
+
+    def remove_section(self, name):
+        """Убирает группу из соревнования (в том числе не восстановившуюся); её журнал архивируется."""
+        journal = self.journals.pop(name, None)
+        if journal is not None:
+            journal.archive()
+        self.sections.pop(name, None)
+        self.broken.pop(name, None)
+        self.directories.pop(name, None)
+        self._save()
+
+    def ready(self):
+        """Группы, в которых можно составлять следующий тур."""
+        return [name for name, tournament in self.sections.items() if tournament.ready_to_pair]
+
+    def pair_next_rounds(self, names=None, budget=None, workers=None):
+        """Составляет следующий тур в группах names (по умолчанию во всех готовых).
+
+        Швейцарские жеребьёвки двух и более групп идут в пуле процессов,
+        начиная с самой большой группы, так что общий шаг длится примерно
+        как жеребьёвка самой большой. Поиск с budget внутри группы тогда
+        идёт в её процессе последовательно. Возвращает {группа: данные тура}.
+        """
+        names = [name for name in (names or self.ready()) if self.sections[name].ready_to_pair]
+        draws = {}
+        published = {}
+        for name in names:
+            tournament = self.sections[name]
+            if tournament.is_round_robin:
+                published[name] = tournament.pair_next_round()
+            else:
+                draws[name] = tournament.draw_args()
+        workers = min(len(draws), workers or os.cpu_count() or 1)
+        if workers > 1:
+            largest_first = sorted(draws, key=lambda name: -len(draws[name][1]))
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = {name: pool.submit(draw_round, *draws[name], budget, 1) for name in largest_first}
+                results = {name: future.result() for name, future in futures.items()}
+        else:
+            results = {name: draw_round(*args, budget) for name, args in draws.items()}
+        for name in names:
+            if name in results:
+                rnd = draws[name][2]
+                published[name] = self.sections[name].publish_draw(rnd, *results[name])
+        return {name: published[name] for name in names}
+
+    def _save(self):
+        data = {"sections": list(self.directories.items()), "next": self._next}
+        tmp_path = self.event_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, self.event_path)
+        self._event_stamp = self._stamp()
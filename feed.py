@@ -0,0 +1,315 @@
+import argparse
+import email.utils
+import gzip
+import hashlib
+import html
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Лента для зрителей: пары, результаты и таблица текущего турнира в виде
+# готовых файлов feed.json и index.html. Файлы пишет журнал каждой группы
+# (подкаталог feed журнала), когда тур опубликован, завершён или исправлен,
+# а отдаёт отдельный процесс по каталогу соревнования:
+#
+#   python feed.py --dir journal --port 8502
+#
+# На / — список групп из event.json, лента группы — под префиксом её
+# подкаталога: /section-1/ и /section-1/feed.json.
+# Сервер держит файлы в памяти и перечитывает их только при смене mtime;
+# ответы несут ETag и Last-Modified, повторный запрос с If-None-Match или
+# If-Modified-Since получает 304 без тела. Сжатая копия готовится там же.
+
+FEED_JSON = "feed.json"
+FEED_HTML = "index.html"
+# События журнала, после которых лента пересобирается
+FEED_EVENTS = ("start", "pairings", "results", "repair", "correction", "rollback",
+               "withdraw", "add_player")
+REFRESH_SECONDS = 60
+DEFAULT_PORT = 8502
+DEFAULT_DIR = os.environ.get("TOURNAMENT_JOURNAL_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "journal"))
+FEED_DIR = "feed"
+# Префикс URL для журнала, лежащего прямо в каталоге соревнования (до появления групп)
+LEGACY_PREFIX = "tournament"
+
+def feed_data(tournament):
+    """Содержимое ленты: туры с досками и результатами, таблица."""
+    rounds = []
+    for rnd in range(1, tournament.current_round + 1):
+        data = tournament.tour_data[rnd]
+        if data["completed"]:
+            boards = data["results"]
+        else:
+            boards = [(white, black, None) for white, black in data["pairs"]]
+        rounds.append({
+            "round": rnd,
+            "completed": data["completed"],
+            "boards": [
+                {"board": board, "white": tournament.name(white), "black": tournament.name(black), "result": res}
+                for board, (white, black, res) in enumerate(boards, 1)
+            ],
+            "bye": tournament.name(data["bye"]),
+        })
+    return {
+        "updated": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "tournament_type": tournament.tournament_type,
+        "total_rounds": tournament.total_rounds,
+        "current_round": tournament.current_round,
+        "completed": tournament.completed,
+        "rounds": rounds,
+        "standings": tournament.standings(),
+    }
+
+def render_html(feed):
+    """Страница для зрителей: последний тур и таблица."""
+    esc = html.escape
+    parts = [
+        "<!DOCTYPE html><html lang=\"ru\"><head><meta charset=\"utf-8\">",
+        f"<meta http-equiv=\"refresh\" content=\"{REFRESH_SECONDS}\">",
+        "<meta name=\"viewport\" content=\"width=device-width, initial-scale=1\">",
+        "<title>Шахматный турнир</title>",
+        "<style>body{font-family:sans-serif;margin:1em}table{border-collapse:collapse}"
+        "td,th{border:1px solid #ccc;padding:2px 8px}td.n{text-align:right}</style>",
+        "</head><body>",
+        f"<h1>{esc(feed['tournament_type'])}</h1>",
+        f"<p>Тур {feed['current_round']} из {feed['total_rounds']}. Обновлено {esc(feed['updated'])}.</p>",
+    ]
+    if feed["rounds"]:
+        current = feed["rounds"][-1]
+        status = "результаты" if current["completed"] else "пары"
+        parts.append(f"<h2>Тур {current['round']}: {status}</h2>")
+        parts.append("<table><tr><th>Доска</th><th>Белые</th><th>Результат</th><th>Чёрные</th></tr>")
+        for board in current["boards"]:
+            parts.append(f"<tr><td class=\"n\">{board['board']}</td><td>{esc(board['white'])}</td>"
+                         f"<td>{esc(board['result'] or '')}</td><td>{esc(board['black'])}</td></tr>")
+        parts.append("</table>")
+        if current["bye"] is not None:
+            parts.append(f"<p>BYE: {esc(current['bye'])}</p>")
+    parts.append("<h2>Таблица</h2>")
+    parts.append("<table><tr><th>Место</th><th>Имя</th><th>Очки</th><th>Бухгольц</th><th>Бергер</th></tr>")
+    for row in feed["standings"]:
+        parts.append(f"<tr><td class=\"n\">{row['place']}</td><td>{esc(row['name'])}</td>"
+                     f"<td class=\"n\">{row['score']:.1f}</td><td class=\"n\">{row['buchholz']:.1f}</td>"
+                     f"<td class=\"n\">{row['sonneborn_berger']:.2f}</td></tr>")
+    parts.append("</table></body></html>")
+    return "".join(parts)
+
+def read_sections(directory):
+    """Группы соревнования в directory: [(имя, префикс URL, подкаталог журнала)]."""
+    # event.py импортирует журнал, а журнал — этот модуль, поэтому импорт здесь
+    from event import EVENT_FILE, LEGACY_SECTION
+    from journal import EVENTS_FILE
+    event_path = os.path.join(directory, EVENT_FILE)
+    if os.path.exists(event_path):
+        with open(event_path, encoding="utf-8") as f:
+            sections = json.load(f)["sections"]
+    elif os.path.exists(os.path.join(directory, EVENTS_FILE)):
+        sections = [(LEGACY_SECTION, ".")]
+    else:
+        return []
+    return [(name, LEGACY_PREFIX if path == "." else path, path) for name, path in sections]
+
+def render_sections(sections):
+    """Страница со ссылками на ленты групп."""
+    esc = html.escape
+    parts = [
+        "<!DOCTYPE html><html lang=\"ru\"><head><meta charset=\"utf-8\">",
+        f"<meta http-equiv=\"refresh\" content=\"{REFRESH_SECONDS}\">",
+        "<meta name=\"viewport\" content=\"width=device-width, initial-scale=1\">",
+        "<title>Шахматный турнир</title>",
+        "<style>body{font-family:sans-serif;margin:1em}</style></head><body><h1>Группы</h1><ul>",
+    ]
+    for name, prefix, _ in sections:
+        parts.append(f"<li><a href=\"/{esc(prefix)}/\">{esc(name)}</a></li>")
+    parts.append("</ul></body></html>")
+    return "".join(parts)
+
+def _write_atomic(path, text):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+def write_feed(tournament, directory):
+    """Пересобирает feed.json и index.html в directory (атомарная замена файлов)."""
+    os.makedirs(directory, exist_ok=True)
+    feed = feed_data(tournament)
+    _write_atomic(os.path.join(directory, FEED_JSON), json.dumps(feed, ensure_ascii=False, separators=(",", ":")))
+    _write_atomic(os.path.join(directory, FEED_HTML), render_html(feed))
+
+class FeedCache:
+    """Файлы лент групп в памяти с ETag; перечитываются, только когда сменился mtime.
+
+    directory — каталог соревнования; список групп берётся из его event.json.
+    """
+
+    CONTENT_TYPES = {FEED_JSON: "application/json; charset=utf-8", FEED_HTML: "text/html; charset=utf-8"}
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.files = {}
+        self.sections = None  # (mtime_ns event.json, {префикс: подкаталог}, запись страницы групп)
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _entry(body, mtime, mtime_ns, content_type):
+        return {
+            "body": body,
+            "gzip": gzip.compress(body, 6),
+            "etag": '"' + hashlib.sha1(body).hexdigest()[:20] + '"',
+            "modified": email.utils.formatdate(mtime, usegmt=True),
+            "mtime": int(mtime),
+            "mtime_ns": mtime_ns,
+            "content_type": content_type,
+        }
+
+    def _sections(self):
+        """(префикс -> подкаталог, запись страницы групп) или (пусто, None) без журнала."""
+        from event import EVENT_FILE
+        try:
+            stat = os.stat(os.path.join(self.directory, EVENT_FILE))
+        except FileNotFoundError:
+            # Без event.json — один журнал прямо в каталоге или ещё ничего
+            stat = None
+        mtime_ns = stat.st_mtime_ns if stat else None
+        cached = self.sections
+        if cached is not None and cached[0] == mtime_ns and (stat or cached[2] is not None):
+            return cached[1], cached[2]
+        with self.lock:
+            sections = read_sections(self.directory)
+            page = None
+            if sections:
+                mtime = stat.st_mtime if stat else time.time()
+                page = self._entry(render_sections(sections).encode("utf-8"), mtime, mtime_ns,
+                                   self.CONTENT_TYPES[FEED_HTML])
+            self.sections = (mtime_ns, {prefix: path for _, prefix, path in sections}, page)
+        return self.sections[1], self.sections[2]
+
+    def index(self):
+        """Запись страницы со списком групп или None, если журнала ещё нет."""
+        return self._sections()[1]
+
+    def get(self, prefix, name):
+        """Запись {body, gzip, etag, modified, mtime, content_type} файла name
+        ленты группы с префиксом prefix или None, если такой группы или файла нет."""
+        directory = self._sections()[0].get(prefix)
+        if directory is None:
+            return None
+        path = os.path.join(self.directory, directory, FEED_DIR, name)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        key = (prefix, name)
+        entry = self.files.get(key)
+        if entry is not None and entry["mtime_ns"] == stat.st_mtime_ns:
+            return entry
+        with self.lock:
+            entry = self.files.get(key)
+            if entry is None or entry["mtime_ns"] != stat.st_mtime_ns:
+                with open(path, "rb") as f:
+                    body = f.read()
+                entry = self._entry(body, stat.st_mtime, stat.st_mtime_ns, self.CONTENT_TYPES[name])
+                self.files[key] = entry
+        return entry
+
+class FeedHandler(BaseHTTPRequestHandler):
+    """GET/HEAD для / (список групп), /<группа>/ (index.html) и
+    /<группа>/feed.json; прочие пути — 404."""
+
+    cache = None
+    # Заголовки и тело уходят двумя записями: без этого ответ ждёт задержанный ACK
+    disable_nagle_algorithm = True
+    ROUTES = {"": FEED_HTML, "index.html": FEED_HTML, "feed.json": FEED_JSON}
+
+    def do_GET(self):
+        self._respond(body=True)
+
+    def do_HEAD(self):
+        self._respond(body=False)
+
+    def _respond(self, body):
+        path = self.path.split("?", 1)[0].lstrip("/")
+        if path in ("", "index.html"):
+            known = True
+            entry = self.cache.index()
+        else:
+            prefix, _, rest = path.partition("/")
+            name = self.ROUTES.get(rest)
+            known = name is not None
+            entry = self.cache.get(prefix, name) if known else None
+        if entry is None:
+            # Строка статуса — только latin-1, пояснение уходит в тело ответа
+            self.send_error(404, explain="Лента ещё не опубликована" if known else None)
+            return
+        if self._not_modified(entry):
+            self.send_response(304)
+            self._headers(entry)
+            self.end_headers()
+            return
+        compressed = "gzip" in self.headers.get("Accept-Encoding", "")
+        payload = entry["gzip"] if compressed else entry["body"]
+        self.send_response(200)
+        self._headers(entry)
+        self.send_header("Content-Type", entry["content_type"])
+        if compressed:
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        if body:
+            try:
+                self.wfile.write(payload)
+            except (BrokenPipeError, ConnectionResetError):
+                # Зритель закрыл страницу, не дождавшись ответа
+                pass
+
+    def _not_modified(self, entry):
+        etags = self.headers.get("If-None-Match")
+        if etags is not None:
+            return entry["etag"] in [tag.strip() for tag in etags.split(",")] or etags.strip() == "*"
+        since = self.headers.get("If-Modified-Since")
+        if since:
+            try:
+                return entry["mtime"] <= email.utils.parsedate_to_datetime(since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def _headers(self, entry):
+        self.send_header("ETag", entry["etag"])
+        self.send_header("Last-Modified", entry["modified"])
+        # Браузер хранит копию, но каждый раз сверяет её по ETag
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Vary", "Accept-Encoding")
+
+    def log_message(self, format, *args):
+        pass
+
+def serve(directory, host="", port=DEFAULT_PORT):
+    """Запускает сервер ленты (блокирует до Ctrl+C)."""
+    handler = type("Handler", (FeedHandler,), {"cache": FeedCache(directory)})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Лента пар и таблицы для зрителей (только чтение).")
+    parser.add_argument("--dir", default=DEFAULT_DIR,
+                        help="каталог соревнования с журналами групп (как TOURNAMENT_JOURNAL_DIR у приложения)")
+    parser.add_argument("--host", default="", help="адрес (по умолчанию все интерфейсы)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    args = parser.parse_args(argv)
+    print(f"Лента: http://{args.host or 'localhost'}:{args.port}/ из {args.dir}", file=sys.stderr)
+    serve(args.dir, args.host, args.port)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
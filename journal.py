@@ -0,0 +1,214 @@
+import json
+import os
+import threading
+import time
+
+from engine import Tournament, MATCHING
+from feed import FEED_DIR, FEED_EVENTS, write_feed
+
+# Журнал турнира на диске: каждое изменение (старт, публикация пар,
+# внесённые и итоговые результаты тура, выбывшие и опоздавшие игроки,
+# исправления результатов, откаты) дописывается строкой JSON в
+# events.jsonl, а время от времени рядом пишется снимок всего состояния.
+# Восстановление — загрузка последнего снимка и проигрывание событий после него.
+# После событий, меняющих пары или таблицу, в подкаталоге feed
+# пересобирается лента для зрителей (feed.py).
+#
+# Один журнал могут открыть несколько сессий страницы. Каждая помнит
+# поколение файла (inode и размер), которое прочитала или записала сама;
+# если файл с тех пор дописал или заменил кто-то другой, событие не
+# записывается (JournalConflict), а страница перечитывает журнал.
+
+EVENTS_FILE = "events.jsonl"
+SNAPSHOT_FILE = "snapshot.json"
+SNAPSHOT_EVERY = 4
+# Проверка поколения и запись события — под одной блокировкой (сессии страницы — потоки одного процесса)
+_WRITE_LOCK = threading.Lock()
+
+class JournalConflict(ValueError):
+    """Журнал изменён другой сессией после того, как эта его прочитала."""
+
+class Journal:
+    """Журнал событий одного турнира в каталоге path."""
+
+    def __init__(self, path, snapshot_every=SNAPSHOT_EVERY):
+        self.path = path
+        self.events_path = os.path.join(path, EVENTS_FILE)
+        self.snapshot_path = os.path.join(path, SNAPSHOT_FILE)
+        self.feed_path = os.path.join(path, FEED_DIR)
+        self.snapshot_every = snapshot_every
+        self._since_snapshot = 0
+        # (inode, размер) events.jsonl, каким его видела эта сессия; None — журнала нет
+        self._generation = None
+        os.makedirs(path, exist_ok=True)
+
+    def exists(self):
+        return os.path.exists(self.events_path)
+
+    def _file_generation(self):
+        try:
+            stat = os.stat(self.events_path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_ino, stat.st_size) if stat.st_size else None
+
+    def changed(self):
+        """True, если журнал на диске дописан или заменён не этой сессией."""
+        return self._file_generation() != self._generation
+
+    def start(self, tournament):
+        """Начинает новый журнал для только что созданного турнира."""
+        if tournament.current_round:
+            raise ValueError("Журнал начинается до первого тура.")
+        self.archive()
+        tournament.journal = self
+        self.append({
+            "type": "start",
+            "players": tournament.players,
+            "tournament_type": tournament.tournament_type,
+            "pairing_system": tournament.pairing_system,
+            "total_rounds": tournament.total_rounds,
+            "ratings": tournament.ratings,
+            "player_ids": tournament.player_ids,
+            "surnames": tournament.surnames,
+            "seed": tournament.seed,
+        }, tournament)
+
+    def append(self, event, tournament=None):
+        """Дописывает событие и сбрасывает его на диск.
+
+        JournalConflict — журнал с тех пор изменила другая сессия; событие
+        не записано, турнир нужно перечитать из журнала.
+        """
+        line = json.dumps(event, ensure_ascii=False, separators=(",", ":"))
+        with _WRITE_LOCK:
+            if self.changed():
+                raise JournalConflict("Журнал турнира изменён в другом окне: действие не записано, "
+                                      "данные будут перечитаны из журнала.")
+            # Хвост без перевода строки (сбой посреди записи) не должен склеиться с новым событием
+            if not self._ends_with_newline():
+                line = "\n" + line
+            with open(self.events_path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+                offset = f.tell()
+                self._generation = (os.fstat(f.fileno()).st_ino, offset)
+        self._since_snapshot += 1
+        if tournament is not None and self._since_snapshot >= self.snapshot_every:
+            self.snapshot(tournament, offset)
+        if tournament is not None and event["type"] in FEED_EVENTS:
+            write_feed(tournament, self.feed_path)
+
+    def _complete_line_after(self, offset):
+        """True, если после offset в журнале есть строка, заканчивающаяся переводом строки."""
+        with open(self.events_path, "rb") as f:
+            f.seek(offset)
+            return f.readline().endswith(b"\n")
+
+    def _ends_with_newline(self):
+        """True, если журнал пуст или заканчивается переводом строки."""
+        if not os.path.exists(self.events_path) or not os.path.getsize(self.events_path):
+            return True
+        with open(self.events_path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
+
+    def snapshot(self, tournament, offset=None):
+        """Атомарно записывает снимок состояния на позицию offset журнала."""
+        if offset is None:
+            offset = os.path.getsize(self.events_path)
+        data = {"offset": offset, "tournament": tournament.to_dict()}
+        tmp_path = self.snapshot_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+        self._since_snapshot = 0
+
+    def restore(self):
+        """Восстанавливает турнир: снимок плюс события после него.
+
+        Возвращает Tournament с подключённым журналом или None, если
+        журнала нет. Недописанная последняя строка (сбой во время записи)
+        пропускается и обрезается, чтобы следующее событие легло с новой строки.
+        """
+        if not self.exists():
+            return None
+        tournament = None
+        offset = 0
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, encoding="utf-8") as f:
+                data = json.load(f)
+            tournament = Tournament.from_dict(data["tournament"])
+            offset = data["offset"]
+
+        replayed = 0
+        torn = False
+        with open(self.events_path, "rb") as f:
+            inode = os.fstat(f.fileno()).st_ino
+            f.seek(offset)
+            for raw in f:
+                try:
+                    event = json.loads(raw)
+                except ValueError:
+                    torn = True
+                    break
+                tournament = apply_event(tournament, event)
+                offset += len(raw)
+                replayed += 1
+        if torn:
+            with _WRITE_LOCK:
+                # Строку могла в этот момент дописывать другая сессия: тогда она уже целая
+                stat = os.stat(self.events_path)
+                if stat.st_ino == inode and not self._complete_line_after(offset):
+                    os.truncate(self.events_path, offset)
+        # Поколение — прочитанная часть: дописанное с тех пор другими увидит changed()
+        self._generation = (inode, offset) if offset else None
+        if tournament is not None:
+            tournament.journal = self
+            write_feed(tournament, self.feed_path)
+        self._since_snapshot = replayed
+        return tournament
+
+    def archive(self):
+        """Переименовывает текущий журнал и снимок, освобождая место для нового турнира."""
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        for path in (self.events_path, self.snapshot_path):
+            if os.path.exists(path):
+                root, ext = os.path.splitext(path)
+                os.replace(path, f"{root}-{stamp}{ext}")
+        self._since_snapshot = 0
+        self._generation = None
+
+def apply_event(tournament, event):
+    """Применяет событие журнала; для start создаёт турнир."""
+    kind = event["type"]
+    if kind == "start":
+        return Tournament(event["players"], event["tournament_type"], event["total_rounds"],
+                          ratings=event["ratings"], seed=event["seed"], player_ids=event.get("player_ids"),
+                          pairing_system=event.get("pairing_system", MATCHING), surnames=event.get("surnames"))
+    if tournament is None:
+        raise ValueError("Журнал не начинается с события start.")
+    if kind == "pairings":
+        tournament.apply_pairings(event["round"], event["pairs"], event["bye"], event.get("warnings", ()),
+                                  event.get("seed"))
+    elif kind == "entered":
+        tournament.enter_results(dict(event["results"]))
+    elif kind == "results":
+        tournament.submit_results(event["results"])
+    # Перестройка тура после этих событий записана отдельным событием repair
+    elif kind == "withdraw":
+        tournament.withdraw(event["player"], repair=False)
+    elif kind == "add_player":
+        tournament.add_player(event["name"], event.get("ratings"), event.get("ids"), repair=False)
+    elif kind == "correction":
+        tournament.correct_result(event["round"], event["board"], event["result"], repair=False)
+    elif kind == "repair":
+        tournament.apply_repair(event["round"], event["pairs"], event["bye"])
+    elif kind == "rollback":
+        tournament.rollback(event["round"])
+    else:
+        raise ValueError(f"Неизвестное событие журнала: {kind}")
+    return tournament
@@ -0,0 +1,129 @@
+import functools
+import json
+import logging
+import threading
+import time
+from collections import deque
+
+# Замеры горячих мест: именованные таймеры, счётчики и показатели размера.
+# По умолчанию выключены: timer() отдаёт общий пустой контекст, а обёртка
+# timed и count() только проверяют флаг, так что выключенный замер стоит
+# одного вызова функции. Включённые копят по имени число вызовов, сумму и
+# максимум, а каждое измерение пишут в кольцевой буфер (выгрузка — JSONL)
+# и в логгер tournament.profile строкой JSON.
+# Состояние общее на процесс: в Streamlit — на все сессии сервера; замеры
+# в процессах пула (поиск жеребьёвки, группы) сюда не попадают.
+
+LOG_SIZE = 10_000
+logger = logging.getLogger("tournament.profile")
+
+_enabled = False
+_lock = threading.Lock()
+_timers = {}    # имя -> [вызовы, сумма (с), максимум (с)]
+_counters = {}
+_gauges = {}
+_log = deque(maxlen=LOG_SIZE)
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_TIMER = _NullTimer()
+
+class _Timer:
+    __slots__ = ("name", "fields", "started")
+
+    def __init__(self, name, fields):
+        self.name = name
+        self.fields = fields
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        add_time(self.name, time.perf_counter() - self.started, **self.fields)
+        return False
+
+def enabled():
+    return _enabled
+
+def enable(on=True):
+    global _enabled
+    _enabled = bool(on)
+
+def timer(name, **fields):
+    """Контекст замера блока name; fields попадают в запись журнала."""
+    if not _enabled:
+        return _NULL_TIMER
+    return _Timer(name, fields)
+
+def timed(name):
+    """Декоратор: замер каждого вызова функции под именем name."""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with _Timer(name, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+def add_time(name, seconds, **fields):
+    """Учитывает уже измеренный интервал (например, между метками на странице)."""
+    if not _enabled:
+        return
+    with _lock:
+        stats = _timers.get(name)
+        if stats is None:
+            _timers[name] = [1, seconds, seconds]
+        else:
+            stats[0] += 1
+            stats[1] += seconds
+            stats[2] = max(stats[2], seconds)
+    _write({"type": "timer", "name": name, "ms": round(seconds * 1000, 3), **fields})
+
+def count(name, k=1):
+    if not _enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + k
+
+def gauge(name, value):
+    """Последнее значение показателя (размер состояния и т. п.)."""
+    if not _enabled:
+        return
+    _gauges[name] = value
+    _write({"type": "gauge", "name": name, "value": value})
+
+def _write(entry):
+    entry["time"] = round(time.time(), 3)
+    _log.append(entry)
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(json.dumps(entry, ensure_ascii=False))
+
+def reset():
+    with _lock:
+        _timers.clear()
+        _counters.clear()
+        _gauges.clear()
+        _log.clear()
+
+def summary():
+    """Сводка: timers (calls, total_ms, mean_ms, max_ms по имени), counters, gauges."""
+    with _lock:
+        timers = {
+            name: {"calls": calls, "total_ms": round(total * 1000, 3),
+                   "mean_ms": round(total * 1000 / calls, 3), "max_ms": round(peak * 1000, 3)}
+            for name, (calls, total, peak) in sorted(_timers.items())
+        }
+        return {"timers": timers, "counters": dict(sorted(_counters.items())), "gauges": dict(sorted(_gauges.items()))}
+
+def write_log(out):
+    """Пишет накопленные измерения в out по строке JSON на запись."""
+    for entry in list(_log):
+        out.write(json.dumps(entry, ensure_ascii=False) + "\n")
@@ -0,0 +1,70 @@
+import numpy as np
+
+# Рейтинговые показатели турнира по правилам ФИДЕ: ожидаемый результат,
+# изменение рейтинга, рейтинг-перформанс и средний рейтинг соперников.
+# Считаются сразу для всех игроков по массивам партий TournamentState
+# (игроки × туры); неявки и BYE в расчёт не входят, как и в рейтинге ФИДЕ.
+
+# Разница рейтингов больше 400 считается за 400
+MAX_DIFFERENCE = 400
+# Коэффициент K: 20 до рейтинга 2400, 10 — начиная с него
+K_HIGH_RATING = 2400
+K_DEFAULT = 20
+K_HIGH = 10
+# Прибавка dp к среднему рейтингу соперников по доле очков p = 0.50, 0.51 … 1.00
+# (таблица ФИДЕ); при p < 0.5 — та же величина со знаком минус
+DP_TABLE = np.array([
+    0, 7, 14, 21, 29, 36, 43, 50, 57, 65, 72, 80, 87, 95, 102, 110, 117, 125, 133, 141,
+    149, 158, 166, 175, 184, 193, 202, 211, 220, 230, 240, 251, 262, 273, 284, 296, 309,
+    322, 336, 351, 366, 383, 401, 422, 444, 470, 501, 538, 589, 677, 800,
+])
+
+def player_ratings(tournament, rating_key="fide", default_rating=1000):
+    """Рейтинги игроков массивом; без рейтинга — default_rating."""
+    ratings = np.full(len(tournament.players), float(default_rating))
+    for i, name in enumerate(tournament.players):
+        value = tournament.ratings.get(name, {}).get(rating_key)
+        if value:
+            ratings[i] = value
+    return ratings
+
+def expected_score(rating, opponent_rating):
+    """Ожидаемый результат партии по Эло (массивы любой совместимой формы)."""
+    diff = np.clip(np.asarray(opponent_rating) - rating, -MAX_DIFFERENCE, MAX_DIFFERENCE)
+    return 1.0 / (1.0 + 10.0 ** (diff / 400.0))
+
+def k_factors(ratings):
+    return np.where(np.asarray(ratings) >= K_HIGH_RATING, K_HIGH, K_DEFAULT)
+
+def performance_dp(share):
+    """dp по таблице ФИДЕ для доли очков share (округляется до сотых)."""
+    share = np.asarray(share, dtype=float)
+    steps = np.minimum(np.rint(np.abs(share - 0.5) * 100).astype(np.int64), len(DP_TABLE) - 1)
+    return np.sign(share - 0.5) * DP_TABLE[steps]
+
+def rating_report(state, ratings, k=None):
+    """Показатели всех игроков по сыгранным партиям.
+
+    ratings — массив рейтингов по номерам игроков, k — общий коэффициент
+    вместо k_factors. Возвращает словарь массивов: games, points,
+    average_opponent, expected, change, performance; у игроков без партий
+    средний рейтинг и перформанс — NaN.
+    """
+    ratings = np.asarray(ratings, dtype=float)
+    mask = state.opponent_mask()
+    opponent_ratings = ratings[np.where(mask, state.opponents, 0)]
+    games = mask.sum(axis=1)
+    points = np.where(mask, state.points, 0.0).sum(axis=1).astype(float)
+    expected = np.where(mask, expected_score(ratings[:, None], opponent_ratings), 0.0).sum(axis=1)
+    k = k_factors(ratings) if k is None else k
+    counted = np.maximum(games, 1)
+    average = np.where(games > 0, np.where(mask, opponent_ratings, 0.0).sum(axis=1) / counted, np.nan)
+    performance = average + performance_dp(points / counted)
+    return {
+        "games": games,
+        "points": points,
+        "average_opponent": average,
+        "expected": expected,
+        "change": k * (points - expected),
+        "performance": performance,
+    }
@@ -0,0 +1,334 @@
+import argparse
+import array
+import csv
+import io
+import json
+import mmap
+import os
+import re
+import shutil
+import sys
+import time
+import zipfile
+
+import numpy as np
+
+# Офлайн-индекс рейтинг-листов ФИДЕ и ФШР. Скачанный список (больше
+# миллиона строк) читается один раз потоком, на диск пишутся массивы NumPy,
+# отсортированные по ID, и отдельный индекс по началу имени. Страница
+# открывает их через mmap: поиск — двоичный, в память попадают только
+# прочитанные страницы файлов.
+#
+# Каталог индекса одного листа:
+#   ids.npy (int64, по возрастанию), ratings.npy (int32, 0 — нет),
+#   links.npy (int64, ID ФИДЕ из листа ФШР, 0 — нет), feds.npy (S3),
+#   names.bin + name_offsets.npy (имена «Фамилия Имя» в UTF-8),
+#   name_keys.npy (S24, нормализованное начало имени по возрастанию),
+#   name_order.npy (номер записи для каждого ключа), meta.json.
+
+RATING_LISTS = ("fide", "fshr")
+NAME_KEY_BYTES = 24
+SNIFF_BYTES = 1 << 16
+
+# Заголовки столбцов листа ФШР (CSV), в нижнем регистре
+FSHR_COLUMNS = {
+    "id": ("id", "id фшр", "фшр id", "код", "код фшр"),
+    "name": ("name", "фио", "игрок", "фамилия имя", "фамилия, имя"),
+    "rating": ("rating", "рейтинг", "классика", "classic", "standard"),
+    "link": ("fide id", "fide_id", "id фиде", "фиде id"),
+    "fed": ("fed", "федерация", "страна"),
+}
+
+def normalize_name(name):
+    """Ключ поиска: регистр, «ё» и запятая «Фамилия, Имя» не важны."""
+    name = name.casefold().replace("ё", "е").replace(",", " ")
+    return " ".join(name.split())
+
+def _name_key(name):
+    return normalize_name(name).encode("utf-8")[:NAME_KEY_BYTES]
+
+def open_list_file(fileobj, filename=""):
+    """Текстовый поток листа из загруженного файла (в том числе zip с ФИДЕ).
+
+    Кодировка определяется по началу файла: UTF-8, иначе cp1251.
+    """
+    if filename.lower().endswith(".zip"):
+        archive = zipfile.ZipFile(fileobj)
+        members = [m for m in archive.namelist() if not m.endswith("/")]
+        if not members:
+            raise ValueError("Архив пуст.")
+        fileobj = archive.open(members[0])
+    stream = io.BufferedReader(fileobj, SNIFF_BYTES) if not hasattr(fileobj, "peek") else fileobj
+    head = stream.peek(SNIFF_BYTES)[:SNIFF_BYTES]
+    try:
+        # Обрезанный на границе символ UTF-8 ошибкой не считается
+        head.decode("utf-8")
+        encoding = "utf-8"
+    except UnicodeDecodeError as e:
+        encoding = "utf-8" if e.start >= len(head) - 3 else "cp1251"
+    return io.TextIOWrapper(stream, encoding=encoding, errors="replace")
+
+def _fixed_columns(header):
+    """Позиции столбцов листа ФИДЕ (TXT с фиксированной шириной) по заголовку."""
+    starts = [(m.start(), m.group()) for m in re.finditer(r"ID Number|\S+", header)]
+    columns = {}
+    for k, (start, title) in enumerate(starts):
+        end = starts[k + 1][0] if k + 1 < len(starts) else None
+        columns[title] = (start, end)
+    titles = [title for _, title in starts]
+    if "ID Number" not in columns or "Name" not in columns:
+        raise ValueError("Не найден заголовок листа ФИДЕ (ID Number, Name).")
+    # Общий лист — SRtng; лист одного контроля — столбец месяца сразу после FOA
+    rating = next((t for t in ("SRtng", "Rtng") if t in columns), None)
+    if rating is None and "FOA" in titles and titles.index("FOA") + 1 < len(titles):
+        rating = titles[titles.index("FOA") + 1]
+    return {
+        "id": columns["ID Number"], "name": columns["Name"],
+        "rating": columns.get(rating), "fed": columns.get("Fed"), "link": None,
+    }
+
+def _rows(lines):
+    """Записи (id, имя, рейтинг, федерация, ссылка) из строк листа."""
+    lines = iter(lines)
+    header = next((line for line in lines if line.strip()), "").rstrip("\r\n")
+    if any(sep in header for sep in "\t;,") and not header.startswith("ID Number"):
+        dialect = csv.Sniffer().sniff(header, delimiters="\t;,")
+        titles = [t.strip().casefold() for t in next(csv.reader([header], dialect))]
+        index = {}
+        for field, aliases in FSHR_COLUMNS.items():
+            index[field] = next((titles.index(a) for a in aliases if a in titles), None)
+        if index["id"] is None or index["name"] is None:
+            raise ValueError("В заголовке листа нет столбцов ID и имени.")
+        for cells in csv.reader(lines, dialect):
+            cell = lambda field: cells[index[field]].strip() if index[field] is not None and index[field] < len(cells) else ""
+            yield cell("id"), cell("name"), cell("rating"), cell("fed"), cell("link")
+        return
+
+    columns = _fixed_columns(header)
+    for line in lines:
+        cell = lambda field: line[columns[field][0]:columns[field][1]].strip() if columns[field] else ""
+        # Имя как в листе («Фамилия, Имя»): по запятой roster_entry отделяет составную фамилию
+        yield cell("id"), cell("name"), cell("rating"), cell("fed"), cell("link")
+
+def build_index(lines, path, source="fide", filename=""):
+    """Строит индекс листа в каталоге path за один проход по строкам.
+
+    Строки без числового ID или имени пропускаются, из повторов ID
+    остаётся первый. Готовый индекс подменяет старый целиком.
+    Возвращает число записей.
+    """
+    if source not in RATING_LISTS:
+        raise ValueError(f"Неизвестный рейтинг-лист: {source}")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = path + ".tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    ids = array.array("q")
+    ratings = array.array("i")
+    links = array.array("q")
+    offsets = array.array("q", [0])
+    feds = bytearray()
+    keys = bytearray()
+    raw_names_path = os.path.join(tmp_path, "names.raw")
+    with open(raw_names_path, "wb") as raw_names:
+        for player_id, name, rating, fed, link in _rows(lines):
+            if not player_id.isdigit() or not name:
+                continue
+            encoded = name.encode("utf-8")
+            raw_names.write(encoded)
+            offsets.append(offsets[-1] + len(encoded))
+            ids.append(int(player_id))
+            ratings.append(int(rating) if rating.isdigit() else 0)
+            links.append(int(link) if link.isdigit() else 0)
+            feds += fed.encode("ascii", "replace")[:3].ljust(3)
+            keys += _name_key(name).ljust(NAME_KEY_BYTES, b"\0")
+    if not ids:
+        shutil.rmtree(tmp_path)
+        raise ValueError("В файле не найдено ни одного игрока.")
+
+    ids = np.frombuffer(ids, dtype=np.int64)
+    order = np.argsort(ids, kind="stable")
+    sorted_ids = ids[order]
+    unique = np.ones(len(order), dtype=bool)
+    unique[1:] = sorted_ids[1:] != sorted_ids[:-1]
+    order = order[unique]
+    count = len(order)
+
+    np.save(os.path.join(tmp_path, "ids.npy"), sorted_ids[unique])
+    np.save(os.path.join(tmp_path, "ratings.npy"), np.frombuffer(ratings, dtype=np.int32)[order])
+    np.save(os.path.join(tmp_path, "links.npy"), np.frombuffer(links, dtype=np.int64)[order])
+    np.save(os.path.join(tmp_path, "feds.npy"), np.frombuffer(bytes(feds), dtype="S3")[order])
+
+    # Имена переписываются в порядке ID
+    offsets = np.frombuffer(offsets, dtype=np.int64)
+    lengths = (offsets[1:] - offsets[:-1])[order]
+    new_offsets = np.zeros(count + 1, dtype=np.int64)
+    np.cumsum(lengths, out=new_offsets[1:])
+    with open(raw_names_path, "rb") as f, open(os.path.join(tmp_path, "names.bin"), "wb") as out:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as raw:
+            for start, end in zip(offsets[order].tolist(), offsets[order + 1].tolist()):
+                out.write(raw[start:end])
+    os.remove(raw_names_path)
+    np.save(os.path.join(tmp_path, "name_offsets.npy"), new_offsets)
+
+    name_keys = np.frombuffer(bytes(keys), dtype=f"S{NAME_KEY_BYTES}")[order]
+    name_order = np.argsort(name_keys, kind="stable").astype(np.int32)
+    np.save(os.path.join(tmp_path, "name_keys.npy"), name_keys[name_order])
+    np.save(os.path.join(tmp_path, "name_order.npy"), name_order)
+
+    with open(os.path.join(tmp_path, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({"source": source, "count": count, "file": filename,
+                   "built": time.strftime("%Y-%m-%d %H:%M")}, f, ensure_ascii=False)
+    old_path = path + ".old"
+    shutil.rmtree(old_path, ignore_errors=True)
+    if os.path.exists(path):
+        os.replace(path, old_path)
+    os.replace(tmp_path, path)
+    shutil.rmtree(old_path, ignore_errors=True)
+    return count
+
+class RatingList:
+    """Индекс одного рейтинг-листа, открытый через mmap."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        load = lambda name: np.load(os.path.join(path, name), mmap_mode="r")
+        self.ids = load("ids.npy")
+        self.ratings = load("ratings.npy")
+        self.links = load("links.npy")
+        self.feds = load("feds.npy")
+        self.name_offsets = load("name_offsets.npy")
+        self.name_keys = load("name_keys.npy")
+        self.name_order = load("name_order.npy")
+        self.names = np.memmap(os.path.join(path, "names.bin"), dtype=np.uint8, mode="r")
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _record(self, row):
+        start, end = int(self.name_offsets[row]), int(self.name_offsets[row + 1])
+        rating = int(self.ratings[row])
+        link = int(self.links[row])
+        return {
+            "id": str(int(self.ids[row])),
+            "name": self.names[start:end].tobytes().decode("utf-8"),
+            "rating": rating or None,
+            "fed": self.feds[row].decode("ascii").strip(),
+            "fide_id": str(link) if link else "",
+        }
+
+    def get(self, player_id):
+        """Запись по ID (строка или число) или None."""
+        player_id = str(player_id).strip()
+        if not player_id.isdigit():
+            return None
+        player_id = int(player_id)
+        row = int(np.searchsorted(self.ids, player_id))
+        if row < len(self.ids) and self.ids[row] == player_id:
+            return self._record(row)
+        return None
+
+    def search(self, query, limit=10):
+        """Записи, у которых имя начинается с query (или ID равен query)."""
+        query = query.strip()
+        if not query:
+            return []
+        if query.isdigit():
+            record = self.get(query)
+            return [record] if record else []
+        normalized = normalize_name(query)
+        key = normalized.encode("utf-8")
+        if len(key) >= NAME_KEY_BYTES:
+            key = key[:NAME_KEY_BYTES]
+            lo = int(np.searchsorted(self.name_keys, key, side="left"))
+            hi = int(np.searchsorted(self.name_keys, key, side="right"))
+        else:
+            # 0xff в UTF-8 не встречается — верхняя граница всех ключей с этим началом
+            lo = int(np.searchsorted(self.name_keys, key, side="left"))
+            hi = int(np.searchsorted(self.name_keys, key + b"\xff", side="left"))
+        records = []
+        for row in self.name_order[lo:hi]:
+            record = self._record(int(row))
+            if normalize_name(record["name"]).startswith(normalized):
+                records.append(record)
+                if len(records) >= limit:
+                    break
+        return records
+
+def open_rating_lists(path):
+    """Открывает построенные индексы из каталога path: {лист: RatingList}."""
+    lists = {}
+    for source in RATING_LISTS:
+        list_path = os.path.join(path, source)
+        if os.path.exists(os.path.join(list_path, "meta.json")):
+            lists[source] = RatingList(list_path)
+    return lists
+
+def lookup_ratings(player, lists):
+    """Рейтинги игрока ростера: введённые вручную, иначе из листов по ID.
+
+    Возвращает {"nat": ..., "fide": ...}; None — рейтинга нет ни в ростере,
+    ни в листе (только тогда подставляется рейтинг по умолчанию).
+    """
+    found = {}
+    for key, field, id_field, source in (("nat", "nat_rating", "fshr_id", "fshr"),
+                                         ("fide", "fide_rating", "fide_id", "fide")):
+        value = str(player.get(field, "")).strip()
+        if value.isdigit():
+            found[key] = int(value)
+            continue
+        record = lists[source].get(player.get(id_field, "")) if source in lists else None
+        found[key] = record["rating"] if record else None
+    if found["fide"] is None and "fshr" in lists and "fide" in lists and not player.get("fide_id"):
+        record = lists["fshr"].get(player.get("fshr_id", ""))
+        if record and record["fide_id"]:
+            linked = lists["fide"].get(record["fide_id"])
+            found["fide"] = linked["rating"] if linked else None
+    return found
+
+def roster_entry(record, source):
+    """Запись листа в формате ростера страницы.
+
+    Фамилия — до запятой («Van Wely, Loek»); имя без запятой (лист ФШР,
+    индекс старой версии) делится по первому пробелу.
+    """
+    name = record["name"]
+    last_name, _, first_name = name.partition("," if "," in name else " ")
+    entry = {
+        "last_name": last_name.strip(), "first_name": first_name.strip(),
+        "nat_rating": "", "fide_rating": "",
+        "fshr_id": "", "fide_id": "",
+    }
+    rating = str(record["rating"]) if record["rating"] else ""
+    if source == "fide":
+        entry["fide_rating"] = rating
+        entry["fide_id"] = record["id"]
+    else:
+        entry["nat_rating"] = rating
+        entry["fshr_id"] = record["id"]
+        entry["fide_id"] = record["fide_id"]
+    return entry
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Построение индекса рейтинг-листа ФИДЕ или ФШР.")
+    parser.add_argument("source", choices=RATING_LISTS, help="какой лист")
+    parser.add_argument("input", help="скачанный лист (.txt, .csv или .zip)")
+    parser.add_argument("-d", "--directory", default="ratings", help="каталог индексов")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    with open(args.input, "rb") as f:
+        try:
+            count = build_index(open_list_file(f, args.input), os.path.join(args.directory, args.source),
+                                args.source, os.path.basename(args.input))
+        except ValueError as e:
+            print(e, file=sys.stderr)
+            return 1
+    print(f"{args.source}: {count} игроков, {time.perf_counter() - started:.1f} с")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,275 @@
+import csv
+import html
+import io
+
+import numpy as np
+
+from engine import WHITE_POINTS, FORFEITS
+from rating import player_ratings
+from state import WHITE, BLACK
+
+# Кросс-таблица, листы пар и призовые списки в CSV, HTML для печати и
+# текст фиксированной ширины. Отчёт — заголовок и генератор строк, а
+# форматы — генераторы кусков текста, так что строки собираются по мере
+# выдачи. Из tour_data берутся только плотные массивы NumPy игроки × туры
+# (соперник, цвет, очки, вид тура), сетка объектов Python на всё поле не
+# строится; кросс-таблица на 5000 игроков готовится за доли секунды.
+
+# Вид тура у игрока
+ABSENT = 0   # не играл: выбыл, ещё не был заявлен или тур не сыгран
+GAME = 1
+FORFEIT = 2
+BYE = 3
+
+COLOR_LETTERS = {WHITE: "б", BLACK: "ч", 0: ""}
+POINT_MARKS = {1.0: "1", 0.5: "½", 0.0: "0"}
+# Строк на страницу в текстовом формате (заголовок повторяется, между страницами — перевод формата)
+LINES_PER_PAGE = 60
+# Строк HTML в одном куске генератора
+HTML_CHUNK = 500
+DEFAULT_PRIZES = 3
+
+def round_grid(tournament):
+    """Завершённые туры массивами игроки × туры.
+
+    opponents — номер соперника (-1 — нет), colors — WHITE/BLACK/0,
+    points — очки за тур, kinds — ABSENT/GAME/FORFEIT/BYE. Столбец k — тур k+1.
+    """
+    n = len(tournament.players)
+    rounds = [rnd for rnd in range(1, tournament.current_round + 1) if tournament.tour_data[rnd]["completed"]]
+    opponents = np.full((n, len(rounds)), -1, dtype=np.int32)
+    colors = np.zeros((n, len(rounds)), dtype=np.int8)
+    points = np.zeros((n, len(rounds)), dtype=np.float32)
+    kinds = np.full((n, len(rounds)), ABSENT, dtype=np.int8)
+    for k, rnd in enumerate(rounds):
+        data = tournament.tour_data[rnd]
+        if data["results"]:
+            white, black, results = zip(*data["results"])
+            white = np.array(white, dtype=np.int64)
+            black = np.array(black, dtype=np.int64)
+            forfeit = np.array([res in FORFEITS for res in results])
+            white_points = np.array([FORFEITS[res][0] if res in FORFEITS else WHITE_POINTS[res] for res in results])
+            black_points = np.array([FORFEITS[res][1] if res in FORFEITS else 1.0 - WHITE_POINTS[res]
+                                     for res in results])
+            opponents[white, k] = black
+            opponents[black, k] = white
+            colors[white, k] = WHITE
+            colors[black, k] = BLACK
+            points[white, k] = white_points
+            points[black, k] = black_points
+            kinds[white, k] = kinds[black, k] = np.where(forfeit, FORFEIT, GAME)
+        if data["bye"] is not None:
+            kinds[data["bye"], k] = BYE
+            points[data["bye"], k] = 1.0
+    return {"rounds": rounds, "opponents": opponents, "colors": colors, "points": points, "kinds": kinds}
+
+def _score(value):
+    """Очки с «½»: 3½, ½, 0."""
+    whole = int(value)
+    if value == whole:
+        return str(whole)
+    return (str(whole) if whole else "") + "½"
+
+def _ratings(tournament, rating_key, default_rating):
+    """Рейтинги для отчёта или None, если рейтингов в турнире нет."""
+    if not tournament.ratings:
+        return None
+    return player_ratings(tournament, rating_key, default_rating).astype(np.int64).tolist()
+
+def crosstable(tournament, rating_key="fide", default_rating=1000):
+    """Кросс-таблица по местам: в клетке тура — номер строки соперника, цвет
+    (б/ч) и результат (1, ½, 0; «+»/«−» — неявка), у BYE — «BYE».
+
+    Возвращает (заголовок, генератор строк).
+    """
+    grid = round_grid(tournament)
+    index = tournament.standings_index
+    order = index.order
+    n = len(order)
+    row_of = np.empty(n, dtype=np.int64)
+    row_of[order] = np.arange(1, n + 1)
+    starts = (tournament.seeding_ranks() + 1).tolist()
+    ratings = _ratings(tournament, rating_key, default_rating)
+    header = ["№", "Место", "Ст. №", "Имя"] + (["Рейтинг"] if ratings else [])
+    header += [f"Т{rnd}" for rnd in grid["rounds"]] + ["Очки", "Бухгольц", "Усеч. Бух.", "Бергер"]
+
+    def rows():
+        # Клетки туров — целой строкой из массивов, без объектов на каждую клетку заранее
+        opponent_rows = np.where(grid["opponents"] >= 0, row_of[np.maximum(grid["opponents"], 0)], 0)
+        places = index.places.tolist()
+        columns = [index.scores.tolist(), index.buchholz.tolist(), index.buchholz_cut1.tolist(),
+                   index.sonneborn_berger.tolist()]
+        for k, player in enumerate(order.tolist()):
+            row = [str(k + 1), str(places[k]), str(starts[player]), tournament.players[player]]
+            if ratings:
+                row.append(str(ratings[player]))
+            for opponent, color, points, kind in zip(opponent_rows[player].tolist(), grid["colors"][player].tolist(),
+                                                     grid["points"][player].tolist(), grid["kinds"][player].tolist()):
+                if kind == GAME:
+                    row.append(f"{opponent}{COLOR_LETTERS[color]}{POINT_MARKS[points]}")
+                elif kind == FORFEIT:
+                    row.append(f"{opponent}{COLOR_LETTERS[color]}{'+' if points else '−'}")
+                elif kind == BYE:
+                    row.append("BYE")
+                else:
+                    row.append("")
+            row += [_score(columns[0][player]), f"{columns[1][player]:.1f}", f"{columns[2][player]:.1f}",
+                    f"{columns[3][player]:.2f}"]
+            yield row
+    return header, rows()
+
+def pairing_sheet(tournament, rnd):
+    """Лист пар тура rnd: доска, стартовые номера, имена, очки до тура и
+    результат (если внесён). Возвращает (заголовок, генератор строк)."""
+    data = tournament.tour_data[rnd]
+    grid = round_grid(tournament)
+    before = grid["points"][:, [k for k, r in enumerate(grid["rounds"]) if r < rnd]].sum(axis=1).tolist()
+    starts = (tournament.seeding_ranks() + 1).tolist()
+    header = ["Доска", "Ст. №", "Белые", "Очки", "Результат", "Очки", "Чёрные", "Ст. №"]
+    if data["completed"]:
+        results = [res for _, _, res in data["results"]]
+    else:
+        results = data["entered"] or [None] * len(data["pairs"])
+
+    def rows():
+        for board, ((white, black), res) in enumerate(zip(data["pairs"], results), 1):
+            yield [str(board), str(starts[white]), tournament.players[white], _score(before[white]),
+                   res or "", _score(before[black]), tournament.players[black], str(starts[black])]
+        if data["bye"] is not None:
+            bye = data["bye"]
+            yield ["", str(starts[bye]), tournament.players[bye], _score(before[bye]), "BYE", "", "", ""]
+    return header, rows()
+
+def prize_list(tournament, places=DEFAULT_PRIZES, bands=(), rating_key="fide", default_rating=1000):
+    """Призёры: первые places мест общего зачёта, затем по places лучших в
+    каждой рейтинговой группе «до X» из bands (игрок получает один приз —
+    уже награждённые в группах не учитываются).
+
+    Возвращает (заголовок, генератор строк).
+    """
+    index = tournament.standings_index
+    order = index.order.tolist()
+    ratings = _ratings(tournament, rating_key, default_rating)
+    if ratings is None:
+        bands = ()
+    header = ["Зачёт", "Приз", "Место", "Имя"] + (["Рейтинг"] if ratings else []) + ["Очки", "Бухгольц"]
+    withdrawn = tournament.withdrawn
+
+    def row(prize_group, prize, k, player):
+        cells = [prize_group, str(prize), str(int(index.places[k])), tournament.players[player]]
+        if ratings:
+            cells.append(str(ratings[player]))
+        return cells + [_score(float(index.scores[player])), f"{float(index.buchholz[player]):.1f}"]
+
+    def rows():
+        awarded = set()
+        ranked = [(k, player) for k, player in enumerate(order) if player not in withdrawn]
+        for prize, (k, player) in enumerate(ranked[:places], 1):
+            awarded.add(player)
+            yield row("Общий", prize, k, player)
+        for limit in sorted(bands):
+            prize = 0
+            for k, player in ranked:
+                if prize == places:
+                    break
+                if player not in awarded and ratings[player] < limit:
+                    prize += 1
+                    awarded.add(player)
+                    yield row(f"Рейтинг до {limit}", prize, k, player)
+    return header, rows()
+
+# =============== Форматы ===============
+
+def iter_csv(header, rows):
+    """CSV (разделитель «;», как у списка игроков) кусками по строке."""
+    out = io.StringIO()
+    writer = csv.writer(out, delimiter=";", lineterminator="\n")
+    writer.writerow(header)
+    for row in rows:
+        writer.writerow(row)
+        if out.tell() > 1 << 16:
+            yield out.getvalue()
+            out.seek(0)
+            out.truncate()
+    yield out.getvalue()
+
+def iter_html(title, header, rows):
+    """Страница для печати: шапка таблицы повторяется на каждом листе."""
+    esc = html.escape
+    yield ("<!DOCTYPE html><html lang=\"ru\"><head><meta charset=\"utf-8\">"
+           f"<title>{esc(title)}</title>"
+           "<style>body{font-family:sans-serif;font-size:10pt;margin:1em}"
+           "table{border-collapse:collapse}td,th{border:1px solid #999;padding:1px 4px;white-space:nowrap}"
+           "td{text-align:center}td.l{text-align:left}thead{display:table-header-group}"
+           "tr{page-break-inside:avoid}@media print{body{margin:0;font-size:8pt}}</style>"
+           f"</head><body><h1>{esc(title)}</h1><table><thead><tr>")
+    yield "".join(f"<th>{esc(name)}</th>" for name in header) + "</tr></thead><tbody>"
+    # Имена — по левому краю
+    left = {k for k, name in enumerate(header) if name in ("Имя", "Белые", "Чёрные", "Зачёт")}
+    chunk = []
+    for row in rows:
+        chunk.append("<tr>" + "".join(f"<td class=\"l\">{esc(cell)}</td>" if k in left else f"<td>{esc(cell)}</td>"
+                                      for k, cell in enumerate(row)) + "</tr>")
+        if len(chunk) == HTML_CHUNK:
+            yield "".join(chunk)
+            chunk = []
+    chunk.append("</tbody></table></body></html>")
+    yield "".join(chunk)
+
+def iter_text(title, header, rows, widths=None):
+    """Текст фиксированной ширины для печати: страницы по LINES_PER_PAGE строк
+    с повторённой шапкой, между страницами — перевод формата.
+
+    widths — ширины столбцов; без них строки сначала собираются в список,
+    чтобы измерить столбцы.
+    """
+    if widths is None:
+        rows = list(rows)
+        widths = [max([len(name)] + [len(row[k]) for row in rows]) for k, name in enumerate(header)]
+    left = {k for k, name in enumerate(header) if name in ("Имя", "Белые", "Чёрные", "Зачёт")}
+
+    def line(cells):
+        return " ".join(cell.ljust(width) if k in left else cell.rjust(width)
+                        for k, (cell, width) in enumerate(zip(cells, widths))).rstrip() + "\n"
+
+    head = line(header)
+    rule = "-" * (len(head) - 1) + "\n"
+    page = [title + "\n\n", head, rule]
+    count = 0
+    for row in rows:
+        if count == LINES_PER_PAGE:
+            yield "".join(page)
+            page = ["\f", head, rule]
+            count = 0
+        page.append(line(row))
+        count += 1
+    yield "".join(page)
+
+def crosstable_widths(tournament, header):
+    """Ширины столбцов кросс-таблицы без прохода по строкам: по числу игроков и длине имён."""
+    digits = len(str(len(tournament.players)))
+    name = max(len(name) for name in tournament.players)
+    widths = []
+    for column in header:
+        if column == "Имя":
+            widths.append(max(name, len(column)))
+        elif column.startswith("Т") and column[1:].isdigit():
+            widths.append(max(digits + 2, 3, len(column)))
+        elif column in ("№", "Место", "Ст. №"):
+            widths.append(max(digits, len(column)))
+        else:
+            widths.append(max(len(column), 6))
+    return widths
+
+FORMATS = {"csv": ("text/csv", "csv"), "html": ("text/html", "html"), "text": ("text/plain", "txt")}
+
+def render(title, report, fmt, widths=None):
+    """Генератор кусков отчёта (заголовок, строки) в формате fmt из FORMATS."""
+    header, rows = report
+    if fmt == "csv":
+        return iter_csv(header, rows)
+    if fmt == "html":
+        return iter_html(title, header, rows)
+    if fmt == "text":
+        return iter_text(title, header, rows, widths)
+    raise ValueError(f"Неизвестный формат: {fmt}")
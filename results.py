@@ -0,0 +1,61 @@
+import re
+
+# Ввод результатов тура текстом: столбец результатов, скопированный из
+# таблицы, или строки «доска результат» в любом порядке.
+
+RESULT_ALIASES = {
+    "1-0": "1-0", "1:0": "1-0", "1": "1-0",
+    "0-1": "0-1", "0:1": "0-1", "0": "0-1",
+    "1/2-1/2": "1/2-1/2", "½-½": "1/2-1/2", "1/2": "1/2-1/2", "½": "1/2-1/2", "=": "1/2-1/2",
+    "+/-": "+/-", "+-": "+/-", "+:-": "+/-",
+    "-/+": "-/+", "-+": "-/+", "-:+": "-/+",
+    "-/-": "-/-", "--": "-/-", "-:-": "-/-",
+}
+
+# Результат, набранный с пробелами: «1 - 0», «½ : ½», «+ / -», «1 0»
+SPACED_RESULT = re.compile(r"(?<!\S)(1/2|½|[01+-])(\s*[-:/]\s*|\s+)(1/2|½|[01+-])(?!\S)")
+
+def _join_spaced(match):
+    first, separator, second = match.groups()
+    joined = first + (separator.strip() or "-") + second
+    return joined if parse_result(joined) else match.group(0)
+
+def parse_result(text):
+    """Результат в записи движка (RESULTS) или None, если не распознан."""
+    return RESULT_ALIASES.get(text.strip().replace(" ", ""))
+
+def parse_results_text(text, boards):
+    """Разбирает ввод результатов для тура из boards досок.
+
+    Строка «12 1-0» — результат доски 12; строка из одного результата
+    относится к доске, следующей за предыдущей строкой (первая — к доске 1).
+    Результат с пробелами («1 - 0», «1 0») сначала склеивается, так что
+    номером доски считается только число, за которым что-то ещё следует.
+    Возвращает ({номер доски с 0: результат}, ошибки).
+
+    >>> parse_results_text("1 - 0\\n½ - ½\\n3 0 : 1", 3)
+    ({0: '1-0', 1: '1/2-1/2', 2: '0-1'}, [])
+    >>> parse_results_text("1 0\\n0 1\\n3 1", 3)
+    ({0: '1-0', 1: '0-1', 2: '1-0'}, [])
+    """
+    results = {}
+    errors = []
+    board = 0
+    for number, line in enumerate(text.splitlines(), 1):
+        tokens = SPACED_RESULT.sub(_join_spaced, line).split()
+        if not tokens:
+            continue
+        if len(tokens) >= 2 and tokens[0].rstrip(".:").isdigit():
+            board = int(tokens[0].rstrip(".:")) - 1
+            value = "".join(tokens[1:])
+        else:
+            value = "".join(tokens)
+        res = parse_result(value)
+        if res is None:
+            errors.append(f"Строка {number}: не понят результат «{value}».")
+        elif not 0 <= board < boards:
+            errors.append(f"Строка {number}: нет доски {board + 1}.")
+        else:
+            results[board] = res
+        board += 1
+    return results, errors
@@ -0,0 +1,126 @@
+import csv
+import io
+
+# Список игроков страницы: разбор вставленного текста и файлов CSV/TSV,
+# проверка всего списка разом. Запись игрока — словарь со строковыми полями
+# ROSTER_FIELDS, как в st.session_state.players_data.
+
+ROSTER_FIELDS = ("last_name", "first_name", "nat_rating", "fide_rating", "fshr_id", "fide_id")
+ROSTER_TITLES = {
+    "last_name": "Фамилия", "first_name": "Имя",
+    "nat_rating": "Рейтинг ФШР", "fide_rating": "Рейтинг ФИДЕ",
+    "fshr_id": "ID ФШР", "fide_id": "ID ФИДЕ",
+}
+# Заголовки столбцов во вставленном тексте, в нижнем регистре
+HEADER_ALIASES = {
+    "last_name": ("фамилия", "last_name", "last name", "surname"),
+    "first_name": ("имя", "first_name", "first name"),
+    "nat_rating": ("рейтинг фшр", "nat_rating", "фшр", "рейтинг"),
+    "fide_rating": ("рейтинг фиде", "fide_rating", "фиде", "rating"),
+    "fshr_id": ("id фшр", "fshr_id"),
+    "fide_id": ("id фиде", "fide_id", "fide id"),
+}
+MAX_RATING = 3500
+MAX_ERRORS = 20
+
+def empty_player():
+    return {field: "" for field in ROSTER_FIELDS}
+
+def normalize_rows(rows):
+    """Строки редактора таблицы в записи ростера: None -> "", пробелы по краям убраны.
+
+    Полностью пустые строки (добавленные и не заполненные) отбрасываются.
+    """
+    players = []
+    for row in rows:
+        player = {field: "" if row.get(field) is None else str(row.get(field)).strip()
+                  for field in ROSTER_FIELDS}
+        if any(player.values()):
+            players.append(player)
+    return players
+
+def _columns(cells):
+    """Поле ростера для каждого столбца заголовка или None, если это не заголовок."""
+    fields = []
+    for cell in cells:
+        title = cell.strip().casefold()
+        fields.append(next((f for f, aliases in HEADER_ALIASES.items() if title in aliases), None))
+    return fields if any(fields) else None
+
+def parse_roster(text):
+    """Разбирает вставленный текст или содержимое CSV/TSV в записи ростера.
+
+    Разделитель — табуляция, «;» или «,». Первая строка с названиями
+    столбцов задаёт их порядок; без неё столбцы идут как в ROSTER_FIELDS.
+    Строка из одного столбца «Фамилия Имя» делится по первому пробелу.
+    """
+    lines = [line for line in text.splitlines() if line.strip()]
+    if not lines:
+        return []
+    delimiter = next((d for d in "\t;," if d in lines[0]), None)
+    if delimiter is None:
+        rows = [[line] for line in lines]
+    else:
+        rows = list(csv.reader(lines, delimiter=delimiter))
+    fields = _columns(rows[0])
+    if fields is not None:
+        rows = rows[1:]
+    else:
+        fields = list(ROSTER_FIELDS)
+
+    players = []
+    for cells in rows:
+        player = empty_player()
+        for field, cell in zip(fields, cells):
+            if field is not None:
+                player[field] = cell.strip()
+        if len(cells) == 1 and fields[0] == "last_name" and not player["first_name"]:
+            player["last_name"], _, player["first_name"] = player["last_name"].partition(" ")
+            player["first_name"] = player["first_name"].strip()
+        if any(player.values()):
+            players.append(player)
+    return players
+
+def read_roster_file(data):
+    """Байты загруженного файла в записи ростера (UTF-8 с BOM или cp1251)."""
+    try:
+        text = data.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        text = data.decode("cp1251")
+    return parse_roster(text)
+
+def write_roster(players, columns=ROSTER_FIELDS):
+    """Ростер в CSV (разделитель «;», заголовки по-русски)."""
+    out = io.StringIO()
+    writer = csv.writer(out, delimiter=";", lineterminator="\n")
+    writer.writerow([ROSTER_TITLES[field] for field in columns])
+    for player in players:
+        writer.writerow([player[field] for field in columns])
+    return out.getvalue()
+
+def full_name(player):
+    return f"{player['last_name'].strip()} {player['first_name'].strip()}"
+
+def validate_roster(players):
+    """Проверяет весь список; возвращает ошибки по строкам (номера с 1)."""
+    errors = []
+    seen = {}
+    for i, player in enumerate(players, 1):
+        if not player["last_name"]:
+            errors.append(f"У игрока {i} не указана фамилия.")
+        if not player["first_name"]:
+            errors.append(f"У игрока {i} не указано имя.")
+        for field in ("nat_rating", "fide_rating"):
+            value = player[field]
+            if value and (not value.isdigit() or int(value) > MAX_RATING):
+                errors.append(f"У игрока {i} неверное значение «{ROSTER_TITLES[field]}»: «{value}».")
+        for field in ("fshr_id", "fide_id"):
+            if player[field] and not player[field].isdigit():
+                errors.append(f"У игрока {i} {ROSTER_TITLES[field]} должен состоять из цифр: «{player[field]}».")
+        if player["last_name"] and player["first_name"]:
+            name = full_name(player)
+            if name in seen:
+                errors.append(f"Игроки {seen[name]} и {i}: одинаковое имя «{name}».")
+            else:
+                seen[name] = i
+    return errors
@@ -0,0 +1,228 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from rating import player_ratings
+
+# Монте-Карло прогноз итогов турнира по рейтингам. Оставшиеся туры
+# разыгрываются сразу для пачки прогонов: состояние — массивы формы
+# (прогоны, игроки), жеребьёвка швейцарки в каждом прогоне упрощённая
+# (соседи по таблице с обменом при повторной встрече), исход партии — по Эло.
+# Выбывшие игроки не жеребьются, очков больше не получают и в местах
+# стоят ниже всех участвующих.
+
+DRAW_RATE = 0.3
+BATCH_SIZE = 256
+# Предел памяти одного процесса под матрицы «кто с кем играл» пачки
+# (битовые строки, как в BitMatrix): на больших полях пачка уменьшается
+PLAYED_BUDGET = 64 * 2**20
+
+def outcome_probabilities(rating_a, rating_b, draw_rate=DRAW_RATE):
+    """Вероятности (победа, ничья, поражение) первого игрока по Эло.
+
+    Ничья тем вероятнее, чем ближе силы; ожидаемый результат равен
+    формуле Эло при любой доле ничьих.
+    """
+    expected = 1.0 / (1.0 + 10.0 ** ((rating_b - rating_a) / 400.0))
+    draw = draw_rate * 2.0 * np.minimum(expected, 1.0 - expected)
+    win = expected - draw / 2.0
+    return win, draw, 1.0 - win - draw
+
+def _play(rng, ratings, a, b, draw_rate):
+    """Очки игроков a за партии a — b (массивы одной формы)."""
+    win, draw, _ = outcome_probabilities(ratings[a], ratings[b], draw_rate)
+    u = rng.random(a.shape)
+    return np.where(u < win, 1.0, np.where(u < win + draw, 0.5, 0.0))
+
+def _swiss_pairs(rng, scores, played, had_bye, withdrawn):
+    """Упрощённая жеребьёвка швейцарки сразу для всех прогонов пачки.
+
+    withdrawn — маска выбывших, они в жеребьёвку не попадают. Возвращает
+    (a, b, bye): доски (прогоны, доски) и номер игрока с BYE (или None
+    при чётном числе участвующих).
+    """
+    runs = scores.shape[0]
+    n = int((~withdrawn).sum())
+    rows = np.arange(runs)[:, None]
+    # Очки кратны 0.5, поэтому 2·очки + U[0, 1) сортирует по очкам со жребием;
+    # выбывшие уходят в конец порядка и отрезаются
+    key = 2.0 * scores + rng.random(scores.shape)
+    key[:, withdrawn] = -np.inf
+    order = np.argsort(-key, axis=-1)[:, :n]
+    bye = None
+    if n % 2 == 1:
+        # BYE — самому нижнему в таблице из тех, у кого его ещё не было
+        eligible = ~had_bye[rows, order]
+        pos = n - 1 - np.argmax(eligible[:, ::-1], axis=1)
+        bye = order[np.arange(runs), pos]
+        keep = np.ones((runs, n), dtype=bool)
+        keep[np.arange(runs), pos] = False
+        order = order[keep].reshape(runs, n - 1)
+    a = order[:, 0::2].copy()
+    b = order[:, 1::2].copy()
+    # Повторная встреча снимается обменом соперников с соседней доской:
+    # два прохода по непересекающимся парам досок (0-1, 2-3, … и 1-2, 3-4, …)
+    boards = a.shape[1]
+    for first in (0, 1):
+        j = np.arange(first, boards - 1, 2)
+        if not len(j):
+            continue
+        a1, b1, a2, b2 = a[:, j], b[:, j], a[:, j + 1], b[:, j + 1]
+        ok = ((_met(played, rows, a1, b1) | _met(played, rows, a2, b2))
+              & ~_met(played, rows, a1, b2) & ~_met(played, rows, a2, b1))
+        b[:, j] = np.where(ok, b2, b1)
+        b[:, j + 1] = np.where(ok, b1, b2)
+    return a, b, bye
+
+def _met(played, rows, a, b):
+    """Встречались ли a и b (битовые строки played формы (прогоны, n, ⌈n/8⌉))."""
+    return ((played[rows, a, b >> 3] >> (b & 7)) & 1).astype(bool)
+
+def _record(played, opponents, rows, a, b):
+    """Отмечает партии a — b в played и соперников тура в opponents."""
+    played[rows, a, b >> 3] |= (1 << (b & 7)).astype(np.uint8)
+    played[rows, b, a >> 3] |= (1 << (a & 7)).astype(np.uint8)
+    opponents[rows, a] = b
+    opponents[rows, b] = a
+
+def batch_size(n):
+    """Прогонов в пачке для n игроков с учётом PLAYED_BUDGET."""
+    return max(1, min(BATCH_SIZE, PLAYED_BUDGET // max(1, n * ((n + 7) // 8))))
+
+def _play_scheduled(rng, ratings, a, b, withdrawn, draw_rate):
+    """Очки (a, b) за партии с известными парами: с выбывшим — неявка в пользу соперника."""
+    points = _play(rng, ratings, a, b, draw_rate)
+    out_a, out_b = withdrawn[a], withdrawn[b]
+    points_a = np.where(out_a, 0.0, np.where(out_b, 1.0, points))
+    points_b = np.where(out_b, 0.0, np.where(out_a, 1.0, 1.0 - points))
+    return points_a, points_b
+
+def _simulate_chunk(args):
+    """Прогоны одного процесса; возвращает счётчики мест и сумму очков."""
+    (runs, seed, scores0, played0, prior0, byes0, withdrawn, ratings, schedule, swiss_rounds,
+     draw_rate, top) = args
+    rng = np.random.default_rng(seed)
+    n = scores0.shape[0]
+    place_counts = np.zeros((len(top), n), dtype=np.int64)
+    score_sum = np.zeros(n)
+    place_sum = np.zeros(n)
+    done = 0
+    while done < runs:
+        batch = min(batch_size(n), runs - done)
+        rows = np.arange(batch)[:, None]
+        scores = np.repeat(scores0[None, :], batch, axis=0)
+        played = np.repeat(played0[None, :, :], batch, axis=0)
+        had_bye = np.repeat(byes0[None, :], batch, axis=0)
+        # Соперники по разыгранным турам (n — нет соперника) для Бухгольца
+        rounds = []
+
+        # Туры с известными парами (круговой турнир или уже опубликованный тур)
+        for pairs, bye in schedule:
+            if pairs:
+                a = np.repeat(np.array([p[0] for p in pairs])[None, :], batch, axis=0)
+                b = np.repeat(np.array([p[1] for p in pairs])[None, :], batch, axis=0)
+                points_a, points_b = _play_scheduled(rng, ratings, a, b, withdrawn, draw_rate)
+                scores[rows, a] += points_a
+                scores[rows, b] += points_b
+                rounds.append(np.full((batch, n), n, dtype=np.int64))
+                _record(played, rounds[-1], rows, a, b)
+            if bye is not None and not withdrawn[bye]:
+                scores[:, bye] += 1.0
+                had_bye[:, bye] = True
+
+        for _ in range(swiss_rounds):
+            a, b, bye = _swiss_pairs(rng, scores, played, had_bye, withdrawn)
+            points = _play(rng, ratings, a, b, draw_rate)
+            scores[rows, a] += points
+            scores[rows, b] += 1.0 - points
+            rounds.append(np.full((batch, n), n, dtype=np.int64))
+            _record(played, rounds[-1], rows, a, b)
+            if bye is not None:
+                scores[np.arange(batch), bye] += 1.0
+                had_bye[np.arange(batch), bye] = True
+
+        # Места: очки, затем Бухгольц, затем жребий; выбывшие — после всех участвующих
+        padded = np.concatenate([scores, np.zeros((batch, 1))], axis=1)
+        buchholz = padded[:, prior0].sum(axis=2)
+        for opponents in rounds:
+            buchholz += padded[rows, opponents]
+        scale = 2.0 * buchholz.max() + 2.0
+        key = 2.0 * scores * scale + 2.0 * buchholz + rng.random((batch, n))
+        key[:, withdrawn] -= key.max() + 1.0
+        order = np.argsort(-key, axis=-1)
+        places = np.empty((batch, n), dtype=np.int64)
+        places[rows, order] = np.arange(n)[None, :]
+        for k, limit in enumerate(top):
+            place_counts[k] += (places < limit).sum(axis=0)
+        score_sum += scores.sum(axis=0)
+        place_sum += (places + 1).sum(axis=0)
+        done += batch
+    return place_counts, score_sum, place_sum
+
+def simulate(tournament, runs=100_000, draw_rate=DRAW_RATE, rating_key="fide",
+             default_rating=1000, top=(1, 3), workers=None, seed=None):
+    """Прогноз итогов турнира с текущего состояния.
+
+    Возвращает строки (словари) по убыванию шанса на первое место: имя,
+    вероятности попасть в первые k мест для каждого k из top, средние очки
+    и среднее место.
+    """
+    state = tournament.state
+    n = state.n
+    scores0 = state.scores.copy()
+    played0 = np.frombuffer(state.played.bits, dtype=np.uint8).reshape(n, state.played.stride).copy()
+    # Соперники по сыгранным партиям, как в StandingsIndex (повторная встреча —
+    # ещё раз); пустые клетки — номер n с нулевыми очками
+    prior0 = np.where(state.opponent_mask(), state.opponents, n).astype(np.int64)
+    byes0 = state.byes > 0
+    withdrawn = np.ones(n, dtype=bool)
+    withdrawn[tournament.active_players()] = False
+    ratings = player_ratings(tournament, rating_key, default_rating)
+
+    # Уже опубликованный, но не сыгранный тур разыгрывается с его парами
+    schedule = []
+    completed = sum(1 for data in tournament.tour_data.values() if data["completed"])
+    current = tournament.tour_data.get(tournament.current_round)
+    if current is not None and current["pairs"] and not current["completed"]:
+        schedule.append((current["pairs"], current["bye"]))
+        completed += 1
+    remaining = tournament.total_rounds - completed
+    if tournament.is_round_robin:
+        for rnd in range(completed + 1, tournament.total_rounds + 1):
+            pairs = [(p1, p2) for p1, p2 in tournament.round_robin_schedule[rnd - 1]
+                     if p1 is not None and p2 is not None]
+            bye = next((p1 if p2 is None else p2 for p1, p2 in tournament.round_robin_schedule[rnd - 1]
+                        if p1 is None or p2 is None), None)
+            schedule.append((pairs, bye))
+        swiss_rounds = 0
+    else:
+        swiss_rounds = remaining
+
+    workers = workers or os.cpu_count() or 1
+    workers = max(1, min(workers, runs // batch_size(n) or 1))
+    seeds = np.random.SeedSequence(seed).spawn(workers)
+    shares = [runs // workers + (1 if k < runs % workers else 0) for k in range(workers)]
+    jobs = [
+        (share, child, scores0, played0, prior0, byes0, withdrawn, ratings, schedule, swiss_rounds, draw_rate, tuple(top))
+        for share, child in zip(shares, seeds) if share
+    ]
+    if len(jobs) == 1:
+        parts = [_simulate_chunk(jobs[0])]
+    else:
+        with ProcessPoolExecutor(max_workers=len(jobs)) as pool:
+            parts = list(pool.map(_simulate_chunk, jobs))
+
+    place_counts = sum(p[0] for p in parts)
+    score_sum = sum(p[1] for p in parts)
+    place_sum = sum(p[2] for p in parts)
+    rows = []
+    for i, name in enumerate(tournament.players):
+        row = {"name": name}
+        for k, limit in enumerate(top):
+            row[f"top{limit}"] = float(place_counts[k][i]) / runs
+        row["mean_score"] = float(score_sum[i]) / runs
+        row["mean_place"] = float(place_sum[i]) / runs
+        rows.append(row)
+    rows.sort(key=lambda row: (-row[f"top{top[0]}"], row["mean_place"]))
+    return rows
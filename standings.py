@@ -0,0 +1,138 @@
+import numpy as np
+
+import profiling
+from state import encode_array, decode_array
+
+# Индекс турнирной таблицы: дополнительные показатели копятся по мере
+# завершения туров, а между турами таблица отдаётся готовой.
+
+class StandingsIndex:
+    """Очки, Бухгольц, усечённый и медианный Бухгольц, коэффициент Бергера,
+    прогрессивный подсчёт и число белых, обновляемые раз в тур."""
+
+    def __init__(self, names):
+        self.names = list(names)
+        n = len(self.names)
+        # Порядок имён по алфавиту — последний критерий сортировки
+        self.name_rank = np.empty(n, dtype=np.int64)
+        self.name_rank[sorted(range(n), key=self.names.__getitem__)] = np.arange(n)
+        self.scores = np.zeros(n)
+        self.games = np.zeros(n, dtype=np.int64)
+        self.buchholz = np.zeros(n)
+        self.buchholz_cut1 = np.zeros(n)
+        self.median_buchholz = np.zeros(n)
+        self.sonneborn_berger = np.zeros(n)
+        self.progressive = np.zeros(n)
+        self.white = np.zeros(n, dtype=np.int64)
+        self.order = np.argsort(self.name_rank)
+        self.places = np.ones(n, dtype=np.int64)
+        self._rows = None
+
+    ARRAYS = ("scores", "games", "buchholz", "buchholz_cut1", "median_buchholz",
+              "sonneborn_berger", "progressive", "white", "order", "places")
+
+    def to_dict(self):
+        return {name: encode_array(getattr(self, name)) for name in self.ARRAYS}
+
+    @classmethod
+    def from_dict(cls, names, data):
+        index = cls(names)
+        for name in cls.ARRAYS:
+            setattr(index, name, decode_array(data[name]))
+        return index
+
+    @profiling.timed("standings.update")
+    def update(self, state):
+        """Учитывает завершённый тур по состоянию турнира."""
+        games = state.games.astype(np.int64)
+        mask = state.opponent_mask()
+        opponents = np.where(mask, state.opponents, 0)
+        points = np.where(mask, state.points, 0.0)
+
+        # Новые партии входят в суммы с очками соперников до этого тура
+        new = mask & (np.arange(state.total_rounds)[None, :] >= self.games[:, None])
+        self.buchholz += np.where(new, self.scores[opponents], 0.0).sum(axis=1)
+        self.sonneborn_berger += np.where(new, points * self.scores[opponents], 0.0).sum(axis=1)
+
+        # Прирост очков соперника переходит в показатели по всем партиям с ним
+        delta = state.scores - self.scores
+        self.buchholz += np.where(mask, delta[opponents], 0.0).sum(axis=1)
+        self.sonneborn_berger += np.where(mask, points * delta[opponents], 0.0).sum(axis=1)
+        self.scores = state.scores.copy()
+        self.games = games
+        self.white = (games + state.color_diff) // 2
+        self.progressive += self.scores
+
+        opp_scores = self.scores[opponents]
+        played = games > 0
+        lowest = np.where(played, np.where(mask, opp_scores, np.inf).min(axis=1), 0.0)
+        highest = np.where(played, np.where(mask, opp_scores, -np.inf).max(axis=1), 0.0)
+        self.buchholz_cut1 = self.buchholz - lowest
+        self.median_buchholz = np.where(
+            games > 2, self.buchholz - lowest - highest, self.buchholz_cut1
+        )
+        self._sort()
+
+    def add_player(self, name):
+        """Добавляет игрока без партий в конец списка (опоздавший)."""
+        self.names.append(name)
+        n = len(self.names)
+        self.name_rank = np.empty(n, dtype=np.int64)
+        self.name_rank[sorted(range(n), key=self.names.__getitem__)] = np.arange(n)
+        for key in self.ARRAYS[:-2]:
+            array = getattr(self, key)
+            setattr(self, key, np.append(array, np.zeros(1, dtype=array.dtype)))
+        self._sort()
+
+    def snapshot(self):
+        """Копии накопленных показателей — для отката тура."""
+        return {key: getattr(self, key).copy() for key in self.ARRAYS[:-2]}
+
+    def restore(self, snapshot):
+        """Возвращает показатели из снимка; добавленные позже игроки получают нули."""
+        n = len(self.names)
+        for key, values in snapshot.items():
+            padding = np.zeros(n - len(values), dtype=values.dtype)
+            setattr(self, key, np.concatenate([values, padding]))
+        self._sort()
+
+    def _sort(self):
+        """Порядок строк и места (при равенстве очков и Бухгольца — общее место)."""
+        n = len(self.names)
+        self.order = np.lexsort((self.name_rank, -self.buchholz, -self.scores))
+        key_score = self.scores[self.order]
+        key_bh = self.buchholz[self.order]
+        changed = np.ones(n, dtype=bool)
+        changed[1:] = (key_score[1:] != key_score[:-1]) | (key_bh[1:] != key_bh[:-1])
+        positions = np.where(changed, np.arange(n) + 1, 0)
+        self.places = np.maximum.accumulate(positions)
+        self._rows = None
+
+    @property
+    def rows(self):
+        """Строки таблицы; собираются при первом обращении после тура."""
+        if self._rows is None:
+            self._rows = self._build_rows()
+        return self._rows
+
+    @profiling.timed("standings.rows")
+    def _build_rows(self):
+        order = self.order.tolist()
+        places = self.places.tolist()
+        columns = {
+            "score": self.scores.tolist(),
+            "buchholz": self.buchholz.tolist(),
+            "buchholz_cut1": self.buchholz_cut1.tolist(),
+            "median_buchholz": self.median_buchholz.tolist(),
+            "sonneborn_berger": self.sonneborn_berger.tolist(),
+            "progressive": self.progressive.tolist(),
+            "white": self.white.tolist(),
+            "games": self.games.tolist(),
+        }
+        rows = []
+        for place, player in zip(places, order):
+            row = {"place": place, "name": self.names[player]}
+            for key, values in columns.items():
+                row[key] = values[player]
+            rows.append(row)
+        return rows
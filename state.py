@@ -0,0 +1,241 @@
+import base64
+
+import numpy as np
+
+# Компактное состояние турнира: игроки — целые номера 0..n-1, очки и цвета —
+# массивы NumPy, сыгранные пары — битовая матрица. Имена живут только на
+# границе с интерфейсом (Tournament.players).
+
+WHITE = 1
+BLACK = -1
+
+# Сила цветового предпочтения по правилам ФИДЕ (C.04.1)
+NO_PREFERENCE = 0
+MILD = 1      # разница цветов 0: чередовать с последним
+STRONG = 2    # разница цветов ±1
+ABSOLUTE = 3  # разница больше 1 или два последних цвета одинаковы
+
+# Флоат в туре: сыграл с соперником с большим (UP) или меньшим (DOWN) числом очков
+UP = 1
+DOWN = -1
+
+def encode_array(array):
+    """Массив в компактный JSON-совместимый вид (сырые байты в base64)."""
+    array = np.ascontiguousarray(array)
+    return {
+        "dtype": array.dtype.str,
+        "shape": list(array.shape),
+        "data": base64.b64encode(array.tobytes()).decode("ascii"),
+    }
+
+def decode_array(data):
+    raw = base64.b64decode(data["data"])
+    return np.frombuffer(raw, dtype=np.dtype(data["dtype"])).reshape(data["shape"]).copy()
+
+class BitMatrix:
+    """Симметричная битовая матрица n×n: кто с кем уже играл."""
+
+    def __init__(self, n):
+        self.n = n
+        self.stride = (n + 7) // 8
+        self.bits = bytearray(self.stride * n)
+
+    def get(self, i, j):
+        return (self.bits[i * self.stride + (j >> 3)] >> (j & 7)) & 1
+
+    def set(self, i, j):
+        self.bits[i * self.stride + (j >> 3)] |= 1 << (j & 7)
+        self.bits[j * self.stride + (i >> 3)] |= 1 << (i & 7)
+
+    def clear(self, i, j):
+        self.bits[i * self.stride + (j >> 3)] &= ~(1 << (j & 7)) & 0xFF
+        self.bits[j * self.stride + (i >> 3)] &= ~(1 << (i & 7)) & 0xFF
+
+    def row(self, i):
+        """Строка матрицы как булев массив длины n."""
+        raw = np.frombuffer(self.bits, dtype=np.uint8, count=self.stride, offset=i * self.stride)
+        return np.unpackbits(raw, bitorder="little")[:self.n].astype(bool)
+
+    def count(self):
+        return int(np.unpackbits(np.frombuffer(self.bits, dtype=np.uint8)).sum()) // 2
+
+    def resized(self, n):
+        """Копия матрицы размера n×n (n не меньше текущего), новые строки пустые."""
+        matrix = BitMatrix(n)
+        old = np.frombuffer(self.bits, dtype=np.uint8).reshape(self.n, self.stride)
+        new = np.frombuffer(matrix.bits, dtype=np.uint8).reshape(n, matrix.stride)
+        new[:self.n, :self.stride] = old
+        return matrix
+
+    def to_dict(self):
+        return {"n": self.n, "bits": base64.b64encode(bytes(self.bits)).decode("ascii")}
+
+    @classmethod
+    def from_dict(cls, data):
+        matrix = cls(data["n"])
+        matrix.bits = bytearray(base64.b64decode(data["bits"]))
+        return matrix
+
+class TournamentState:
+    """Очки, партии и цвета всех игроков в массивах фиксированного размера."""
+
+    def __init__(self, n, total_rounds):
+        self.n = n
+        self.total_rounds = total_rounds
+        self.scores = np.zeros(n)
+        # Партии по порядку: соперник (-1 — нет), очки игрока, цвет (WHITE/BLACK)
+        self.opponents = np.full((n, total_rounds), -1, dtype=np.int32)
+        self.points = np.zeros((n, total_rounds), dtype=np.float32)
+        self.colors = np.zeros((n, total_rounds), dtype=np.int8)
+        self.games = np.zeros(n, dtype=np.int16)
+        self.color_diff = np.zeros(n, dtype=np.int16)  # белые − чёрные
+        # Цветовое состояние обновляется при записи партий, жеребьёвка только читает:
+        # серия (+k — k белых подряд, −k — чёрных), последний цвет, предпочтение и его сила
+        self.color_streak = np.zeros(n, dtype=np.int8)
+        self.last_color = np.zeros(n, dtype=np.int8)
+        self.color_pref = np.zeros(n, dtype=np.int8)
+        self.color_strength = np.zeros(n, dtype=np.int8)
+        self.floats = np.zeros((n, total_rounds), dtype=np.int8)  # по турам: UP, DOWN или 0
+        self.byes = np.zeros(n, dtype=np.int16)
+        self.played = BitMatrix(n)
+
+    ARRAYS = ("scores", "opponents", "points", "colors", "games", "color_diff",
+              "color_streak", "last_color", "color_pref", "color_strength", "floats",
+              "byes")
+    # Значения игрока, которые меняет запись тура (партии и флоаты — по столбцам)
+    PLAYER_ARRAYS = ("scores", "games", "color_diff", "color_streak", "last_color",
+                     "color_pref", "color_strength", "byes")
+    # Поля, которых нет в снимках старых версий: восстанавливаются по истории цветов
+    DERIVED = ("color_streak", "last_color", "color_pref", "color_strength", "floats")
+
+    def to_dict(self):
+        data = {name: encode_array(getattr(self, name)) for name in self.ARRAYS}
+        data["n"] = self.n
+        data["total_rounds"] = self.total_rounds
+        data["played"] = self.played.to_dict()
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        state = cls(data["n"], data["total_rounds"])
+        # Поля, которых больше нет (scheduled_white, scheduled_byes старых снимков), пропускаются
+        for name in cls.ARRAYS:
+            if name in data or name not in cls.DERIVED:
+                setattr(state, name, decode_array(data[name]))
+        state.played = BitMatrix.from_dict(data["played"])
+        if "color_pref" not in data:
+            state._rebuild_color_state()
+        return state
+
+    def add_player(self):
+        """Добавляет игрока без партий (опоздавший); возвращает его номер."""
+        for name in self.ARRAYS:
+            array = getattr(self, name)
+            fill = -1 if name == "opponents" else 0
+            row = np.full((1,) + array.shape[1:], fill, dtype=array.dtype)
+            setattr(self, name, np.concatenate([array, row]))
+        self.played = self.played.resized(self.n + 1)
+        self.n += 1
+        return self.n - 1
+
+    def _rebuild_color_state(self):
+        for player in range(self.n):
+            for color in self.colors[player, :int(self.games[player])].tolist():
+                streak = int(self.color_streak[player])
+                self.color_streak[player] = streak + color if streak * color > 0 else color
+                self.last_color[player] = color
+        self._update_color_preferences(np.arange(self.n))
+
+    def _update_color_preferences(self, players):
+        """Пересчитывает предпочтение и его силу для игроков players."""
+        diff = self.color_diff[players].astype(np.int64)
+        streak = self.color_streak[players].astype(np.int64)
+        last = self.last_color[players].astype(np.int64)
+        absolute = (np.abs(diff) > 1) | (np.abs(streak) >= 2)
+        # Большая разница цветов важнее серии, серия — разницы ±1, та — чередования
+        self.color_pref[players] = np.where(
+            np.abs(diff) > 1, -np.sign(diff),
+            np.where(np.abs(streak) >= 2, -np.sign(streak),
+                     np.where(diff != 0, -np.sign(diff), -last)))
+        self.color_strength[players] = np.where(
+            last == 0, NO_PREFERENCE,
+            np.where(absolute, ABSOLUTE, np.where(diff != 0, STRONG, MILD)))
+
+    def round_snapshot(self, rnd, players, games):
+        """Снимок для отката тура rnd, снятый до его записи.
+
+        Хранит только то, что тур изменит: прежние значения игроков players
+        (все, кто был в туре) и пары из games, которые раньше не встречались.
+        Размер — порядка числа игроков тура, а не всего турнира.
+        """
+        players = np.asarray(players, dtype=np.int64)
+        return {
+            "round": rnd,
+            "players": players,
+            "values": {name: getattr(self, name)[players].copy() for name in self.PLAYER_ARRAYS},
+            "new_pairs": [(w, b) for w, b in games if not self.played.get(w, b)],
+        }
+
+    def restore_round(self, snapshot):
+        """Отменяет запись тура по его снимку (туры откатываются с последнего)."""
+        players = snapshot["players"]
+        old_games = snapshot["values"]["games"].astype(np.int64)
+        played = self.games[players] > old_games
+        rows, cols = players[played], old_games[played]
+        self.opponents[rows, cols] = -1
+        self.points[rows, cols] = 0
+        self.colors[rows, cols] = 0
+        self.floats[players, snapshot["round"] - 1] = 0
+        for name, values in snapshot["values"].items():
+            getattr(self, name)[players] = values
+        for white, black in snapshot["new_pairs"]:
+            self.played.clear(white, black)
+
+    def record_games(self, white, black, white_points):
+        """Записывает партии тура; аргументы — массивы одной длины."""
+        white = np.asarray(white, dtype=np.int64)
+        black = np.asarray(black, dtype=np.int64)
+        white_points = np.asarray(white_points, dtype=float)
+        gw = self.games[white]
+        gb = self.games[black]
+        self.opponents[white, gw] = black
+        self.opponents[black, gb] = white
+        self.points[white, gw] = white_points
+        self.points[black, gb] = 1.0 - white_points
+        self.colors[white, gw] = WHITE
+        self.colors[black, gb] = BLACK
+        self.games[white] += 1
+        self.games[black] += 1
+        self.color_diff[white] += 1
+        self.color_diff[black] -= 1
+        self.color_streak[white] = np.where(self.color_streak[white] > 0, self.color_streak[white] + 1, 1)
+        self.color_streak[black] = np.where(self.color_streak[black] < 0, self.color_streak[black] - 1, -1)
+        self.last_color[white] = WHITE
+        self.last_color[black] = BLACK
+        self._update_color_preferences(np.concatenate([white, black]))
+        self.scores[white] += white_points
+        self.scores[black] += 1.0 - white_points
+        for w, b in zip(white.tolist(), black.tolist()):
+            self.played.set(w, b)
+
+    def record_floats(self, rnd, white, black, bye=None):
+        """Флоаты тура rnd по парам; вызывать до записи очков тура. BYE — флоат вниз."""
+        white = np.asarray(white, dtype=np.int64)
+        black = np.asarray(black, dtype=np.int64)
+        diff = np.sign(self.scores[black] - self.scores[white]).astype(np.int8)
+        self.floats[white, rnd - 1] = diff
+        self.floats[black, rnd - 1] = -diff
+        if bye is not None:
+            self.floats[bye, rnd - 1] = DOWN
+
+    def record_bye(self, player):
+        self.byes[player] += 1
+        self.scores[player] += 1.0
+
+    def record_forfeit(self, white, black, white_points, black_points):
+        """Неявка: только очки, без партии, цвета и отметки «уже играли»."""
+        self.scores[white] += white_points
+        self.scores[black] += black_points
+
+    def opponent_mask(self):
+        return self.opponents >= 0
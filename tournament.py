@@ -1,187 +1,61 @@
-import streamlit as st
-import random
-import math
-from collections import defaultdict
-
-# =============== Вспомогательные функции ===============
-
-def get_preferred_color(player, color_history, current_round, total_rounds):
-    history = color_history[player]
-    if len(history) >= 2 and history[-1] == history[-2]:
-        if current_round < total_rounds:
-            return 'Ч' if history[-1] == 'Б' else 'Б'
-    white_count = history.count('Б')
-    black_count = history.count('Ч')
-    if white_count < black_count:
-        return 'Б'
-    elif black_count < white_count:
-        return 'Ч'
-    else:
-        if not history:
-            return 'Б'
-        return 'Ч' if history[-1] == 'Б' else 'Б'
-
-def decide_colors(p1, p2, color_history, current_round, total_rounds):
-    pref1 = get_preferred_color(p1, color_history, current_round, total_rounds)
-    pref2 = get_preferred_color(p2, color_history, current_round, total_rounds)
-    if pref1 == 'Б' and pref2 == 'Б':
-        w1 = color_history[p1].count('Б')
-        w2 = color_history[p2].count('Б')
-        return (p1, p2) if w1 <= w2 else (p2, p1)
-    elif pref1 == 'Ч' and pref2 == 'Ч':
-        w1 = color_history[p1].count('Б')
-        w2 = color_history[p2].count('Б')
-        return (p2, p1) if w1 >= w2 else (p1, p2)
-    elif pref1 == 'Б':
-        return (p1, p2)
-    else:
-        return (p2, p1)
-
-def generate_round_robin_schedule(players, rounds_needed):
-    """Генерация расписания кругового турнира."""
-    if not players or rounds_needed <= 0:
-        return []
-    players = players[:]
-    n = len(players)
-    is_odd = (n % 2 == 1)
-    if is_odd:
-        players.append("BYE")
-        n += 1
-
-    base_rounds = n - 1
-    full_schedule = []
-    current = players[:]
-
-    for r in range(base_rounds):
-        pairs = []
-        for i in range(n // 2):
-            p1 = current[i]
-            p2 = current[n - 1 - i]
-            if p1 == "BYE":
-                pairs.append((None, p2))
-            elif p2 == "BYE":
-                pairs.append((p1, None))
-            else:
-                pairs.append((p1, p2))
-        full_schedule.append(pairs)
-        current = [current[0]] + [current[-1]] + current[1:-1]
-
-    if rounds_needed > base_rounds:
-        second_circle = []
-        for pairs in full_schedule:
-            new_pairs = []
-            for p1, p2 in pairs:
-                if p1 is None or p2 is None:
-                    new_pairs.append((p1, p2))
-                else:
-                    new_pairs.append((p2, p1))  # меняем цвета во втором круге
-            second_circle.append(new_pairs)
-        full_schedule.extend(second_circle)
-
-    return full_schedule[:rounds_needed]
-
-def assign_colors_round_robin(pairs, white_count, bye_count, color_history):
-    """Назначает цвета с учётом BYE и записывает в историю."""
-    new_pairs = []
-    for p1, p2 in pairs:
-        if p1 is None or p2 is None:
-            new_pairs.append((p1, p2))
-        else:
-            w1, w2 = white_count[p1], white_count[p2]
-            b1, b2 = bye_count[p1], bye_count[p2]
-            if w1 < w2:
-                white, black = p1, p2
-            elif w2 < w1:
-                white, black = p2, p1
-            else:
-                if b1 > b2:
-                    white, black = p2, p1
-                elif b2 > b1:
-                    white, black = p1, p2
-                else:
-                    white, black = (p1, p2) if p1 < p2 else (p2, p1)
-            # Записываем в историю цветов
-            color_history[white].append('Б')
-            color_history[black].append('Ч')
-            white_count[white] += 1
-            new_pairs.append((white, black))
-    return new_pairs
-
-def initial_pairing_with_colors(players, color_history, current_round, total_rounds):
-    random.shuffle(players)
-    pairs = []
-    for i in range(0, len(players) - 1, 2):
-        white, black = decide_colors(players[i], players[i+1], color_history, current_round, total_rounds)
-        pairs.append((white, black))
-    bye = players[-1] if len(players) % 2 == 1 else None
-    return pairs, bye
-
-def swiss_pairing_with_colors(players, scores, played_pairs, bye_history, color_history, current_round, total_rounds):
-    n = len(players)
-    is_odd = (n % 2 == 1)
-    sorted_players = sorted(players, key=lambda x: (-scores[x], random.random()))
-    paired = set()
-    pairs = []
-
-    for max_diff in [0.5, 1.0, float('inf')]:
-        for i, p1 in enumerate(sorted_players):
-            if p1 in paired:
-                continue
-            opponent = None
-            for p2 in sorted_players[i+1:]:
-                if p2 in paired:
-                    continue
-                if frozenset({p1, p2}) in played_pairs:
-                    continue
-                if abs(scores[p1] - scores[p2]) <= max_diff:
-                    opponent = p2
-                    break
-            if opponent:
-                white, black = decide_colors(p1, opponent, color_history, current_round, total_rounds)
-                pairs.append((white, black))
-                paired.add(p1)
-                paired.add(opponent)
-                played_pairs.add(frozenset({p1, opponent}))
-
-    unpaired = [p for p in players if p not in paired]
-    bye = None
-
-    if is_odd:
-        if len(unpaired) == 1:
-            bye = unpaired[0]
-        elif len(unpaired) > 1:
-            unpaired_sorted = sorted(unpaired, key=lambda x: (scores[x], random.random()))
-            candidates = [p for p in unpaired_sorted if p not in bye_history]
-            if not candidates:
-                candidates = unpaired_sorted
-            bye = candidates[0]
-            others = [p for p in unpaired if p != bye]
-            random.shuffle(others)
-            for i in range(0, len(others) - 1, 2):
-                a, b = others[i], others[i+1]
-                if frozenset({a, b}) not in played_pairs:
-                    white, black = decide_colors(a, b, color_history, current_round, total_rounds)
-                    pairs.append((white, black))
-                    played_pairs.add(frozenset({a, b}))
-    else:
-        if len(unpaired) > 0:
-            st.warning(f"Не удалось спарить всех игроков в туре {current_round}.")
-    return pairs, bye
+import io
+import os
+import time
+import zipfile
 
-def calculate_buchholz(players, scores, opponents):
-    buchholz = {}
-    for p in players:
-        total = sum(scores[opp] for opp in opponents[p])
-        buchholz[p] = total
-    return buchholz
+import streamlit as st
+from engine import (
+    Tournament, ROUND_ROBIN_TYPES, RESULTS, PAIRING_SYSTEMS, MATCHING, DUTCH, round_robin_rounds,
+    swiss_rounds_range,
+)
+import profiling
+from event import Event
+from journal import JournalConflict
+from rating import player_ratings
+from ratinglist import build_index, open_list_file, open_rating_lists, lookup_ratings, roster_entry
+from roster import (
+    ROSTER_FIELDS, ROSTER_TITLES, MAX_ERRORS, normalize_rows, parse_roster, read_roster_file,
+    write_roster, validate_roster, full_name as roster_name,
+)
+from reports import DEFAULT_PRIZES, FORMATS, crosstable, crosstable_widths, pairing_sheet, prize_list, render
+from results import parse_results_text
+from simulation import simulate
+from trf import read_trf, build_tournament, write_trf
+
+JOURNAL_DIR = os.environ.get("TOURNAMENT_JOURNAL_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "journal"))
+RATINGS_DIR = os.environ.get("TOURNAMENT_RATINGS_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "ratings"))
+LIST_LABELS = {"fide": "ФИДЕ", "fshr": "ФШР"}
+NEW_SECTION = "➕ Новая группа"
+# Столбцы таблицы игроков и флаги, включающие необязательные
+ROSTER_COLUMNS = (("last_name", None), ("first_name", None), ("nat_rating", "show_nat_rating"),
+                  ("fide_rating", "show_fide_rating"), ("fshr_id", "show_fshr_id"), ("fide_id", "show_fide_id"))
+
+def set_roster(players):
+    """Заменяет список игроков целиком (вставка, загрузка, очистка).
+
+    Редактор таблицы начинает заново с нового списка; столбцы с
+    заполненными рейтингами и ID включаются.
+    """
+    st.session_state.players_data = players
+    st.session_state.roster_base = players
+    st.session_state.roster_version += 1
+    for field, flag in ROSTER_COLUMNS:
+        if flag is not None and any(p[field] for p in players):
+            st.session_state[flag] = True
 
 # =============== Основное приложение ===============
 
 st.set_page_config(page_title="Шахматный турнир", layout="wide")
+# Метка начала прогона страницы для панели профилирования
+page_started = time.perf_counter()
 st.title("♟️ Шахматный турнир")
 
 if "players_data" not in st.session_state:
     st.session_state.players_data = []
+if "roster_base" not in st.session_state:
+    # Список, с которого начинает редактор таблицы; правки живут в состоянии виджета
+    st.session_state.roster_base = []
+    st.session_state.roster_version = 0
 if "show_nat_rating" not in st.session_state:
     st.session_state.show_nat_rating = False
 if "show_fide_rating" not in st.session_state:
@@ -192,27 +66,68 @@ if "show_fide_id" not in st.session_state:
     st.session_state.show_fide_id = False
 if "default_rating" not in st.session_state:
     st.session_state.default_rating = 1000
-
-if "initialized" not in st.session_state:
-    st.session_state.initialized = False
-    st.session_state.players = []
-    st.session_state.scores = {}
-    st.session_state.opponents = defaultdict(list)
-    st.session_state.played_pairs = set()
-    st.session_state.bye_history = set()
-    st.session_state.total_rounds = 0
-    st.session_state.current_round = 0
-    st.session_state.tournament_type = ""
-    st.session_state.round_robin_schedule = []
-    st.session_state.tour_data = {}
-    st.session_state.completed = False
-    st.session_state.ratings = {}
-    st.session_state.color_history = defaultdict(list)
-    st.session_state.white_count = defaultdict(int)
-    st.session_state.bye_count = defaultdict(int)
+if "pairing_budget" not in st.session_state:
+    st.session_state.pairing_budget = 0.0
+if "pairing_system" not in st.session_state:
+    st.session_state.pairing_system = MATCHING
+if "results_version" not in st.session_state:
+    st.session_state.results_version = 0
+if "rating_lists" not in st.session_state:
+    try:
+        st.session_state.rating_lists = open_rating_lists(RATINGS_DIR)
+    except (OSError, ValueError) as e:
+        st.error(f"Не удалось открыть рейтинг-листы: {e}")
+        st.session_state.rating_lists = {}
+
+if "event" not in st.session_state or st.session_state.event.stale():
+    # После обновления страницы или перезапуска сервера группы восстанавливаются из журналов.
+    # Журнал, изменённый другой сессией (другое окно арбитра), перечитывается так же:
+    # запись поверх чужих событий журнал не принимает (JournalConflict)
+    reloaded = "event" in st.session_state
+    st.session_state.event = Event(JOURNAL_DIR)
+    try:
+        # Ошибки отдельных групп остаются в event.broken и показываются ниже
+        st.session_state.event.restore()
+    except (OSError, ValueError, KeyError) as e:
+        st.error(f"Не удалось восстановить турнир из журнала: {e}")
+    if not reloaded or st.session_state.section not in st.session_state.event.sections:
+        st.session_state.section = next(iter(st.session_state.event.sections), None)
+    if reloaded:
+        st.session_state.results_version += 1
+        st.info("Турнир изменён в другом окне — данные перечитаны из журнала.")
+
+# =============== Группы ===============
+# Каждая группа соревнования — отдельный турнир; страница работает с выбранной
+for name, error in list(st.session_state.event.broken.items()):
+    # Журнал группы не проигрался: группа видна с ошибкой, пока её не уберут
+    st.error(f"Группа «{name}» не восстановилась из журнала: {error}")
+    if st.button(f"Убрать группу «{name}» (журнал уйдёт в архив)", key=f"remove_broken_{name}"):
+        st.session_state.event.remove_section(name)
+        st.rerun()
+sections = list(st.session_state.event.sections)
+if sections:
+    options = sections + [NEW_SECTION]
+    selected = st.session_state.section if st.session_state.section in sections else NEW_SECTION
+    choice = st.radio("Группа", options, index=options.index(selected), horizontal=True)
+    st.session_state.section = None if choice == NEW_SECTION else choice
+    ready = st.session_state.event.ready()
+    if len(ready) > 1 and st.button(f"Следующий тур во всех группах ({', '.join(ready)})"):
+        # Швейцарские группы жеребьются параллельно в пуле процессов
+        st.session_state.event.pair_next_rounds(ready, budget=st.session_state.pairing_budget)
+        st.session_state.results_version += 1
+        st.rerun()
+st.session_state.tournament = st.session_state.event.sections.get(st.session_state.section)
+st.session_state.journal = st.session_state.event.journals.get(st.session_state.section)
+st.session_state.initialized = st.session_state.tournament is not None
+st.session_state.completed = st.session_state.initialized and st.session_state.tournament.completed
 
 # =============== Вкладки ===============
 if not st.session_state.initialized:
+    block_started = time.perf_counter()
+    section_name = st.text_input(
+        "Название группы", value="Основная" if not sections else f"Группа {len(sections) + 1}",
+        help="Например, «A», «Юноши», «Блиц». У каждой группы свой тип турнира и число туров.",
+    ).strip()
     tabs = st.tabs(["Игроки и рейтинги", "Туры"])
     
     # =============== Вкладка 1: Игроки и рейтинги ===============
@@ -246,77 +161,129 @@ if not st.session_state.initialized:
                 help="Будет использован для пустых рейтингов."
             )
 
-        for i, player in enumerate(st.session_state.players_data):
-            with st.container():
-                st.markdown(f"**Игрок {i+1}**")
-                cols = st.columns([3, 3, 1])
-                with cols[0]:
-                    last_name = st.text_input("Фамилия", value=player["last_name"], key=f"last_{i}")
-                    if last_name.strip() == "":
-                        st.markdown('<span style="color:red;font-size:0.9em">Обязательно</span>', unsafe_allow_html=True)
-                with cols[1]:
-                    first_name = st.text_input("Имя", value=player["first_name"], key=f"first_{i}")
-                    if first_name.strip() == "":
-                        st.markdown('<span style="color:red;font-size:0.9em">Обязательно</span>', unsafe_allow_html=True)
-                with cols[2]:
-                    if st.button("🗑️", key=f"del_{i}", help="Удалить игрока"):
-                        st.session_state.players_data.pop(i)
+        with st.expander("Рейтинг-листы ФИДЕ и ФШР", expanded=False):
+            rating_lists = st.session_state.rating_lists
+            for source, rating_list in rating_lists.items():
+                st.caption(f"{LIST_LABELS[source]}: {len(rating_list)} игроков, индекс от {rating_list.meta['built']}")
+            if rating_lists:
+                query = st.text_input("Поиск игрока: начало фамилии или ID", key="list_query")
+                found = [(source, record) for source, rating_list in rating_lists.items()
+                         for record in rating_list.search(query)]
+                if query.strip() and not found:
+                    st.info("В рейтинг-листах не найдено.")
+                if found:
+                    choice = st.selectbox(
+                        "Найдено", range(len(found)),
+                        format_func=lambda k: (f"{found[k][1]['name']} · {LIST_LABELS[found[k][0]]} "
+                                               f"{found[k][1]['rating'] or 'б/р'} · ID {found[k][1]['id']}"),
+                    )
+                    if st.button("Добавить в список игроков"):
+                        source, record = found[choice]
+                        entry = roster_entry(record, source)
+                        set_roster(st.session_state.players_data + [entry])
                         st.rerun()
-                
-                any_extra = (st.session_state.show_nat_rating or 
-                            st.session_state.show_fide_rating or 
-                            st.session_state.show_fshr_id or 
-                            st.session_state.show_fide_id)
-                
-                if any_extra:
-                    widths = []
-                    if st.session_state.show_nat_rating: widths.append(2)
-                    if st.session_state.show_fide_rating: widths.append(2)
-                    if st.session_state.show_fshr_id: widths.append(1)
-                    if st.session_state.show_fide_id: widths.append(1)
-                    
-                    if widths:
-                        extra_cols = st.columns(widths)
-                        idx = 0
-                        fields = {}
-                        if st.session_state.show_nat_rating:
-                            fields["nat_rating"] = st.text_input("Рейтинг ФШР", value=str(player["nat_rating"]) if player["nat_rating"] != "" else "", key=f"nat_{i}")
-                            idx += 1
-                        if st.session_state.show_fide_rating:
-                            fields["fide_rating"] = st.text_input("Рейтинг ФИДЕ", value=str(player["fide_rating"]) if player["fide_rating"] != "" else "", key=f"fide_{i}")
-                            idx += 1
-                        if st.session_state.show_fshr_id:
-                            fields["fshr_id"] = st.text_input("ID ФШР", value=player["fshr_id"], key=f"fshr_{i}")
-                            idx += 1
-                        if st.session_state.show_fide_id:
-                            fields["fide_id"] = st.text_input("ID ФИДЕ", value=player["fide_id"], key=f"fid_{i}")
-                        
-                        st.session_state.players_data[i] = {
-                            "last_name": last_name,
-                            "first_name": first_name,
-                            "nat_rating": fields.get("nat_rating", ""),
-                            "fide_rating": fields.get("fide_rating", ""),
-                            "fshr_id": fields.get("fshr_id", ""),
-                            "fide_id": fields.get("fide_id", "")
-                        }
+            else:
+                st.caption("Листы не загружены. Рейтинги по ID подставляются при старте турнира.")
+
+            source = st.radio("Лист", list(LIST_LABELS), format_func=LIST_LABELS.get, horizontal=True)
+            uploaded_list = st.file_uploader("Скачанный лист (TXT ФИДЕ, CSV ФШР или zip)",
+                                             type=["txt", "csv", "zip"], key="list_upload")
+            if uploaded_list is not None and st.button("Построить индекс"):
+                # Старый индекс закрывается до замены файлов
+                st.session_state.rating_lists = {}
+                try:
+                    with st.spinner("Чтение листа..."):
+                        count = build_index(open_list_file(uploaded_list, uploaded_list.name),
+                                            os.path.join(RATINGS_DIR, source), source, uploaded_list.name)
+                except (OSError, ValueError, zipfile.BadZipFile) as e:
+                    st.error(f"Не удалось построить индекс: {e}")
                 else:
-                    st.session_state.players_data[i] = {
-                        "last_name": last_name,
-                        "first_name": first_name,
-                        "nat_rating": "", "fide_rating": "",
-                        "fshr_id": "", "fide_id": ""
-                    }
-                st.divider()
-
-        st.button("➕ Добавить игрока", on_click=lambda: st.session_state.players_data.append({
-            "last_name": "", "first_name": "",
-            "nat_rating": "", "fide_rating": "",
-            "fshr_id": "", "fide_id": ""
-        }))
+                    st.success(f"{LIST_LABELS[source]}: {count} игроков.")
+                st.session_state.rating_lists = open_rating_lists(RATINGS_DIR)
+
+        # Весь список — одна редактируемая таблица: добавление и удаление строк
+        # встроены в неё, перерисовка не зависит от числа игроков
+        columns = [field for field, flag in ROSTER_COLUMNS if flag is None or st.session_state[flag]]
+        edited = st.data_editor(
+            st.session_state.roster_base,
+            key=f"roster_{st.session_state.roster_version}",
+            num_rows="dynamic",
+            use_container_width=True,
+            column_order=columns,
+            column_config={field: st.column_config.TextColumn(ROSTER_TITLES[field]) for field in ROSTER_FIELDS},
+        )
+        st.session_state.players_data = normalize_rows(edited)
+        roster_errors = validate_roster(st.session_state.players_data)
+        for err in roster_errors[:MAX_ERRORS]:
+            st.error(err)
+        if len(roster_errors) > MAX_ERRORS:
+            st.error(f"…и ещё {len(roster_errors) - MAX_ERRORS} ошибок.")
+
+        cols = st.columns(2)
+        with cols[0]:
+            if st.session_state.players_data:
+                st.download_button("Скачать список (CSV)", write_roster(st.session_state.players_data, columns),
+                                   file_name="players.csv", mime="text/csv")
+        with cols[1]:
+            if st.session_state.players_data and st.button("Очистить список"):
+                set_roster([])
+                st.rerun()
+
+        with st.expander("Вставить или загрузить список", expanded=False):
+            st.caption("Строка на игрока: Фамилия, Имя, Рейтинг ФШР, Рейтинг ФИДЕ, ID ФШР, ID ФИДЕ "
+                       "через табуляцию (копия из таблицы), «;» или «,». Первая строка может быть заголовком.")
+            pasted = st.text_area("Игроки", key=f"roster_paste_{st.session_state.roster_version}", height=150)
+            uploaded_roster = st.file_uploader("Файл CSV/TSV", type=["csv", "tsv", "txt"], key="roster_upload")
+            replace = st.checkbox("Заменить текущий список", value=False)
+            if st.button("Добавить игроков"):
+                added = parse_roster(pasted)
+                if uploaded_roster is not None:
+                    try:
+                        added += read_roster_file(uploaded_roster.getvalue())
+                    except UnicodeDecodeError as e:
+                        st.error(f"Не удалось прочитать файл: {e}")
+                if added:
+                    set_roster(added if replace else st.session_state.players_data + added)
+                    st.rerun()
+                else:
+                    st.warning("Не найдено ни одного игрока.")
+
+        with st.expander("Импорт из TRF", expanded=False):
+            st.caption("Игроки, рейтинги, ID и уже сыгранные туры из файла FIDE TRF.")
+            uploaded = st.file_uploader("Файл TRF", type=["trf", "txt"], key="trf_upload")
+            if uploaded is not None and st.button("Загрузить TRF"):
+                try:
+                    event = read_trf(io.TextIOWrapper(uploaded, encoding="utf-8"))
+                except (ValueError, UnicodeDecodeError) as e:
+                    st.error(f"Не удалось прочитать TRF: {e}")
+                else:
+                    if event["rounds"]:
+                        try:
+                            journal = st.session_state.event.add_section(section_name)
+                        except ValueError as e:
+                            st.error(str(e))
+                            journal = None
+                        if journal is not None:
+                            try:
+                                tournament = build_tournament(
+                                    event,
+                                    journal=journal,
+                                    pairing_system=st.session_state.pairing_system,
+                                )
+                            except ValueError as e:
+                                st.session_state.event.remove_section(section_name)
+                                st.error(f"Не удалось восстановить туры из TRF: {e}")
+                            else:
+                                st.session_state.event.sections[section_name] = tournament
+                                st.session_state.section = section_name
+                                st.rerun()
+                    else:
+                        set_roster(event["players"])
+                        st.rerun()
 
     # =============== Вкладка 2: Туры ===============
     with tabs[1]:
-        valid_players = [p for p in st.session_state.players_data if p["last_name"].strip() and p["first_name"].strip()]
+        valid_players = [p for p in st.session_state.players_data if p["last_name"] and p["first_name"]]
         n_players = len(valid_players)
 
         if n_players < 2:
@@ -328,229 +295,378 @@ if not st.session_state.initialized:
 
             if n_players < 7:
                 tournament_type = st.radio("Выберите тип турнира:", ["Один круг", "Два круга"], index=0)
-                if tournament_type == "Один круг":
-                    total_rounds = n_players if n_players % 2 == 1 else n_players - 1
-                else:
-                    base = n_players if n_players % 2 == 1 else n_players - 1
-                    total_rounds = 2 * base
+                total_rounds = round_robin_rounds(n_players, tournament_type)
             else:
                 tournament_type = st.radio("Выберите тип турнира:", ["Один круг", "Два круга", "Швейцарская система"], index=2)
-                if tournament_type == "Один круг":
-                    total_rounds = n_players if n_players % 2 == 1 else n_players - 1
-                elif tournament_type == "Два круга":
-                    base = n_players if n_players % 2 == 1 else n_players - 1
-                    total_rounds = 2 * base
+                if tournament_type in ROUND_ROBIN_TYPES:
+                    total_rounds = round_robin_rounds(n_players, tournament_type)
                 else:
-                    recommended = math.ceil(math.log2(n_players)) + 2
-                    max_circle = n_players if n_players % 2 == 1 else n_players - 1
-                    max_swiss = min(max_circle - 1, recommended + 2)
-                    min_swiss = recommended
-                    if min_swiss > max_swiss:
-                        min_swiss = max_swiss
+                    min_swiss, max_swiss, recommended = swiss_rounds_range(n_players)
                     total_rounds = st.slider("Количество туров:", min_swiss, max_swiss, recommended)
+                    st.session_state.pairing_system = st.radio(
+                        "Система жеребьёвки:", PAIRING_SYSTEMS,
+                        index=PAIRING_SYSTEMS.index(st.session_state.pairing_system), horizontal=True,
+                        help="Голландская система ФИДЕ (C.04.3) ставит игроков по рейтингу и подходит "
+                             "для обсчёта рейтинга; паросочетание по очкам быстрее и не учитывает рейтинги.",
+                    )
+                    budget_ms = st.number_input(
+                        "Поиск лучшей жеребьёвки, мс", min_value=0, max_value=10_000,
+                        value=int(st.session_state.pairing_budget * 1000), step=100,
+                        help="Сколько времени перебирать жеребьёвки с разными seed и выбирать лучшую "
+                             "(0 — одна жеребьёвка по seed тура). Для голландской системы — предел "
+                             "времени перебора (0 — по умолчанию, 2 с).",
+                    )
+                    st.session_state.pairing_budget = budget_ms / 1000
 
             if st.button("Начать турнир", type="primary"):
-                errors = []
-                for i, p in enumerate(st.session_state.players_data):
-                    if not p["last_name"].strip(): errors.append(f"У игрока {i+1} не указана фамилия.")
-                    if not p["first_name"].strip(): errors.append(f"У игрока {i+1} не указано имя.")
+                errors = validate_roster(st.session_state.players_data)
                 if errors:
-                    for err in errors: st.error(err)
+                    st.error(f"Исправьте список игроков: ошибок {len(errors)}, первая — {errors[0]}")
                 elif tournament_type is None:
                     st.error("Выберите тип турнира.")
                 else:
                     players_list = []
                     ratings_dict = {}
-                    default_rating = st.session_state.default_rating
+                    ids_dict = {}
+                    surnames_dict = {}
                     show_rating_fields = st.session_state.show_nat_rating or st.session_state.show_fide_rating
 
                     for p in st.session_state.players_data:
-                        full_name = f"{p['last_name'].strip()} {p['first_name'].strip()}"
+                        full_name = roster_name(p)
                         players_list.append(full_name)
+                        if p["fshr_id"] or p["fide_id"]:
+                            ids_dict[full_name] = {"fshr_id": p["fshr_id"], "fide_id": p["fide_id"]}
+                        if " " in p["last_name"].strip():
+                            # Составная фамилия — отдельно, чтобы экспорт TRF не делил её по пробелу
+                            surnames_dict[full_name] = p["last_name"].strip()
                         if show_rating_fields:
-                            nat = p["nat_rating"]; fide = p["fide_rating"]
-                            nat_val = default_rating if nat == "" else int(nat) if nat.isdigit() else default_rating
-                            fide_val = default_rating if fide == "" else int(fide) if fide.isdigit() else default_rating
-                            ratings_dict[full_name] = {"nat": nat_val, "fide": fide_val}
-
-                    st.session_state.players = players_list
-                    st.session_state.tournament_type = tournament_type
-                    st.session_state.scores = {p: 0.0 for p in players_list}
-                    st.session_state.ratings = ratings_dict
-                    st.session_state.opponents = defaultdict(list)
-                    st.session_state.played_pairs.clear()
-                    st.session_state.bye_history.clear()
-                    st.session_state.tour_data = {}
-                    st.session_state.completed = False
-                    st.session_state.total_rounds = total_rounds
-                    st.session_state.color_history = defaultdict(list)
-                    st.session_state.white_count = defaultdict(int)
-                    st.session_state.bye_count = defaultdict(int)
-
-                    is_round_robin = (tournament_type in ["Один круг", "Два круга"])
-                    if is_round_robin:
-                        st.session_state.round_robin_schedule = generate_round_robin_schedule(players_list, total_rounds)
-
-                    for rnd in range(1, total_rounds + 1):
-                        st.session_state.tour_data[rnd] = {"pairs": [], "bye": None, "results": [], "completed": False}
-
-                    # Первый тур
-                    if is_round_robin:
-                        round_pairs = st.session_state.round_robin_schedule[0]
-                        real_pairs = []; bye = None
-                        for p1, p2 in round_pairs:
-                            if p1 is None: 
-                                bye = p2
-                                st.session_state.bye_count[p2] += 1
-                            elif p2 is None: 
-                                bye = p1
-                                st.session_state.bye_count[p1] += 1
-                            else: 
-                                real_pairs.append((p1, p2))
-                        balanced_pairs = assign_colors_round_robin(
-                            real_pairs,
-                            st.session_state.white_count,
-                            st.session_state.bye_count,
-                            st.session_state.color_history
-                        )
-                        st.session_state.tour_data[1]["pairs"] = balanced_pairs
-                        st.session_state.tour_data[1]["bye"] = bye
+                            # Пустой рейтинг ищется в листах по ID; не нашёлся — 0 (без рейтинга):
+                            # рейтинг по умолчанию подставляется только в расчётах, не в экспорт
+                            found = lookup_ratings(p, st.session_state.rating_lists)
+                            ratings_dict[full_name] = {"nat": found["nat"] or 0, "fide": found["fide"] or 0}
+
+                    try:
+                        pairing_system = MATCHING if tournament_type in ROUND_ROBIN_TYPES else st.session_state.pairing_system
+                        tournament = Tournament(players_list, tournament_type, total_rounds,
+                                                ratings=ratings_dict, player_ids=ids_dict,
+                                                pairing_system=pairing_system, surnames=surnames_dict)
+                        journal = st.session_state.event.add_section(section_name)
+                    except ValueError as e:
+                        st.error(str(e))
                     else:
-                        pairs, bye = initial_pairing_with_colors(players_list[:], st.session_state.color_history, 1, total_rounds)
-                        st.session_state.tour_data[1]["pairs"] = pairs
-                        st.session_state.tour_data[1]["bye"] = bye
-                        if bye: st.session_state.bye_history.add(bye)
-
-                    st.session_state.current_round = 1
-                    st.session_state.initialized = True
-                    st.rerun()
+                        journal.start(tournament)
+                        tournament.pair_next_round(budget=st.session_state.pairing_budget)
+                        st.session_state.event.sections[section_name] = tournament
+                        st.session_state.section = section_name
+                        st.rerun()
+    profiling.add_time("page.setup", time.perf_counter() - block_started)
 
 # =============== Активный турнир ===============
 if st.session_state.initialized and not st.session_state.completed:
-    current = st.session_state.current_round
-    data = st.session_state.tour_data[current]
+    block_started = time.perf_counter()
+    tournament = st.session_state.tournament
+    current = tournament.current_round
+    data = tournament.tour_data[current]
 
     st.subheader(f"Тур {current}")
+    if data["seed"] is not None:
+        system = "голландская система ФИДЕ, " if tournament.pairing_system == DUTCH else ""
+        st.caption(f"Жеребьёвка: {system}seed {data['seed']}, штраф {data['quality']}.")
+    for warning in tournament.warnings:
+        st.warning(warning)
 
     if data["completed"]:
         st.success("✅ Тур завершён")
-        for white, black, res in data["results"]:
-            st.write(f"**{white} (Б) — {black} (Ч)**: {res}")
-        if data["bye"]:
-            st.info(f"BYE: {data['bye']} (+1 очко)")
-        if current < st.session_state.total_rounds:
+        st.dataframe([
+            {"Доска": board, "Белые": tournament.name(white), "Чёрные": tournament.name(black), "Результат": res}
+            for board, (white, black, res) in enumerate(data["results"], 1)
+        ], use_container_width=True, hide_index=True)
+        if data["bye"] is not None:
+            st.info(f"BYE: {tournament.name(data['bye'])} (+1 очко)")
+        if current < tournament.total_rounds:
             if st.button(f"Перейти к туру {current + 1}"):
-                st.session_state.current_round += 1
-                next_rnd = current + 1
-                if not st.session_state.tour_data[next_rnd]["pairs"]:
-                    is_round_robin = (st.session_state.tournament_type in ["Один круг", "Два круга"])
-                    if is_round_robin:
-                        round_pairs = st.session_state.round_robin_schedule[next_rnd - 1]
-                        real_pairs = []; bye = None
-                        for p1, p2 in round_pairs:
-                            if p1 is None: 
-                                bye = p2
-                                st.session_state.bye_count[p2] += 1
-                            elif p2 is None: 
-                                bye = p1
-                                st.session_state.bye_count[p1] += 1
-                            else: 
-                                real_pairs.append((p1, p2))
-                        balanced_pairs = assign_colors_round_robin(
-                            real_pairs,
-                            st.session_state.white_count,
-                            st.session_state.bye_count,
-                            st.session_state.color_history
-                        )
-                        st.session_state.tour_data[next_rnd]["pairs"] = balanced_pairs
-                        st.session_state.tour_data[next_rnd]["bye"] = bye
-                    else:
-                        pairs, bye = swiss_pairing_with_colors(
-                            st.session_state.players,
-                            st.session_state.scores,
-                            st.session_state.played_pairs,
-                            st.session_state.bye_history,
-                            st.session_state.color_history,
-                            next_rnd,
-                            st.session_state.total_rounds
-                        )
-                        st.session_state.tour_data[next_rnd]["pairs"] = pairs
-                        st.session_state.tour_data[next_rnd]["bye"] = bye
-                        if bye:
-                            st.session_state.bye_history.add(bye)
+                tournament.pair_next_round(budget=st.session_state.pairing_budget)
                 st.rerun()
         else:
             if st.button("Завершить турнир"):
                 st.session_state.completed = True
                 st.rerun()
     else:
-        results = []
-        for i, (p1, p2) in enumerate(data["pairs"]):
-            col1, col2 = st.columns([3, 1])
-            with col1:
-                st.write(f"**{p1} (Б) — {p2} (Ч)**")
-            with col2:
-                res = st.selectbox(f"Результат {i+1}", ["1-0", "0-1", "1/2-1/2"], index=2, key=f"res_{current}_{i}", label_visibility="collapsed")
-                results.append((p1, p2, res))
-
-        if data["bye"]:
-            st.info(f"BYE: {data['bye']} (+1 очко)")
-
-        if st.button("Завершить тур", type="primary"):
-            for white, black, res in results:
-                st.session_state.opponents[white].append(black)
-                st.session_state.opponents[black].append(white)
-                st.session_state.played_pairs.add(frozenset({white, black}))
-                if st.session_state.tournament_type == "Швейцарская система":
-                    st.session_state.color_history[white].append('Б')
-                    st.session_state.color_history[black].append('Ч')
-                if res == "1-0": st.session_state.scores[white] += 1.0
-                elif res == "0-1": st.session_state.scores[black] += 1.0
-                elif res == "1/2-1/2": st.session_state.scores[white] += 0.5; st.session_state.scores[black] += 0.5
-
-            if data["bye"]:
-                st.session_state.scores[data["bye"]] += 1.0
-
-            st.session_state.tour_data[current]["results"] = results
-            st.session_state.tour_data[current]["completed"] = True
-
-            if current == st.session_state.total_rounds:
-                st.session_state.completed = True
+        # Все доски — одна таблица; внесённые результаты сохраняются в журнал,
+        # тур завершается, когда заполнены все доски
+        entered = data["entered"]
+        boards = len(data["pairs"])
+        st.caption(f"Введено результатов: {boards - entered.count(None)} из {boards}. "
+                   "Неявки: +/- (не явились чёрные), -/+ (не явились белые), -/- (оба).")
+        edited = st.data_editor(
+            [
+                {"Доска": board, "Белые": tournament.name(white), "Чёрные": tournament.name(black),
+                 "Результат": entered[board - 1]}
+                for board, (white, black) in enumerate(data["pairs"], 1)
+            ],
+            key=f"results_{current}_{st.session_state.results_version}",
+            use_container_width=True,
+            hide_index=True,
+            disabled=["Доска", "Белые", "Чёрные"],
+            column_config={"Результат": st.column_config.SelectboxColumn("Результат", options=list(RESULTS))},
+        )
+
+        with st.expander("Ввод по номерам досок", expanded=False):
+            st.caption("Строка на доску: «12 1-0», «13 =», «14 +-». Строка с одним результатом относится "
+                       "к следующей доске, поэтому можно вставить столбец результатов из таблицы. "
+                       "Результат можно писать с пробелами: «1 - 0», «½ ½».")
+            typed = st.text_area("Результаты", key=f"results_text_{current}_{st.session_state.results_version}",
+                                 height=150)
+
+        if data["bye"] is not None:
+            st.info(f"BYE: {tournament.name(data['bye'])} (+1 очко)")
+
+        message = st.session_state.pop("results_message", None)
+        if message:
+            st.warning(message)
+        cols = st.columns(2)
+        with cols[0]:
+            save = st.button("Сохранить введённые")
+        with cols[1]:
+            finish = st.button("Завершить тур", type="primary")
+        if save or finish:
+            changes = {board: row["Результат"] for board, row in enumerate(edited) if row["Результат"] != entered[board]}
+            typed_results, errors = parse_results_text(typed, boards)
+            changes.update(typed_results)
+            for err in errors[:MAX_ERRORS]:
+                st.error(err)
+            if not errors:
+                try:
+                    missing = tournament.enter_results(changes)
+                    if finish and not missing:
+                        tournament.submit_results()
+                except JournalConflict as e:
+                    # Тур уже изменили в другом окне: при следующем обновлении журнал перечитается
+                    st.error(str(e))
+                else:
+                    st.session_state.results_version += 1
+                    if finish and missing:
+                        st.session_state.results_message = f"Тур не завершён: нет результатов на {missing} досках."
+                    elif finish and tournament.completed:
+                        st.session_state.completed = True
+                    st.rerun()
 
-            st.rerun()
+    # Исправления, откат и изменения состава: опубликованный тур
+    # перестраивается только в затронутых группах очков
+    with st.expander("Исправления, откат и изменения состава", expanded=False):
+        change_message = st.session_state.pop("change_message", None)
+        if change_message:
+            st.success(change_message)
+        played_rounds = [rnd for rnd in range(1, current + 1) if tournament.tour_data[rnd]["completed"]]
+        if played_rounds:
+            st.markdown("**Исправить результат**")
+            cols = st.columns(3)
+            with cols[0]:
+                fix_round = st.selectbox("Тур", played_rounds, index=len(played_rounds) - 1)
+            fix_results = tournament.tour_data[fix_round]["results"]
+            with cols[1]:
+                fix_board = st.selectbox(
+                    "Доска", range(len(fix_results)),
+                    format_func=lambda b: f"{b + 1}: {tournament.name(fix_results[b][0])} — "
+                                          f"{tournament.name(fix_results[b][1])} ({fix_results[b][2]})",
+                )
+            with cols[2]:
+                fix_result = st.selectbox("Новый результат", RESULTS)
+            if st.button("Исправить") and fix_board is not None:
+                try:
+                    rebuilt = tournament.correct_result(fix_round, fix_board, fix_result)
+                except ValueError as e:
+                    st.error(str(e))
+                else:
+                    st.session_state.change_message = f"Результат исправлен, новых досок в текущем туре: {rebuilt}."
+                    st.session_state.results_version += 1
+                    st.rerun()
+        if played_rounds:
+            st.markdown("**Откат**")
+            target = st.selectbox("Вернуться к", range(played_rounds[-1], -1, -1),
+                                  format_func=lambda r: f"концу тура {r}" if r else "началу турнира")
+            confirm = st.checkbox("Пары и результаты следующих туров будут удалены")
+            if st.button("Откатить", disabled=not confirm):
+                tournament.rollback(target)
+                if target == 0:
+                    tournament.pair_next_round(budget=st.session_state.pairing_budget)
+                st.session_state.change_message = f"Турнир возвращён к {'концу тура ' + str(target) if target else 'началу'}."
+                st.session_state.results_version += 1
+                st.rerun()
+        if not tournament.is_round_robin:
+            st.markdown("**Снять игрока**")
+            active = tournament.active_players()
+            leaving = st.selectbox("Игрок", active, format_func=tournament.name, key="withdraw_player")
+            if st.button("Снять с турнира") and leaving is not None:
+                rebuilt = tournament.withdraw(leaving)
+                st.session_state.change_message = f"{tournament.name(leaving)} снят, новых досок: {rebuilt}."
+                st.session_state.results_version += 1
+                st.rerun()
+            st.markdown("**Добавить опоздавшего**")
+            cols = st.columns(2)
+            with cols[0]:
+                late_name = st.text_input("Фамилия Имя", key="late_name")
+            with cols[1]:
+                late_rating = st.number_input("Рейтинг", min_value=0, max_value=3500,
+                                              value=st.session_state.default_rating, key="late_rating")
+            if st.button("Добавить в турнир"):
+                try:
+                    tournament.add_player(late_name.strip(), {"nat": late_rating, "fide": late_rating})
+                except ValueError as e:
+                    st.error(str(e))
+                else:
+                    st.session_state.change_message = f"{late_name.strip()} добавлен с 0 очков."
+                    st.session_state.results_version += 1
+                    st.rerun()
+    profiling.add_time("page.round", time.perf_counter() - block_started)
 
 # =============== Таблица результатов ===============
 if st.session_state.initialized:
+    block_started = time.perf_counter()
     st.divider()
     st.subheader("Таблица результатов")
 
-    buchholz = calculate_buchholz(st.session_state.players, st.session_state.scores, st.session_state.opponents)
-
-    sorted_players = sorted(st.session_state.players, key=lambda x: (-st.session_state.scores[x], -buchholz[x], x))
+    tournament = st.session_state.tournament
+    withdrawn = {tournament.name(p) for p in tournament.withdrawn}
+    show_ratings = st.session_state.show_nat_rating or st.session_state.show_fide_rating
+    if show_ratings:
+        rating_key = "fide" if st.session_state.show_fide_rating else "nat"
+        report = tournament.rating_report(rating_key, st.session_state.default_rating)
+        ratings = player_ratings(tournament, rating_key, st.session_state.default_rating)
 
     table_data = []
-    place = 1
-    prev_key = None
-    for name in sorted_players:
-        score = st.session_state.scores[name]
-        bh = buchholz[name]
-        current_key = (score, bh)
-        displayed_place = place if prev_key is None or current_key != prev_key else displayed_place
+    for row in tournament.standings():
+        displayed_place = row["place"]
         medal = " 👑" if displayed_place == 1 else " 🥈" if displayed_place == 2 else " 🥉" if displayed_place == 3 else ""
-        color_hist = st.session_state.color_history[name]
-        white_count = color_hist.count('Б')
-        total_games = len(color_hist)
-        color_info = f"{white_count}/{total_games}" if total_games > 0 else "0/0"
-        table_data.append({"Место": displayed_place, "Имя": name + medal, "Очки": f"{score:.1f}", "Бухгольц": f"{bh:.1f}", "Белых": color_info})
-        prev_key = current_key
-        place += 1
+        mark = " (выбыл)" if row["name"] in withdrawn else ""
+        color_info = f"{row['white']}/{row['games']}"
+        table_row = {
+            "Место": displayed_place, "Имя": row["name"] + medal + mark, "Очки": f"{row['score']:.1f}",
+            "Бухгольц": f"{row['buchholz']:.1f}", "Усеч. Бухгольц": f"{row['buchholz_cut1']:.1f}",
+            "Медиан. Бухгольц": f"{row['median_buchholz']:.1f}", "Бергер": f"{row['sonneborn_berger']:.2f}",
+            "Прогресс": f"{row['progressive']:.1f}", "Белых": color_info,
+        }
+        if show_ratings:
+            # Рейтинговые показатели — только по сыгранным партиям (без неявок и BYE)
+            i = tournament.index[row["name"]]
+            played = report["games"][i] > 0
+            table_row.update({
+                "Рейтинг": int(ratings[i]),
+                "Ср. рейт. соп.": f"{report['average_opponent'][i]:.0f}" if played else "",
+                "Перформанс": f"{report['performance'][i]:.0f}" if played else "",
+                "Ожидалось": f"{report['expected'][i]:.2f}",
+                "Изм. рейтинга": f"{report['change'][i]:+.1f}",
+            })
+        table_data.append(table_row)
 
     st.dataframe(table_data, use_container_width=True, hide_index=True)
+    profiling.add_time("page.standings", time.perf_counter() - block_started)
+
+    with st.expander("Экспорт в TRF", expanded=False):
+        if st.button("Сформировать TRF"):
+            buffer = io.StringIO()
+            write_trf(st.session_state.tournament, buffer)
+            st.download_button("Скачать TRF", buffer.getvalue(), file_name="tournament.trf", mime="text/plain")
+
+    with st.expander("Отчёты: кросс-таблица, листы пар, призёры", expanded=False):
+        report_kind = st.radio("Отчёт:", ["Кросс-таблица", "Лист пар тура", "Призёры"], horizontal=True)
+        fmt = st.radio("Формат:", list(FORMATS), format_func=lambda f: {"csv": "CSV", "html": "HTML для печати",
+                                                                       "text": "Текст для печати"}[f],
+                       horizontal=True)
+        report_rating_key = "fide" if st.session_state.show_fide_rating or not st.session_state.show_nat_rating else "nat"
+        widths = None
+        if report_kind == "Кросс-таблица":
+            title = "Кросс-таблица"
+            file_stem = "crosstable"
+        elif report_kind == "Лист пар тура":
+            report_round = st.number_input("Тур", min_value=1, max_value=max(1, tournament.current_round),
+                                           value=max(1, tournament.current_round))
+            title = f"Пары {int(report_round)}-го тура"
+            file_stem = f"pairings_{int(report_round)}"
+        else:
+            prize_places = st.number_input("Призовых мест в зачёте", min_value=1, max_value=50, value=DEFAULT_PRIZES)
+            bands_text = st.text_input("Рейтинговые группы «до X» (через запятую)", value="")
+            title = "Призёры"
+            file_stem = "prizes"
+        if st.button("Сформировать отчёт"):
+            started = time.perf_counter()
+            if report_kind == "Кросс-таблица":
+                report_data = crosstable(tournament, report_rating_key, st.session_state.default_rating)
+                if fmt == "text":
+                    widths = crosstable_widths(tournament, report_data[0])
+            elif report_kind == "Лист пар тура":
+                report_data = pairing_sheet(tournament, int(report_round)) if tournament.current_round else None
+            else:
+                bands = [int(part) for part in bands_text.replace(";", ",").split(",") if part.strip().isdigit()]
+                report_data = prize_list(tournament, int(prize_places), bands, report_rating_key,
+                                         st.session_state.default_rating)
+            if report_data is None:
+                st.warning("Ещё не было ни одного тура.")
+            else:
+                content = "".join(render(title, report_data, fmt, widths))
+                profiling.add_time("page.report", time.perf_counter() - started)
+                mime, extension = FORMATS[fmt]
+                st.download_button(f"Скачать ({extension.upper()})", content.encode("utf-8"),
+                                   file_name=f"{file_stem}.{extension}", mime=mime)
+
+# =============== Прогноз итогов ===============
+if st.session_state.initialized and not st.session_state.completed:
+    with st.expander("Прогноз итогов (Монте-Карло)", expanded=False):
+        st.caption("Оставшиеся туры разыгрываются много раз по рейтингам игроков (формула Эло).")
+        runs = st.number_input("Число прогонов", min_value=1000, max_value=1_000_000, value=100_000, step=10_000)
+        if st.button("Рассчитать прогноз"):
+            rating_key = "fide" if st.session_state.show_fide_rating or not st.session_state.show_nat_rating else "nat"
+            with st.spinner("Моделирование..."):
+                forecast = simulate(
+                    st.session_state.tournament,
+                    runs=int(runs),
+                    rating_key=rating_key,
+                    default_rating=st.session_state.default_rating,
+                )
+            st.dataframe([
+                {
+                    "Имя": row["name"],
+                    "1 место": f"{row['top1']:.1%}",
+                    "Топ-3": f"{row['top3']:.1%}",
+                    "Средние очки": f"{row['mean_score']:.2f}",
+                    "Среднее место": f"{row['mean_place']:.1f}",
+                }
+                for row in forecast
+            ], use_container_width=True, hide_index=True)
 
 if st.session_state.completed:
     st.balloons()
     st.success("🏆 Турнир завершён! Поздравляем победителей!")
+    if st.button("Новый турнир"):
+        # Группа убирается из соревнования, её журнал уходит в архив
+        st.session_state.event.remove_section(st.session_state.section)
+        st.session_state.section = None
+        st.rerun()
+
+# =============== Профилирование ===============
+with st.expander("Профилирование (для администратора)", expanded=False):
+    st.caption("Время жеребьёвки, подсчёта очков и построения страницы, счётчики паросочетания "
+               "и размер состояния. Выключенные замеры почти ничего не стоят; данные общие для всех сессий.")
+    profiling_on = st.checkbox("Включить замеры", value=profiling.enabled())
+    if profiling_on != profiling.enabled():
+        profiling.enable(profiling_on)
+    profile = profiling.summary()
+    if profile["timers"]:
+        st.dataframe([{"Замер": name, **values} for name, values in profile["timers"].items()],
+                     use_container_width=True, hide_index=True)
+    if profile["counters"] or profile["gauges"]:
+        st.dataframe([{"Показатель": name, "Значение": value}
+                      for name, value in {**profile["counters"], **profile["gauges"]}.items()],
+                     use_container_width=True, hide_index=True)
+    cols = st.columns(2)
+    with cols[0]:
+        if st.button("Сбросить замеры"):
+            profiling.reset()
+            st.rerun()
+    with cols[1]:
+        log = io.StringIO()
+        profiling.write_log(log)
+        st.download_button("Журнал замеров (JSONL)", log.getvalue(), file_name="profile.jsonl",
+                           mime="application/x-ndjson", disabled=not log.getvalue())
 
-
-
-
+profiling.add_time("page.run", time.perf_counter() - page_started)
@@ -0,0 +1,216 @@
+import numpy as np
+
+from engine import Tournament, SWISS, MATCHING
+
+# Обмен с федеральными программами в формате FIDE TRF-16 (Tournament Report
+# File). Чтение и запись идут построчно: импорт не держит копию файла,
+# экспорт пишет строку игрока сразу в выходной поток.
+#
+# Запись игрока 001 (позиции с 1):
+#   1-3 «001», 5-8 стартовый номер, 10 пол, 11-13 звание, 15-47 имя
+#   «Фамилия, Имя», 49-52 рейтинг ФИДЕ, 54-56 федерация, 58-68 ID ФИДЕ,
+#   70-79 дата рождения, 81-84 очки, 86-89 место; далее по 10 позиций на
+#   тур: 92-95 соперник, 97 цвет (w/b/-), 99 результат.
+# Национальный рейтинг и ID ФШР в TRF не предусмотрены, поэтому пишутся
+# собственной записью NAT (другие программы неизвестные записи пропускают):
+#   1-3 «NAT», 5-8 стартовый номер, 10-13 рейтинг ФШР, 15-25 ID ФШР.
+
+ROUND_START = 91  # индекс (с 0) начала блока первого тура
+ROUND_WIDTH = 10
+WHITE_WINS = set("1W")
+BLACK_WINS = set("0L")
+DRAWS = set("=D")
+FULL_BYES = set("UF")
+
+def _field(line, start, end):
+    return line[start:end].strip()
+
+def _int(value, default=0):
+    return int(value) if value.isdigit() else default
+
+def trf_name(name, surname=None):
+    """«Фамилия Имя» -> «Фамилия, Имя»; surname — фамилия, если она известна
+    отдельно (составная «Van Wely»), иначе фамилия — до первого пробела."""
+    if surname and name.startswith(surname):
+        last, first = surname, name[len(surname):].strip()
+    else:
+        last, _, first = name.partition(" ")
+    return f"{last}, {first}" if first else last
+
+def app_name(trf_value):
+    """«Фамилия, Имя» -> «Фамилия Имя»."""
+    last, _, first = trf_value.partition(",")
+    return f"{last.strip()} {first.strip()}".strip()
+
+def read_trf(lines):
+    """Разбирает TRF построчно.
+
+    Возвращает словарь: name, total_rounds (из записи XXR или по числу
+    туров в файле), players — записи в формате ростера страницы
+    (last_name, first_name, nat_rating, fide_rating, fshr_id, fide_id) по
+    стартовым номерам, rounds — для каждого тура (доски (белые, чёрные,
+    результат), bye) в номерах игроков с 0, warnings.
+    """
+    name = ""
+    declared_rounds = 0
+    players = {}
+    national = {}
+    rounds = []
+    warnings = []
+    # Неявка белых («-»): «-/+» или «-/-» решает строка чёрных
+    white_forfeits = []
+    black_forfeit_wins = set()
+    for line in lines:
+        line = line.rstrip("\r\n")
+        code = line[:3]
+        if code == "012":
+            name = line[4:].strip()
+        elif code == "XXR":
+            declared_rounds = _int(line[4:].strip())
+        elif code == "NAT":
+            national[_int(_field(line, 4, 8))] = (_field(line, 9, 13), _field(line, 14, 25))
+        elif code == "001":
+            rank = _int(_field(line, 4, 8))
+            if not rank or rank in players:
+                raise ValueError(f"Неверный стартовый номер в строке: {line[:47]}")
+            # Фамилия до запятой: составная («Van Wely, Loek») не делится по пробелу
+            last_name, _, first_name = _field(line, 14, 47).partition(",")
+            players[rank] = {
+                "last_name": last_name.strip(), "first_name": first_name.strip(),
+                "nat_rating": "", "fide_rating": _field(line, 48, 52),
+                "fshr_id": "", "fide_id": _field(line, 57, 68),
+            }
+            k = 0
+            while ROUND_START + k * ROUND_WIDTH < len(line):
+                block = line[ROUND_START + k * ROUND_WIDTH:ROUND_START + (k + 1) * ROUND_WIDTH].ljust(8)
+                opponent, color, result = _int(block[:4].strip()), block[5], block[7]
+                while len(rounds) <= k:
+                    rounds.append(([], None))
+                games, bye = rounds[k]
+                if opponent and color in "wb":
+                    # Партию записываем по строке белых, строку чёрных пропускаем
+                    if color == "w":
+                        if result in WHITE_WINS:
+                            games.append((rank, opponent, "1-0"))
+                        elif result in BLACK_WINS:
+                            games.append((rank, opponent, "0-1"))
+                        elif result in DRAWS:
+                            games.append((rank, opponent, "1/2-1/2"))
+                        elif result == "+":
+                            games.append((rank, opponent, "+/-"))
+                        elif result == "-":
+                            white_forfeits.append((k, len(games)))
+                            games.append((rank, opponent, "-/-"))
+                        elif result.strip():
+                            warnings.append(f"Тур {k + 1}: неизвестный результат «{result}» у игрока {rank}.")
+                    elif result == "+":
+                        black_forfeit_wins.add((k, rank))
+                elif not opponent and result in FULL_BYES:
+                    if bye is None:
+                        rounds[k] = (games, rank)
+                    else:
+                        warnings.append(f"Тур {k + 1}: второй BYE (игрок {rank}) пропущен.")
+                elif result.strip() and result != "Z":
+                    warnings.append(f"Тур {k + 1}: запись «{block.strip()}» игрока {rank} не поддерживается и пропущена.")
+                k += 1
+
+    for k, board in white_forfeits:
+        white, black, _ = rounds[k][0][board]
+        if (k, black) in black_forfeit_wins:
+            rounds[k][0][board] = (white, black, "-/+")
+
+    if sorted(players) != list(range(1, len(players) + 1)):
+        raise ValueError("Стартовые номера игроков должны идти подряд с 1.")
+    for rank, (rating, fshr_id) in national.items():
+        if rank in players:
+            players[rank]["nat_rating"] = rating
+            players[rank]["fshr_id"] = fshr_id
+    # Хвостовые туры без партий — ещё не сыграны
+    while rounds and not rounds[-1][0] and rounds[-1][1] is None:
+        rounds.pop()
+    return {
+        "name": name,
+        "total_rounds": max(declared_rounds, len(rounds)),
+        "players": [players[rank] for rank in range(1, len(players) + 1)],
+        "rounds": [
+            ([(w - 1, b - 1, res) for w, b, res in games], None if bye is None else bye - 1)
+            for games, bye in rounds
+        ],
+        "warnings": warnings,
+    }
+
+def build_tournament(event, tournament_type=SWISS, journal=None, pairing_system=MATCHING):
+    """Создаёт турнир по разобранному TRF и проводит через него сыгранные туры.
+
+    Пустой рейтинг остаётся нулём: рейтинг по умолчанию подставляется только
+    в расчётах (player_ratings), а в экспорт игрок уходит без рейтинга.
+    """
+    names = [f"{p['last_name']} {p['first_name']}".strip() for p in event["players"]]
+    ratings = {}
+    player_ids = {}
+    surnames = {}
+    for name, p in zip(names, event["players"]):
+        ratings[name] = {
+            "nat": _int(p["nat_rating"]),
+            "fide": _int(p["fide_rating"]),
+        }
+        player_ids[name] = {"fshr_id": p["fshr_id"], "fide_id": p["fide_id"]}
+        if " " in p["last_name"]:
+            surnames[name] = p["last_name"]
+    total_rounds = event["total_rounds"] or 1
+    tournament = Tournament(names, tournament_type, total_rounds, ratings=ratings, player_ids=player_ids,
+                            pairing_system=pairing_system, surnames=surnames)
+    if journal is not None:
+        journal.start(tournament)
+    for rnd, (games, bye) in enumerate(event["rounds"], 1):
+        tournament.apply_pairings(rnd, [(w, b) for w, b, _ in games], bye)
+        tournament.submit_results([res for _, _, res in games])
+    tournament.warnings.extend(event["warnings"])
+    return tournament
+
+def write_trf(tournament, out, name=""):
+    """Пишет турнир в TRF: заголовок и по строке на игрока (полная таблица)."""
+    n = len(tournament.players)
+    played_rounds = [rnd for rnd in range(1, tournament.total_rounds + 1)
+                     if tournament.tour_data[rnd]["completed"]]
+    # Компактные массивы тур × игрок: соперник (стартовый номер), цвет, результат
+    opponent = np.zeros((len(played_rounds), n), dtype=np.int32)
+    color = np.full((len(played_rounds), n), ord("-"), dtype=np.uint8)
+    result = np.full((len(played_rounds), n), ord("Z"), dtype=np.uint8)
+    codes = {"1-0": ("1", "0"), "0-1": ("0", "1"), "1/2-1/2": ("=", "="),
+             "+/-": ("+", "-"), "-/+": ("-", "+"), "-/-": ("-", "-")}
+    for k, rnd in enumerate(played_rounds):
+        data = tournament.tour_data[rnd]
+        for white, black, res in data["results"]:
+            opponent[k, white] = black + 1
+            opponent[k, black] = white + 1
+            color[k, white] = ord("w")
+            color[k, black] = ord("b")
+            white_code, black_code = codes[res]
+            result[k, white] = ord(white_code)
+            result[k, black] = ord(black_code)
+        if data["bye"] is not None:
+            result[k, data["bye"]] = ord("U")
+
+    places = np.empty(n, dtype=np.int64)
+    places[tournament.standings_index.order] = tournament.standings_index.places
+    scores = tournament.state.scores
+
+    out.write(f"012 {name}\n")
+    out.write(f"062 {n}\n")
+    out.write(f"092 {tournament.tournament_type}\n")
+    out.write(f"XXR {tournament.total_rounds}\n")
+    for i, player in enumerate(tournament.players):
+        rating = tournament.ratings.get(player, {})
+        ids = tournament.player_ids.get(player, {})
+        fide = rating.get("fide") or ""
+        line = (f"001 {i + 1:>4}      {trf_name(player, tournament.surnames.get(player))[:33]:<33} {fide:>4} {'':>3} "
+                f"{ids.get('fide_id', ''):>11} {'':>10} {scores[i]:>4.1f} {places[i]:>4}")
+        blocks = []
+        for k in range(len(played_rounds)):
+            opp = opponent[k, i]
+            blocks.append(f"  {opp:>4} {chr(color[k, i])} {chr(result[k, i])}" if opp
+                          else f"  0000 - {chr(result[k, i])}")
+        out.write(line + "".join(blocks) + "\n")
+        if rating.get("nat") or ids.get("fshr_id"):
+            out.write(f"NAT {i + 1:>4} {rating.get('nat') or '':>4} {ids.get('fshr_id', ''):>11}\n")